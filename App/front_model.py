@@ -1,15 +1,63 @@
-from collections import deque
+from collections import OrderedDict, deque
+import functools
+import hashlib
+import re
+import uuid
+from typing import TYPE_CHECKING
 import numpy as np
 import streamlit as st
 import pandas as pd
 import os
 import datetime
-import plotly.express as px
-import plotly.graph_objects as go
-from Preprocessing.text_preprocessing import *
+from Preprocessing.pipeline import EmbeddingPipeline
+from Preprocessing.text_preprocessing import ProcessorFactory, TextProcessor
 from PubMedAPI.pubmed_api import PubMedAPI
-import matplotlib.colors as mcolors
+from PubMedAPI.pmid_reader import PmidReader
+from PubMedAPI.checkpoint import CheckpointJournal, JobLockedError
+from PubMedAPI.dataset_store import DatasetStore
+from PubMedAPI.geo_mirror import GeoMirror, MirroredPubMedAPI
+from PubMedAPI.resilience import CircuitBreaker, CircuitBreakers
 from PubMedAPI.observer import Observer
+from Diagnostics.metrics import MetricsRegistry, measure, timed
+
+if TYPE_CHECKING:
+    import plotly.graph_objects as go
+
+"""
+plotly, matplotlib and scikit-learn are imported only where they are used, so a page view that only
+renders the sidebar (and every rerun before a dataset is loaded) does not pay for them.
+"""
+
+
+@functools.lru_cache(maxsize=None)
+def read_static_file(*path_parts: str) -> str:
+    """
+    Reads a file relative to the App directory once per process.
+    """
+    with open(os.path.join(os.path.dirname(__file__), *path_parts), 'r') as f:
+        return f.read()
+
+
+@st.cache_resource
+def get_text_processor() -> TextProcessor:
+    """
+    TextProcessor keeps no state between calls, so one instance is shared by all sessions.
+    """
+    return ProcessorFactory.get_processor("remove_punctuation")
+
+
+@st.cache_resource
+def get_geo_mirror() -> GeoMirror | None:
+    """
+    Opens the GEO mirror configured by PUBTRENDS_GEO_MIRROR and updates its index once per process.
+    Lookups are read-only, so all sessions share the same index connection.
+    """
+    if not GeoMirror.DIRECTORY:
+        return None
+    mirror = GeoMirror(GeoMirror.DIRECTORY)
+    mirror.build_index()
+    return mirror
+
 
 class MainApp(Observer):
     """
@@ -20,13 +68,20 @@ class MainApp(Observer):
     Attributes:
     error_placeholder (st.empty): Placeholder for displaying error messages.
     progress_bar_placeholder (st.empty): Placeholder for displaying the progress bar.
-    pubmed_api (PubMedAPI): Instance of the PubMedAPI class for fetching data from PubMed.
+    pubmed_api (PubMedAPI): Fetch job of the current upload, created by `create_fetch_job`.
     """
     DEQUE_MAX_LENGTH = 3
     PERPLEXITY_MIN = 30
+    DEDUP_THRESHOLD = EmbeddingPipeline.DEDUP_THRESHOLD
     PLOT_WIDTH = 900
     PLOT_HEIGHT = 600
     MIN_LEN_PMID_LIST = 10
+    FIGURE_CACHE_SIZE = 4
+    NO_SELECTION = "<select>"
+    OWNER_PATTERN = r"[0-9a-f]{32}"
+    DATASET_EXTENSIONS = ["parquet", "arrow", "feather"]
+    DATASET_COLUMNS = ("Pmid", "Geo_dataset_ind", "GSE_code", "Title", "Summary", "Overall_design", "Experiment_type",
+                       "Organism")
     def __init__(self):
         """
         Some of the variables we want to save between streamlit sessions
@@ -53,44 +108,70 @@ class MainApp(Observer):
             st.session_state.tfidf_processor = None
         if "tsne_processor" not in st.session_state:
             st.session_state.tsne_processor = None
+        if "dedup_processor" not in st.session_state:
+            st.session_state.dedup_processor = None
+        if "map_processor" not in st.session_state:
+            st.session_state.map_processor = None
+        if "dataset_hash" not in st.session_state:
+            st.session_state.dataset_hash = None
+        if "label_version" not in st.session_state:
+            st.session_state.label_version = 0
+        if "selection" not in st.session_state:
+            st.session_state.selection = (MainApp.NO_SELECTION,) * 3
+        if "figure_cache" not in st.session_state:
+            st.session_state.figure_cache = OrderedDict()
+        if "export" not in st.session_state:
+            st.session_state.export = (None, None)
 
 
         self.progress_bar_placeholder = None
         self.error_placeholder = None
-        self.pubmed_api = PubMedAPI()
-        #adding observer to pubmed_api instance
-        self.pubmed_api.attach(self)
+        self.layout_placeholder = None
+        self.tab_visualization = None
+        self.tab_info = None
+        self.tab_diagnostics = None
+        self.pubmed_api = None
         """
         Remove_Punctuation only provides text processing without any saving any parameters so it does not need 
-        to be remembered between streamlit sessions
+        to be remembered between streamlit sessions, it is created once per process
         """
-        st.session_state.remove_punctuation = ProcessorFactory.get_processor("remove_punctuation")
+        st.session_state.remove_punctuation = get_text_processor()
 
     # ----------------------------------- Layout App -----------------------------------
     def prepare_main_window(self) -> None:
         """
         Reserving space for the app title,error messages and the progress bar.
+        The tabs are created here as well, so that intermediate t-SNE layouts computed while the sidebar
+        is processing can already be drawn in the Visualization tab.
         """
         with st.container():
             st.title("PubTrends: Data Insights for Enhanced Paper Relevance")
         self.error_placeholder = st.empty()
         self.progress_bar_placeholder = st.empty()
+        self.tab_visualization, self.tab_info, self.tab_diagnostics = st.tabs(["Visualization", "Info", "Diagnostics"])
+        with self.tab_visualization:
+            self.layout_placeholder = st.empty()
 
     def prepare_side_bar(self) -> None:
         """
         Creates the sidebar layout, which includes:
-        - A file uploader for the user’s file
+        - A file uploader for the user’s file (a PMID list, or a dataset saved as Parquet/Arrow)
         - A button for loading the toy dataset
         - A App number_input for setting the TF-IDF feature count
         - A App number_input for setting n_clusters (used by the KMeans algorithm)
         - A App selection box for choosing from the last three loaded user DataFrames
+        - A list of interrupted uploads that can be resumed
         """
         with st.sidebar:
             st.sidebar.title("Enter txt file with list of PMIDs", anchor="center")
-            st.session_state.uploaded_file = st.file_uploader("Choose a file", type=["txt"],
+            st.session_state.uploaded_file = st.file_uploader("Choose a file",
+                                                              type=["txt", "csv", "gz"] + MainApp.DATASET_EXTENSIONS,
                                                               accept_multiple_files=False, label_visibility="collapsed")
             if st.session_state.uploaded_file is not None:
-                if st.button("Load PMIDs file", use_container_width=True):
+                if st.session_state.uploaded_file.name.rsplit(".", 1)[-1].lower() in MainApp.DATASET_EXTENSIONS:
+                    if st.button("Load saved dataset", use_container_width=True):
+                        self.handle_saved_dataset()
+                elif st.button("Load PMIDs file", use_container_width=True):
 
                     self.handle_user_dataset()
             st.text("or choose a toy dataset")
@@ -101,6 +182,9 @@ class MainApp(Observer):
                                                             value=10, step=1)
             st.session_state.num_clusters = st.number_input("Enter a number of clusters", min_value=1, max_value=30,
                                                             value=8, step=1)
+            st.session_state.hierarchical = st.toggle("Cluster overview first",
+                                                      help="For large datasets: show a map of the clusters, and "
+                                                           "compute the detailed layout of a cluster only when it is opened")
 
             if st.session_state.name_deque:
                 selected_dataset = st.selectbox("Previously saved datasets", st.session_state.name_deque)
@@ -109,72 +193,216 @@ class MainApp(Observer):
                     st.session_state.pmid_df = st.session_state.local_df_deque[idx]
                     self.handle_preloaded_dataset(load_toy_dataset=False)
 
+            self.prepare_unfinished_jobs()
+            self.prepare_endpoint_warning()
+
+    @staticmethod
+    def prepare_endpoint_warning() -> None:
+        """
+        Warns that NCBI is failing when any endpoint's circuit breaker is not closed,
+        so the user knows why new uploads fail fast instead of waiting for retries.
+        """
+        unavailable = [breaker for breaker in CircuitBreakers().snapshot() if breaker["state"] != CircuitBreaker.CLOSED]
+        if unavailable:
+            names = ", ".join(f"{breaker['endpoint']} ({breaker['state']})" for breaker in unavailable)
+            st.warning(f"NCBI endpoints are failing: {names}. Requests to them are paused; see the Diagnostics tab.")
+
+    @staticmethod
+    def checkpoint_directory() -> str:
+        """
+        Journals are kept per owner, a random token stored in the `owner` query parameter of the page.
+        Reloading or bookmarking the page keeps its unfinished uploads, and other analysts' uploads are not listed.
+        """
+        owner = st.query_params.get("owner", "")
+        if not re.fullmatch(MainApp.OWNER_PATTERN, owner):
+            owner = uuid.uuid4().hex
+            st.query_params["owner"] = owner
+        return os.path.join(CheckpointJournal.DIRECTORY, owner)
+
+    def prepare_unfinished_jobs(self) -> None:
+        """
+        Lists this owner's uploads whose fetching was interrupted (see CheckpointJournal) and lets the user
+        resume them, which only fetches the PMIDs that are not in the journal yet, or discard them.
+        Uploads that are still being fetched (e.g. in another tab) are not listed.
+        """
+        directory = MainApp.checkpoint_directory()
+        jobs = CheckpointJournal.list_jobs(directory)
+        if not jobs:
+            return
+        with st.expander(f"Unfinished uploads ({len(jobs)})"):
+            job = st.selectbox("Unfinished uploads", jobs, format_func=lambda job: job.label,
+                               label_visibility="collapsed")
+            col1, col2 = st.columns(2)
+            with col1:
+                if st.button("Resume", use_container_width=True):
+                    self.handle_user_dataset(list_of_pmids=CheckpointJournal.open_job(job.job_id, directory).pmids)
+            with col2:
+                if st.button("Discard", use_container_width=True):
+                    try:
+                        CheckpointJournal.open_job(job.job_id, directory).discard()
+                    except JobLockedError:
+                        st.warning("This upload is being fetched in another tab.")
+                        return
+                    st.rerun()
 
 
     def prepare_tabs(self) -> None:
         """
-        Creates two tabs:
+        Fills the three tabs created in `prepare_main_window`:
         1) A Visualization tab
         2) An Information tab providing general details about the application
+        3) A Diagnostics tab with per-stage timing and memory measurements
 
         Visualization features:
         - A 3D visualization
         - A select box for choosing PMIDs, experiment types, and organisms
         - A preview of the associated DataFrame
+        Each of them is a separate fragment, so interacting with the filters only reruns the filters.
+        In the cluster overview mode, a select box above the plot opens a single cluster.
         """
-        tab_visualization, tab_info = st.tabs(["Visualization", "Info"])
-        with tab_visualization:
+        with self.tab_visualization:
             if st.session_state.success_flag:
-                plot_placeholder = st.empty()
-                plot_placeholder.empty()
-
-                plot_placeholder.plotly_chart(self.load_3d_plot("3d_plot_selected"), key="3d_plot_selected")
-
-
-                col1, col2, col3, col4 = st.columns(4)
-                #filters
-                with col1:
-                    p1 = st.selectbox("Pmid",["<select>"] + sorted(st.session_state.pmid_df["Pmid"].unique().tolist()),
-                        key="Pmid"
-                    )
-                with col2:
-                    p2 = st.selectbox("Organism",["<select>"] + st.session_state.pmid_df["Organism"].unique().tolist(),
-                        key="Organism"
-                    )
-                with col3:
-                    p3 = st.selectbox("Experiment type",["<select>"] + st.session_state.pmid_df["Experiment_type"].unique().tolist(),
-                        key="Experiment_type"
-                    )
-                with col4:
-                    if st.button("Filter"):
-                        selected_pmid = st.session_state["Pmid"]
-                        selected_organism = st.session_state["Organism"]
-                        selected_experiment_type = st.session_state["Experiment_type"]
-
-                        conditions = []
-                        if selected_pmid != "<select>":
-                            conditions.append(
-                                st.session_state.pmid_df["Pmid"] == selected_pmid)
-                        if selected_organism != "<select>":
-                            conditions.append(
-                                st.session_state.pmid_df["Organism"] == selected_organism)
-                        if selected_experiment_type != "<select>":
-                            conditions.append(st.session_state.pmid_df[
-                                                  "Experiment_type"] == selected_experiment_type)
-                        if conditions:
-                            st.session_state.pmid_df["is_selected"] = np.logical_and.reduce(
-                                conditions).astype(int)
-                        else:
-                            st.session_state.pmid_df["is_selected"] = 1
-
-                        plot_placeholder.empty()
-                        plot_placeholder.plotly_chart(self.load_3d_plot("3d_plot_selected"), key="3d_plot_filtered")
-                st.dataframe(st.session_state.pmid_df[['GSE_code','Title','Summary','Organism','Experiment_type','Overall_design']]
-                             [st.session_state.pmid_df["is_selected"] == 1])
-
-        with tab_info:
-            with open('./App/info.md','r') as f:
-                st.markdown(f.read())
+                if st.session_state.map_processor is not None:
+                    self.prepare_cluster_navigation()
+                self.plot_fragment()
+                self.filter_fragment()
+                self.table_fragment()
+
+        with self.tab_info:
+            st.markdown(read_static_file('info.md'))
+
+        with self.tab_diagnostics:
+            self.prepare_diagnostics()
+
+    @staticmethod
+    def prepare_cluster_navigation() -> None:
+        """
+        Select box switching between the cluster overview and the detailed layout of one cluster,
+        named by its size and top TF-IDF terms.
+        Opening a cluster reruns the app, so the plot and the table show only its datasets.
+        """
+        processor = st.session_state.map_processor
+        terms = processor.top_terms(st.session_state.tfidf_processor.vectorizer.get_feature_names_out())
+        names = {None: "Overview of all clusters"}
+        names.update({cluster: f"Cluster {cluster}: {size} datasets ({', '.join(terms[cluster])})"
+                      for cluster, size in enumerate(processor.sizes) if size})
+        st.selectbox("Cluster", list(names), format_func=names.get, key="map_cluster")
+
+    @st.fragment
+    def plot_fragment(self) -> None:
+        """
+        3D plot taken from the per-session figure cache.
+        """
+        st.plotly_chart(self.get_cached_figure(), key="3d_plot_selected")
+
+    @st.fragment
+    def filter_fragment(self) -> None:
+        """
+        Select boxes for choosing PMIDs, organisms and experiment types.
+        Changing a select box reruns only this fragment; pressing "Filter" stores the new selection
+        and reruns the app, so the plot and the table pick it up.
+        """
+        col1, col2, col3, col4 = st.columns(4)
+        with col1:
+            st.selectbox("Pmid",[MainApp.NO_SELECTION] + sorted(st.session_state.pmid_df["Pmid"].unique().tolist()),
+                key="Pmid"
+            )
+        with col2:
+            st.selectbox("Organism",[MainApp.NO_SELECTION] + st.session_state.pmid_df["Organism"].unique().tolist(),
+                key="Organism"
+            )
+        with col3:
+            st.selectbox("Experiment type",[MainApp.NO_SELECTION] + st.session_state.pmid_df["Experiment_type"].unique().tolist(),
+                key="Experiment_type"
+            )
+        with col4:
+            if st.button("Filter"):
+                selection = (st.session_state["Pmid"], st.session_state["Organism"], st.session_state["Experiment_type"])
+                if selection != st.session_state.selection:
+                    self.apply_selection(selection)
+                    st.rerun()
+
+    @st.fragment
+    def table_fragment(self) -> None:
+        """
+        Preview of the selected rows of the DataFrame (of the opened cluster in the cluster overview mode).
+        """
+        df = st.session_state.pmid_df.iloc[self.get_view()[0]]
+        st.dataframe(df[['GSE_code','Title','Summary','Organism','Experiment_type','Overall_design']]
+                     [df["is_selected"] == 1])
+        st.download_button("Export dataset (Parquet)", self.get_dataset_export(), file_name="pubtrends_dataset.parquet",
+                           mime="application/vnd.apache.parquet")
+
+    @staticmethod
+    def get_dataset_export() -> bytes:
+        """
+        Returns the current dataset as Parquet, with the 3D coordinates and cluster labels
+        (and the fetch times, so `cli.py refresh` can tell stale rows apart).
+        The file is built once per dataset and labelling, not on every rerun.
+        """
+        key = (st.session_state.dataset_hash, st.session_state.label_version)
+        cached_key, data = st.session_state.export
+        if cached_key != key:
+            df = st.session_state.pmid_df
+            table = df[[column for column in MainApp.DATASET_COLUMNS + ("Fetched_at",) if column in df.columns]].copy()
+            table[["X", "Y", "Z"]] = st.session_state.current_X
+            table["Cluster"] = st.session_state.current_labels
+            data = DatasetStore().to_bytes(table, DatasetStore.PARQUET)
+            st.session_state.export = (key, data)
+        return data
+
+    @staticmethod
+    def apply_selection(selection: tuple) -> None:
+        """
+        Marks the rows matching the selected PMID, organism and experiment type in the 'is_selected' column.
+
+        :param selection: Tuple (pmid, organism, experiment_type), NO_SELECTION meaning "any".
+        """
+        df = st.session_state.pmid_df
+        conditions = [df[column] == value for column, value in zip(["Pmid", "Organism", "Experiment_type"], selection)
+                      if value != MainApp.NO_SELECTION]
+        if conditions:
+            df["is_selected"] = np.logical_and.reduce(conditions).astype(int)
+        else:
+            df["is_selected"] = 1
+        st.session_state.selection = selection
+
+    @staticmethod
+    def prepare_diagnostics() -> None:
+        """
+        Displays the measurements accumulated by MetricsRegistry since the process started:
+        call counts, wall time statistics and (when tracking is switched on) peak memory for every
+        instrumented stage, with JSON and Prometheus exports.
+        """
+        breakers = CircuitBreakers().snapshot()
+        if breakers:
+            st.subheader("NCBI endpoints")
+            st.dataframe(pd.DataFrame(breakers), hide_index=True, use_container_width=True)
+        registry = MetricsRegistry()
+        track_memory = st.toggle("Track peak memory", value=registry.track_memory,
+                                 help="Traces every allocation of the server process, which slows all sessions down")
+        if track_memory != registry.track_memory:
+            registry.set_track_memory(track_memory)
+        snapshot = registry.snapshot()
+        if not snapshot:
+            st.info("No measurements yet. Load a dataset to collect timings.")
+            return
+        table = pd.DataFrame(snapshot).drop(columns=["buckets", "last_peak_memory_bytes"])
+        peak_memory = table.pop("peak_memory_bytes")
+        if track_memory or peak_memory.any():
+            table["peak_memory_MiB"] = peak_memory / 2 ** 20
+        st.dataframe(table, hide_index=True, use_container_width=True)
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            st.download_button("Export JSON", registry.to_json(), file_name="pubtrends_metrics.json",
+                               mime="application/json", use_container_width=True)
+        with col2:
+            st.download_button("Export Prometheus", registry.to_prometheus(), file_name="pubtrends_metrics.prom",
+                               mime="text/plain", use_container_width=True)
+        with col3:
+            if st.button("Reset measurements", use_container_width=True):
+                registry.reset()
+                st.rerun()
 
     # ----------------------------------- Displaying Errors -----------------------------------
     def update_on_error(self,*args,**kwargs):
@@ -194,10 +422,15 @@ class MainApp(Observer):
 
         Parameters:
         observable (Observable): The observable object that notifies the observer of progress.
-        **kwargs: Additional keyword arguments, expected to contain a 'measure' key with the progress value.
+        **kwargs: Additional keyword arguments, expected to contain a 'measure' key with the progress value
+                  and optionally an 'event' key with the structured ProgressEvent.
         """
         if "measure" in kwargs:
-            self.progress_bar_placeholder.progress(kwargs.get("measure"))
+            event = kwargs.get("event")
+            text = None
+            if event is not None:
+                text = f"{event.stage}: {event.done}/{event.total} ({event.throughput:.1f} items/s)"
+            self.progress_bar_placeholder.progress(kwargs.get("measure"), text=text)
 
     # ----------------------------------- Toy dataset handling -----------------------------------
     def handle_preloaded_dataset(self,load_toy_dataset: bool=True) -> None:
@@ -213,7 +446,10 @@ class MainApp(Observer):
             self.load_toy_dataset_from_csv()
         self.validate_user_preprocessing_parameters()
         self.reset_select_boxes()
-        self.preprocess_raw_text()
+        try:
+            self.preprocess_raw_text()
+        except ValueError:
+            return
         st.session_state.success_flag = True
     @staticmethod
     def reset_select_boxes() -> None:
@@ -221,9 +457,10 @@ class MainApp(Observer):
         After loading a new dataset and setting a new 3D plot,
         reset the previous selections in the select boxes.
         """
-        st.session_state["Pmid"] = "<select>"
-        st.session_state["Organism"] = "<select>"
-        st.session_state["Experiment_type"] = "<select>"
+        st.session_state["Pmid"] = MainApp.NO_SELECTION
+        st.session_state["Organism"] = MainApp.NO_SELECTION
+        st.session_state["Experiment_type"] = MainApp.NO_SELECTION
+        st.session_state.selection = (MainApp.NO_SELECTION,) * 3
 
     @staticmethod
     def load_toy_dataset_from_csv() -> None:
@@ -231,9 +468,33 @@ class MainApp(Observer):
         Load toy dataset from csv file
         """
         csv_path = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'PubMedAPI', 'PubMed_data.csv'))
-        st.session_state.pmid_df = pd.read_csv(csv_path)
+        st.session_state.pmid_df = DatasetStore.load(csv_path)
+
+    def handle_saved_dataset(self) -> None:
+        """
+        Loads a dataset exported as Parquet or Arrow (see DatasetStore) instead of fetching PMIDs.
+        Only the metadata columns are read; coordinates and clusters are recomputed with the current parameters.
+        """
+        try:
+            st.session_state.pmid_df = DatasetStore.load(st.session_state.uploaded_file,
+                                                         columns=MainApp.DATASET_COLUMNS)
+        except Exception as e:
+            self.update_on_error(message=f"Could not read the saved dataset: {e}")
+            return
+        self.save_locally_dataset()
+        self.handle_preloaded_dataset(load_toy_dataset=False)
 
     # ----------------------------------- User data handling -----------------------------------
+    def create_fetch_job(self) -> PubMedAPI:
+        """
+        Creates a new fetch job for the current upload and subscribes this app to its events.
+        The job only holds a weak reference to the app, so both are released when the session ends.
+        When a GEO mirror is configured, the job reads it instead of NCBI.
+        """
+        mirror = get_geo_mirror()
+        pubmed_api = MirroredPubMedAPI(mirror) if mirror is not None else PubMedAPI()
+        pubmed_api.attach(self)
+        return pubmed_api
 
     def set_dataframe_from_pmids(self, list_of_pmids) -> None:
         """
@@ -241,9 +502,18 @@ class MainApp(Observer):
         Pmid, Geo_dataset_ind, GSE_code, Title, Summary, Overall_design, Experiment_type, Organism.
         The DataFrame is created using a list of PMIDs and `self.pubmed_api`,
         which is an instance of the PubMedAPI class.
-        """
+        Fetched results are journaled, so an interrupted upload of the same PMIDs continues where it stopped.
+        The journal is removed once every PMID has been fetched. The same PMIDs cannot be fetched by two tabs
+        of one owner at once.
+        """
+        journal = CheckpointJournal(list_of_pmids, directory=MainApp.checkpoint_directory())
+        if not journal.acquire():
+            self.update_on_error(message="These PMIDs are already being fetched in another tab.")
+            raise JobLockedError(journal.job_id)
         self.pubmed_api.pmids = list_of_pmids
-        self.pubmed_api.create_dataframe(list_of_pmids=self.pubmed_api.pmids)
+        self.pubmed_api.create_dataframe(list_of_pmids=self.pubmed_api.pmids, journal=journal)
+        if journal.is_complete:
+            journal.discard()
         st.session_state.pmid_df = self.pubmed_api.df
 
     def load_user_data(self) -> None:
@@ -253,48 +523,52 @@ class MainApp(Observer):
         and updates the error message if there are fewer than 10 valid PMIDs.
         """
         uploaded_file = st.session_state.uploaded_file
-
+        self.pubmed_api = self.create_fetch_job()
         self.pubmed_api.pmids = self.validate_chosen_file(uploaded_file)
 
     def validate_chosen_file(self, uploaded_file) -> list[int] | None:
         """
         Function checks whether the uploaded file is in the correct format and extracts PMIDs from it.
+        Plain text, CSV and gzip-compressed files are parsed line by line by PmidReader.
         In case user uploaded less than 10 correct PMIDs, an error message is displayed.
         If txt file contains less than 10 PMIDs, the error message is displayed.
+        Invalid lines are reported in aggregate.
 
         :param uploaded_file: The file uploaded by the user.
 
-        :return list[int]: A list of unique PMIDs extracted from the file.
-        """
-        file_content = uploaded_file.read().decode("utf-8")
-        list_of_pmids = []
-        pmids = file_content.split("\n")
-        for line in pmids:
-            line = line.replace(" ", "").strip()
-            if line.isdigit():
-                list_of_pmids.append(int(line))
-        list_of_pmids = list(set(list_of_pmids))
-        if len(list_of_pmids) < MainApp.MIN_LEN_PMID_LIST:
-            self.update_on_error(message="Please enter at least 10 PMIDs.")
+        :return list[int]: A list of unique PMIDs extracted from the file, in upload order.
+        """
+        uploaded_file.seek(0)
+        report = PmidReader().read(uploaded_file)
+        if len(report.pmids) < MainApp.MIN_LEN_PMID_LIST:
+            self.update_on_error(message=f"Please enter at least 10 PMIDs. {report.summary()}.")
             raise Exception
-        return list_of_pmids
+        if report.invalid_lines:
+            self.error_placeholder.warning(report.summary())
+        return report.pmids
 
-    def handle_user_dataset(self) -> None:
+    def handle_user_dataset(self, list_of_pmids: list[int] | None = None) -> None:
         """
         Processes PMIDs provided by the user through a .txt file.
         Displays a descriptive message if any of the underlying methods raise an error.
+
+        :param list_of_pmids: PMIDs of a resumed upload. If None, they are read from the uploaded file.
         """
         try:
             st.session_state.current_num_clusters = st.session_state.num_clusters
             self.reset_select_boxes()
-            self.load_user_data()
+            if list_of_pmids is None:
+                self.load_user_data()
+            else:
+                self.pubmed_api = self.create_fetch_job()
+                self.pubmed_api.pmids = list_of_pmids
             self.update_progress(measure=0)
             self.set_dataframe_from_pmids(self.pubmed_api.pmids)
             self.validate_user_preprocessing_parameters()
-            self.preprocess_raw_text()
+            self.save_locally_dataset()
             self.error_placeholder.empty()
             self.progress_bar_placeholder.empty()
-            self.save_locally_dataset()
+            self.preprocess_raw_text()
             st.session_state.success_flag = True
         except Exception as e:
             return
@@ -316,55 +590,179 @@ class MainApp(Observer):
         """
         This method checks whether the `max_features` and `num_clusters` parameters are set in the session state.
         If not, it assigns default values.
-        The `perplexity` parameter must be set manually. If its value is higher than the number of data points
-        in the DataFrame, t-SNE will raise an error.
+        The t-SNE processor is created in `preprocess_raw_text`, because its perplexity must stay below
+        the number of distinct documents, which is only known after near-duplicates are collapsed.
         If the user provides an incorrect value for num_features or num_clusters, the last valid parameters will be used instead.
         """
         if st.session_state.max_features is None:
             st.session_state.max_features = 10
         if st.session_state.num_clusters is None:
             st.session_state.num_clusters = 8
-        n_samples = len(st.session_state.pmid_df)
-        perplexity = min(MainApp.PERPLEXITY_MIN, n_samples - 1)
-
-        st.session_state.tsne_processor = ProcessorFactory.get_processor("tsne",perplexity=perplexity)
+        st.session_state.dedup_processor = ProcessorFactory.get_processor("dedup", threshold=MainApp.DEDUP_THRESHOLD)
         st.session_state.kmeans_processor = ProcessorFactory.get_processor("kmeans",n_clusters=st.session_state.num_clusters)
         st.session_state.tfidf_processor = ProcessorFactory.get_processor("tfidf",max_features=st.session_state.max_features)
 
-    @staticmethod
-    def preprocess_raw_text() -> None:
+    def preprocess_raw_text(self) -> None:
         """
         Main function for processing raw text from a DataFrame into 3D points.
         Steps:
         1) Handle and remove semi-duplicated 'Experiment_type' entries.
         2) Concatenate all relevant columns.
         3) Set the 'is_selected' column to 1 by default (ensuring no points have lower opacity).
-        4) Apply TF-IDF to the concatenated text.
-        5) Reduce dimensionality to 3D.
-        6) Fit the KMeans algorithm and store the resulting labels in st.session_state.
+        4) Collapse near-duplicate documents (e.g. SuperSeries and their SubSeries) into one representative.
+        5) Apply TF-IDF to the concatenated text of the representatives.
+        6) Reduce dimensionality to 3D progressively: starting from a PCA projection, every intermediate
+           t-SNE layout is clustered, stored in st.session_state and drawn in the Visualization tab.
+        7) Fit the KMeans algorithm, then expand the points and labels back to every row and store them in st.session_state.
+           The number of clusters is lowered to the number of representatives if there are fewer, with a warning.
+
+        Pressing "Stop refining" reruns the app, which interrupts the optimization and keeps the last layout.
+        With "Cluster overview first", steps 6-7 are replaced by `set_overview`: no global t-SNE is computed.
+
+        :raises ValueError: If fewer than two distinct datasets remain after step 4; the error is also displayed.
+        """
+        with measure("preprocess.total"):
+            st.session_state.pmid_df = st.session_state.remove_punctuation.process(st.session_state.pmid_df)
+            inverse = st.session_state.dedup_processor.process(st.session_state.pmid_df["Text"])
+            representatives = st.session_state.dedup_processor.representatives
+            if len(representatives) < 2:
+                message = "At least two distinct datasets are required to compute an embedding."
+                st.session_state.success_flag = False
+                self.update_on_error(message=message)
+                raise ValueError(message)
+            n_clusters = min(st.session_state.num_clusters, len(representatives))
+            if n_clusters < st.session_state.num_clusters:
+                self.error_placeholder.warning(f"Only {len(representatives)} distinct datasets, so {n_clusters} "
+                                               f"clusters are used instead of {st.session_state.num_clusters}.")
+            st.session_state.current_num_clusters = n_clusters
+            st.session_state.kmeans_processor = ProcessorFactory.get_processor("kmeans", n_clusters=n_clusters)
+            st.session_state.pmid_df["Duplicate_group"] = inverse
+            st.session_state.dataset_hash = MainApp.hash_dataset(st.session_state.pmid_df)
+            perplexity = min(MainApp.PERPLEXITY_MIN, len(representatives) - 1)
+            st.session_state.tsne_processor = ProcessorFactory.get_processor("progressive_tsne",perplexity=perplexity)
+            features = st.session_state.tfidf_processor.process(st.session_state.pmid_df["Text"].iloc[representatives])
+            st.session_state.map_cluster = None
+            if st.session_state.hierarchical:
+                self.set_overview(features, inverse)
+                return
+            st.session_state.map_processor = None
+            with self.layout_placeholder.container():
+                st.button("Stop refining", key="stop_refining")
+                status = st.empty()
+                plot = st.empty()
+            for layout, step, n_steps in st.session_state.tsne_processor.iter_layouts(features):
+                self.set_layout(layout, inverse, final=step == n_steps)
+                if step < n_steps:
+                    with measure("visualization.layout_step"):
+                        status.caption(f"Refining layout: step {step} of {n_steps}")
+                        plot.plotly_chart(self.get_cached_figure(), key=f"layout_step_{step}")
+        self.layout_placeholder.empty()
+
+    @staticmethod
+    def set_overview(features: np.ndarray, inverse: np.ndarray) -> None:
+        """
+        Clusters the representatives coarsely (see HierarchicalMapProcessor) and stores, for every row,
+        its top-level cluster as the label and the cluster centroid as the point. Detailed layouts of
+        single clusters are computed when they are opened in the Visualization tab.
+        """
+        processor = ProcessorFactory.get_processor("hierarchical_map", n_clusters=st.session_state.current_num_clusters,
+                                                   n_sub_clusters=st.session_state.current_num_clusters,
+                                                   perplexity=MainApp.PERPLEXITY_MIN)
+        labels = processor.process(features)
+        st.session_state.map_processor = processor
+        st.session_state.current_X = processor.centroids[labels][inverse]
+        st.session_state.current_labels = labels.astype(str)[inverse]
+        st.session_state.label_version += 1
+        st.session_state.figure_cache.clear()
+        st.session_state.success_flag = True
+
+    @staticmethod
+    def get_view() -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Returns the rows to draw, with their points and labels: every row with the current layout, or,
+        when a cluster is opened in the overview mode, the rows of that cluster with its detailed layout.
+        """
+        processor = st.session_state.map_processor
+        cluster = st.session_state.get("map_cluster")
+        if processor is None or cluster is None:
+            return np.arange(len(st.session_state.pmid_df)), st.session_state.current_X, st.session_state.current_labels
+        members, layout, labels = processor.drill_down(cluster)
+        # position of every representative among the cluster's members, -1 for the other clusters
+        positions = np.full(len(processor.labels), -1)
+        positions[members] = np.arange(len(members))
+        row_positions = positions[st.session_state.pmid_df["Duplicate_group"].to_numpy()]
+        rows = np.flatnonzero(row_positions >= 0)
+        return rows, layout[row_positions[rows]], labels.astype(str)[row_positions[rows]]
+
+    @staticmethod
+    def set_layout(layout: np.ndarray, inverse: np.ndarray, final: bool = True) -> None:
+        """
+        Clusters a (possibly intermediate) layout of the representatives and stores the points
+        and labels of every row as the current result.
+        Only the final layout's clustering is timed as "preprocess.kmeans", so the stage stays comparable
+        with EmbeddingPipeline's; intermediate ones are timed as "preprocess.layout_step.kmeans".
+        """
+        if final:
+            st.session_state.kmeans_processor.process(layout)
+        else:
+            with measure("preprocess.layout_step.kmeans"):
+                st.session_state.kmeans_processor.cluster.fit(layout)
+        st.session_state.current_X = layout[inverse]
+        st.session_state.current_labels = st.session_state.kmeans_processor.cluster.labels_.astype(str)[inverse]
+        st.session_state.label_version += 1
+        st.session_state.figure_cache.clear()
+        st.session_state.success_flag = True
+
+    @staticmethod
+    def hash_dataset(df: pd.DataFrame) -> str:
+        """
+        Content hash of the dataset rows, part of the figure cache key.
         """
-        st.session_state.pmid_df = st.session_state.remove_punctuation.process(st.session_state.pmid_df)
-        st.session_state.current_X = st.session_state.tfidf_processor.process(st.session_state.pmid_df["Text"])
-        st.session_state.current_X = st.session_state.tsne_processor.process(st.session_state.current_X)
-        st.session_state.kmeans_processor.process(st.session_state.current_X)
-        st.session_state.current_labels = st.session_state.kmeans_processor.cluster.labels_.astype(str)
+        row_hashes = pd.util.hash_pandas_object(df[["Pmid", "Geo_dataset_ind", "Text"]], index=False)
+        return hashlib.sha1(row_hashes.to_numpy().tobytes()).hexdigest()
 
     # ----------------------------------- Visualization -----------------------------------
-    def load_3d_plot(self, key) -> go.Figure:
+    def get_cached_figure(self) -> "go.Figure":
+        """
+        Returns the 3D figure for the current dataset, labels and selection, building it only on a cache miss.
+        The cache is kept per session and holds the last FIGURE_CACHE_SIZE figures, so switching back
+        to a previous selection is free as well.
+        """
+        key = (st.session_state.dataset_hash, st.session_state.label_version, st.session_state.selection,
+               st.session_state.get("map_cluster"))
+        cache = st.session_state.figure_cache
+        if key in cache:
+            cache.move_to_end(key)
+            return cache[key]
+        if st.session_state.map_processor is None:
+            figure = self.load_3d_plot("3d_plot_selected")
+        elif key[-1] is None:
+            figure = self.load_overview_plot()
+        else:
+            with st.spinner("Computing the layout of the cluster"):
+                figure = self.load_3d_plot("3d_plot_selected")
+        cache[key] = figure
+        while len(cache) > MainApp.FIGURE_CACHE_SIZE:
+            cache.popitem(last=False)
+        return figure
+
+    @timed("visualization.figure")
+    def load_3d_plot(self, key) -> "go.Figure":
         """
         Main function responsible for displaying interactive 3D plot visualizing
-        layout of the data points in 3D space.
+        layout of the data points in 3D space (the rows returned by `get_view`).
 
         :return go.Figure: prepared 3D plot ready to display
         """
+        import plotly.graph_objects as go
+        rows, X, labels = self.get_view()
+        df = st.session_state.pmid_df.iloc[rows]
+        is_selected = df["is_selected"].to_numpy() == 1
         # setting list of colors for each point in the dataframe
-        self.set_colors_and_opacity()
-        #creating hover text for these points that were selected by user
-        hover_text_selected = self._create_hover_text(is_selected=1)
-        hover_text_not_selected = self._create_hover_text(is_selected=0)
+        colors = self.get_colors(labels, is_selected)
         # set of selected points with opacity 1
-        trace1 = self._create_trace(is_selected=1, opacity=1, hover_text=hover_text_selected)
-        trace2 = self._create_trace(is_selected=0, opacity=0.08, hover_text=hover_text_not_selected)
+        trace1 = self._create_trace(df[is_selected], X[is_selected], colors[is_selected], opacity=1)
+        trace2 = self._create_trace(df[~is_selected], X[~is_selected], colors[~is_selected], opacity=0.08)
 
         fig = go.Figure()
         fig.add_trace(trace1)
@@ -374,68 +772,92 @@ class MainApp(Observer):
             width=MainApp.PLOT_WIDTH,height=MainApp.PLOT_HEIGHT,showlegend=False)
         return fig
 
+    @timed("visualization.figure")
+    def load_overview_plot(self) -> "go.Figure":
+        """
+        3D plot of the cluster overview: one marker per top-level cluster at its centroid, sized by
+        the number of datasets. Clusters without selected datasets are faded.
+        """
+        import plotly.graph_objects as go
+        processor = st.session_state.map_processor
+        labels = st.session_state.current_labels.astype(int)
+        sizes = np.bincount(labels, minlength=len(processor.sizes))
+        selected = np.bincount(labels, weights=st.session_state.pmid_df["is_selected"].to_numpy(),
+                               minlength=len(processor.sizes)).astype(int)
+        clusters = np.flatnonzero(sizes)
+        terms = processor.top_terms(st.session_state.tfidf_processor.vectorizer.get_feature_names_out())
+        colors = self.get_colors(clusters.astype(str), selected[clusters] > 0)
+        fig = go.Figure(go.Scatter3d(
+            x=processor.centroids[clusters, 0],
+            y=processor.centroids[clusters, 1],
+            z=processor.centroids[clusters, 2],
+            mode="markers+text",
+            text=[str(cluster) for cluster in clusters],
+            marker=dict(color=colors, size=10 + 40 * np.sqrt(sizes[clusters] / sizes.max()), opacity=0.8),
+            hovertext=[f"<b>Cluster {cluster}</b><br>Datasets: {sizes[cluster]} ({selected[cluster]} selected)"
+                       f"<br>Terms: {', '.join(terms[cluster])}" for cluster in clusters],
+            hoverinfo="text",
+        ))
+        fig.update_layout(scene=dict(xaxis_title='X',yaxis_title='Y',zaxis_title='Z'),
+            width=MainApp.PLOT_WIDTH,height=MainApp.PLOT_HEIGHT,showlegend=False)
+        return fig
+
     @staticmethod
-    def _create_hover_text(is_selected: int) -> list[str]:
+    def _create_hover_text(df: pd.DataFrame) -> list[str]:
         hover_text_selected = [
-            f"<b>{row['Title']}</b><br>GSE Code: {row['GSE_code']}<br>PMID: {row['Pmid']}<br>Organism: {row['Organism']}<br>Experiment_type: {row['Experiment_type']}"
-            for _, row in st.session_state.pmid_df[st.session_state.pmid_df["is_selected"] == is_selected].iterrows()
+            f"<b>{title}</b><br>GSE Code: {gse_code}<br>PMID: {pmid}<br>Organism: {organism}<br>Experiment_type: {experiment_type}"
+            for title, gse_code, pmid, organism, experiment_type
+            in zip(df['Title'], df['GSE_code'], df['Pmid'], df['Organism'], df['Experiment_type'])
         ]
         return hover_text_selected
 
-    @staticmethod
-    def _create_trace(is_selected: int,opacity: float,hover_text: list[str]) -> go.Scatter3d:
+    @classmethod
+    def _create_trace(cls,df: pd.DataFrame,X: np.ndarray,colors: np.ndarray,opacity: float) -> "go.Scatter3d":
+        import plotly.graph_objects as go
         return go.Scatter3d(
-            x=st.session_state.current_X[st.session_state.pmid_df["is_selected"] == is_selected, 0],
-            y=st.session_state.current_X[st.session_state.pmid_df["is_selected"] == is_selected, 1],
-            z=st.session_state.current_X[st.session_state.pmid_df["is_selected"] == is_selected, 2],
+            x=X[:, 0],
+            y=X[:, 1],
+            z=X[:, 2],
             mode='markers',
             marker=dict(
-                color=st.session_state.pmid_df["colors"][st.session_state.pmid_df["is_selected"] == is_selected],
+                color=colors,
                 size=8,
                 opacity=opacity
             ),
-            hovertext=hover_text,
+            hovertext=cls._create_hover_text(df),
             hoverinfo='text',
         )
     @classmethod
-    def set_colors_and_opacity(cls) -> None:
+    def get_colors(cls, labels: np.ndarray, is_selected: np.ndarray) -> np.ndarray:
         """
         Function assigns color and opacity to each label from the KMeans algorithm.
         To easly distingush points that satisfied filter conditions, points that were not selected
         """
+        import plotly.express as px
         unique_labels = np.arange(0, st.session_state.current_num_clusters,1).astype(str)
         colors = px.colors.qualitative.Alphabet
         color_palette = colors[:len(unique_labels)]
         # mapping from unique_labels to color
         map_dict = dict(zip(unique_labels, color_palette))
-        #assigning color to each point based on its label
-        list_of_colors = [map_dict[label] for label in st.session_state.current_labels]
-        idx = 0
-        color_palette_final = []
-        # looping through all points in dataframe and
+        #assigning color to each point based on its label and
         # setting opacity based on whether they were selected by user or not
-        for col in list_of_colors:
-            if st.session_state.pmid_df["is_selected"].iloc[idx] == 1:
-                color_palette_final.append(cls.hex_to_rgba(col, alpha=1))
-            else:
-                color_palette_final.append(cls.hex_to_rgba(col, alpha=0.2))
-            idx += 1
-        st.session_state.pmid_df["colors"] = color_palette_final
+        return np.array([cls.hex_to_rgba(map_dict[label], alpha=1 if selected else 0.2)
+                         for label, selected in zip(labels, is_selected)], dtype=object)
 
     @staticmethod
     def load_css_styles() -> None:
         """
         Load CSS styles responsible for setting a fixed sidebar width.
         """
-        css_path = os.path.abspath(os.path.join(os.path.dirname(__file__), 'Static', 'style.css'))
-        with open(css_path) as css:
-            st.markdown(f"<style>{css.read()}</style>", unsafe_allow_html=True)
+        st.markdown(f"<style>{read_static_file('Static', 'style.css')}</style>", unsafe_allow_html=True)
 
     @staticmethod
+    @functools.lru_cache(maxsize=256)
     def hex_to_rgba(hex_color, alpha) -> str:
         """
         Converting hex color format to rgb
         """
+        import matplotlib.colors as mcolors
         rgba = mcolors.to_rgba(hex_color, alpha)
         return f'rgb({int(rgba[0] * 255)}, {int(rgba[1] * 255)}, {int(rgba[2] * 255)})'
 
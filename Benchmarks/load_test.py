@@ -0,0 +1,558 @@
+"""
+Concurrent-session load test of the Streamlit app.
+
+Starts the app (Benchmarks/load_test_app.py) in a `streamlit run` server whose NCBI requests go to a local
+mock (MockNCBI), and drives N simulated browser sessions through a scripted flow of actions over Streamlit's
+websocket protocol, the way the frontend does:
+
+- upload:     uploads a file of PMIDS_PER_UPLOAD fresh PMIDs and clicks "Load PMIDs file" (fetch + preprocessing)
+- load_toy:   clicks "Load toy dataset"
+- filter:     selects a random organism and clicks "Filter"
+- recluster:  sets a random number of clusters and reloads the last saved dataset
+- overview:   loads the toy dataset in the cluster overview mode and opens its largest cluster
+
+While the sessions run, the CPU time and resident memory of the server process are sampled from /proc
+(Linux only). The report contains per-action latency percentiles, CPU saturation, memory growth per session
+and the number of mock NCBI requests per endpoint.
+
+    python -m Benchmarks.load_test --sessions 8 --flow upload,filter,recluster,load_toy,filter --output load.json
+    python -m Benchmarks.load_test --sessions 4 --ncbi-latency 0.2 --ncbi-error-rate 0.05
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import sys
+import tempfile
+import time
+import uuid
+from collections import Counter, defaultdict
+import numpy as np
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+APP = os.path.join(ROOT, "Benchmarks", "load_test_app.py")
+
+FLOW = ("upload", "filter", "recluster", "load_toy", "filter")
+ACTIONS = ("upload", "load_toy", "filter", "recluster", "overview")
+PMIDS_PER_UPLOAD = 40
+SAMPLE_INTERVAL = 0.5
+ACTION_TIMEOUT = 900
+"""
+Share of one core above which a CPU sample counts as saturated: script runs share the GIL,
+so the app is saturated well before all cores are busy.
+"""
+SATURATION = 0.9
+
+
+class MockNCBI:
+    """
+    Local stand-in for the three endpoints used by PubMedAPI (ELink, ESummary and GEO's acc.cgi):
+    - PMIDs divisible by 5 have no datasets, the others link `datasets_per_pmid` datasets,
+    - titles, summaries, organisms, experiment types and Overall Designs are rows of a SyntheticCorpus,
+      picked by dataset id, so every upload gets realistic, mostly distinct texts,
+    - every response is delayed by `latency` seconds, and `error_rate` of them fail with 503.
+    """
+    def __init__(self, corpus_size: int = 5000, datasets_per_pmid: int = 2, latency: float = 0.05,
+                 error_rate: float = 0.0, seed: int = 0):
+        from Benchmarks.preprocessing_benchmark import SyntheticCorpus
+        self.corpus = SyntheticCorpus(seed=seed).generate(corpus_size).to_dict("records")
+        self.datasets_per_pmid = datasets_per_pmid
+        self.latency = latency
+        self.error_rate = error_rate
+        self.rng = random.Random(seed)
+        self.requests = Counter()
+        self._runner = None
+
+    async def start(self) -> str:
+        """
+        Starts the server on a free local port and returns its base URL.
+        """
+        from aiohttp import web
+        app = web.Application()
+        app.router.add_route("*", "/entrez/eutils/elink.fcgi", self._endpoint(self._elink))
+        app.router.add_route("*", "/entrez/eutils/esummary.fcgi", self._endpoint(self._esummary))
+        app.router.add_route("*", "/geo/query/acc.cgi", self._endpoint(self._overall_design))
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, "127.0.0.1", 0)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        return f"http://127.0.0.1:{port}"
+
+    async def stop(self) -> None:
+        if self._runner is not None:
+            await self._runner.cleanup()
+
+    def _endpoint(self, handler):
+        from aiohttp import web
+
+        async def handle(request):
+            name = request.path.rsplit("/", 1)[-1]
+            self.requests[name] += 1
+            params = dict(request.query)
+            ids = request.query.getall("id", [])
+            if request.method == "POST":
+                form = await request.post()
+                params.update(form)
+                ids += form.getall("id", [])
+            ids = [int(idx) for value in ids for idx in str(value).split(",") if idx.strip()]
+            if self.latency:
+                await asyncio.sleep(self.latency)
+            if self.rng.random() < self.error_rate:
+                self.requests[f"{name} (503)"] += 1
+                return web.Response(status=503)
+            body, content_type = handler(ids, params)
+            return web.Response(body=body, content_type=content_type)
+        return handle
+
+    def dataset_indices(self, pmid: int) -> list[int]:
+        if pmid % 5 == 0:
+            return []
+        return [200_000_000 + (pmid % 10_000_000) * 10 + k for k in range(self.datasets_per_pmid)]
+
+    def _row(self, dataset_idx: int) -> dict:
+        return self.corpus[(dataset_idx * 2654435761) % len(self.corpus)]
+
+    def _elink(self, ids: list[int], params: dict) -> tuple[bytes, str]:
+        linksets = []
+        for pmid in ids:
+            indices = self.dataset_indices(pmid)
+            linkset = {"dbfrom": "pubmed", "ids": [str(pmid)]}
+            if indices:
+                linkset["linksetdbs"] = [{"dbto": "gds", "linkname": "pubmed_gds", "links": [str(i) for i in indices]}]
+            linksets.append(linkset)
+        return json.dumps({"header": {"type": "elink"}, "linksets": linksets}).encode(), "application/json"
+
+    def _esummary(self, ids: list[int], params: dict) -> tuple[bytes, str]:
+        result = {"uids": [str(idx) for idx in ids]}
+        for idx in ids:
+            row = self._row(idx)
+            result[str(idx)] = {"uid": str(idx), "accession": f"GSE{idx - 200_000_000}", "title": row["Title"],
+                                "summary": row["Summary"], "taxon": row["Organism"], "gdstype": row["Experiment_type"]}
+        return json.dumps({"header": {"type": "esummary"}, "result": result}).encode(), "application/json"
+
+    def _overall_design(self, ids: list[int], params: dict) -> tuple[bytes, str]:
+        from xml.sax.saxutils import escape
+        accession = params.get("acc", "GSE0")
+        design = self._row(200_000_000 + int(accession[3:] or 0))["Overall_design"]
+        body = (f'<?xml version="1.0" encoding="UTF-8"?><MINiML><Series iid="{escape(accession)}">'
+                f"<Overall-Design>{escape(str(design))}</Overall-Design></Series></MINiML>")
+        return body.encode(), "text/xml"
+
+
+class SimulatedSession:
+    """
+    One browser tab of the app, talking to the server over Streamlit's websocket protocol.
+
+    Every action sends a `rerun_script` BackMsg with the states of the widgets it changed (and the
+    trigger of the clicked button), then collects the elements of the run until the script finishes.
+    Runs ending in `st.rerun()` are followed to the end, so an action's latency covers everything
+    the user waits for. Widget values set by earlier actions are sent again on every rerun, like the
+    frontend does; widgets are found by their label.
+    """
+    def __init__(self, http, base_url: str, index: int, seed: int = 0, pmids_per_upload: int = PMIDS_PER_UPLOAD):
+        self.http = http
+        self.base_url = base_url
+        self.index = index
+        self.rng = random.Random(seed * 10_007 + index)
+        self.pmids_per_upload = pmids_per_upload
+        self.uploads = 0
+        self.session_id = None
+        self.elements = {}
+        self.values = {}
+        self.latencies = defaultdict(list)
+        self.errors = Counter()
+        self.alerts = Counter()
+        self._ws = None
+        self._reader = None
+        self._finished = None
+        self._file_urls = {}
+
+    # ----------------------------------- Protocol -----------------------------------
+
+    async def connect(self) -> None:
+        self._ws = await self.http.ws_connect(f"{self.base_url.replace('http', 'ws', 1)}/_stcore/stream",
+                                              protocols=("streamlit",), max_msg_size=0)
+        self._reader = asyncio.create_task(self._read())
+        await self.rerun()
+
+    async def close(self) -> None:
+        if self._ws is not None:
+            await self._ws.close()
+        if self._reader is not None:
+            await asyncio.gather(self._reader, return_exceptions=True)
+
+    async def _read(self) -> None:
+        from aiohttp import WSMsgType
+        from streamlit.proto.ForwardMsg_pb2 import ForwardMsg
+        async for message in self._ws:
+            if message.type != WSMsgType.BINARY:
+                continue
+            msg = ForwardMsg()
+            msg.ParseFromString(message.data)
+            kind = msg.WhichOneof("type")
+            if kind == "new_session":
+                self.session_id = msg.new_session.initialize.session_id
+                self.elements = {}
+            elif kind == "delta" and msg.delta.WhichOneof("type") == "new_element":
+                self.elements[tuple(msg.metadata.delta_path)] = msg.delta.new_element
+            elif kind == "file_urls_response" and msg.file_urls_response.response_id in self._file_urls:
+                self._file_urls[msg.file_urls_response.response_id].set_result(msg.file_urls_response)
+            elif kind == "script_finished" and msg.script_finished != ForwardMsg.FINISHED_EARLY_FOR_RERUN:
+                if self._finished is not None and not self._finished.done():
+                    self._finished.set_result(msg.script_finished)
+
+    async def rerun(self, triggers: tuple[str, ...] = ()) -> None:
+        """
+        Reruns the script with the stored widget values and the given buttons clicked,
+        and waits until the run (and the reruns it requests) finishes.
+        """
+        from streamlit.proto.BackMsg_pb2 import BackMsg
+        msg = BackMsg()
+        msg.rerun_script.query_string = ""
+        for label, value in self.values.items():
+            widget = self.widget(label, required=False)
+            if widget is not None:
+                msg.rerun_script.widget_states.widgets.append(self._widget_state(widget, value))
+        for label in triggers:
+            state = msg.rerun_script.widget_states.widgets.add()
+            state.id = self.widget(label).id
+            state.trigger_value = True
+        self._finished = asyncio.get_running_loop().create_future()
+        await self._ws.send_bytes(msg.SerializeToString())
+        await asyncio.wait_for(self._finished, ACTION_TIMEOUT)
+
+    def widget(self, label: str, required: bool = True):
+        """
+        Returns the proto of the widget with the given label in the last run.
+        """
+        for element in self.elements.values():
+            kind = element.WhichOneof("type")
+            proto = getattr(element, kind)
+            if getattr(proto, "label", None) == label and getattr(proto, "id", None):
+                return proto
+        if required:
+            raise LookupError(f"No widget labelled {label!r}")
+        return None
+
+    @staticmethod
+    def _widget_state(widget, value):
+        from streamlit.proto.NumberInput_pb2 import NumberInput
+        from streamlit.proto.WidgetStates_pb2 import WidgetState
+        state = WidgetState(id=widget.id)
+        kind = type(widget).__name__
+        if kind == "Selectbox":
+            state.int_value = list(widget.options).index(value)
+        elif kind == "NumberInput":
+            if widget.data_type == NumberInput.INT:
+                state.int_value = int(value)
+            else:
+                state.double_value = float(value)
+        elif kind == "Checkbox":
+            state.bool_value = bool(value)
+        elif kind == "FileUploader":
+            state.file_uploader_state_value.CopyFrom(value)
+        return state
+
+    def _record_run(self, action: str) -> None:
+        for element in self.elements.values():
+            kind = element.WhichOneof("type")
+            if kind == "exception":
+                self.errors[f"{action}: {element.exception.type}: {element.exception.message}"] += 1
+            elif kind == "alert" and element.alert.format == element.alert.ERROR:
+                self.alerts[action] += 1
+
+    async def upload_file(self, label: str, name: str, content: bytes) -> None:
+        """
+        Uploads a file like the frontend: asks for an upload URL, PUTs the file there and
+        stores the uploader state, which is sent with the next reruns.
+        """
+        import aiohttp
+        from streamlit.proto.BackMsg_pb2 import BackMsg
+        from streamlit.proto.Common_pb2 import FileUploaderState
+        request_id = uuid.uuid4().hex
+        response = self._file_urls[request_id] = asyncio.get_running_loop().create_future()
+        msg = BackMsg()
+        msg.file_urls_request.request_id = request_id
+        msg.file_urls_request.file_names.append(name)
+        msg.file_urls_request.session_id = self.session_id
+        await self._ws.send_bytes(msg.SerializeToString())
+        try:
+            file_urls = (await asyncio.wait_for(response, ACTION_TIMEOUT)).file_urls[0]
+        finally:
+            del self._file_urls[request_id]
+        form = aiohttp.FormData()
+        form.add_field("file", content, filename=name, content_type="text/plain")
+        async with self.http.put(f"{self.base_url}{file_urls.upload_url}", data=form) as response:
+            response.raise_for_status()
+        state = FileUploaderState(max_file_id=0)
+        info = state.uploaded_file_info.add()
+        info.file_id = file_urls.file_id
+        info.name = name
+        info.size = len(content)
+        info.file_urls.CopyFrom(file_urls)
+        self.values[label] = state
+
+    # ----------------------------------- Actions -----------------------------------
+
+    async def perform(self, action: str) -> None:
+        start = time.perf_counter()
+        try:
+            await getattr(self, f"action_{action}")()
+        except (LookupError, ValueError, asyncio.TimeoutError) as e:
+            self.errors[f"{action}: {type(e).__name__}: {e}"] += 1
+            return
+        self.latencies[action].append(time.perf_counter() - start)
+        self._record_run(action)
+
+    async def action_upload(self) -> None:
+        first = 30_000_000 + self.index * 100_000 + self.uploads * self.pmids_per_upload
+        self.uploads += 1
+        content = "\n".join(str(pmid) for pmid in range(first, first + self.pmids_per_upload)).encode()
+        await self.upload_file("Choose a file", "pmids.txt", content)
+        await self.rerun()
+        await self.rerun(triggers=("Load PMIDs file",))
+
+    async def action_load_toy(self) -> None:
+        await self.rerun(triggers=("Load toy dataset",))
+
+    async def action_filter(self) -> None:
+        options = [option for option in self.widget("Organism").options if option != "<select>"]
+        if not options:
+            raise LookupError("No organisms to filter by")
+        self.values["Organism"] = self.rng.choice(options)
+        await self.rerun(triggers=("Filter",))
+
+    async def action_recluster(self) -> None:
+        self.values["Enter a number of clusters"] = self.rng.randint(3, 12)
+        self.values.pop("Organism", None)
+        await self.rerun(triggers=("Load previously saved dataset",))
+
+    async def action_overview(self) -> None:
+        self.values["Cluster overview first"] = True
+        self.values.pop("Organism", None)
+        await self.rerun()
+        await self.rerun(triggers=("Load toy dataset",))
+        clusters = self.widget("Cluster").options
+        largest = max(clusters[1:], key=lambda name: int(name.split(": ")[1].split()[0]))
+        self.values["Cluster"] = largest
+        await self.rerun()
+        del self.values["Cluster"], self.values["Cluster overview first"]
+
+
+# ----------------------------------- Server process -----------------------------------
+
+class ProcessSampler:
+    """
+    Samples the CPU time and resident memory of a process from /proc every SAMPLE_INTERVAL seconds.
+    """
+    def __init__(self, pid: int):
+        self.pid = pid
+        self.ticks = os.sysconf("SC_CLK_TCK")
+        self.cores = []
+        self.rss = []
+        self._task = None
+
+    def cpu_seconds(self) -> float:
+        with open(f"/proc/{self.pid}/stat") as f:
+            fields = f.read().rsplit(")", 1)[1].split()
+        return (int(fields[11]) + int(fields[12])) / self.ticks
+
+    def rss_bytes(self) -> int:
+        with open(f"/proc/{self.pid}/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) * 1024
+        return 0
+
+    async def _run(self) -> None:
+        last_cpu, last_time = self.cpu_seconds(), time.perf_counter()
+        while True:
+            await asyncio.sleep(SAMPLE_INTERVAL)
+            cpu, now = self.cpu_seconds(), time.perf_counter()
+            self.cores.append((cpu - last_cpu) / (now - last_time))
+            self.rss.append(self.rss_bytes())
+            last_cpu, last_time = cpu, now
+
+    def start(self) -> None:
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        self._task.cancel()
+        await asyncio.gather(self._task, return_exceptions=True)
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+async def start_server(mock_url: str, checkpoint_dir: str):
+    """
+    Starts `streamlit run` on the load test entry script and waits until it is healthy.
+    """
+    import aiohttp
+    port = _free_port()
+    env = dict(os.environ, PUBTRENDS_MOCK_NCBI=mock_url, PUBTRENDS_CHECKPOINT_DIR=checkpoint_dir,
+               PUBTRENDS_TRACK_MEMORY=os.environ.get("PUBTRENDS_TRACK_MEMORY", "0"),
+               # large messages would otherwise be replaced by references to the browser's message cache
+               STREAMLIT_GLOBAL_MIN_CACHED_MESSAGE_SIZE="1e12")
+    env.pop("PUBTRENDS_GEO_MIRROR", None)
+    process = await asyncio.create_subprocess_exec(
+        sys.executable, "-m", "streamlit", "run", APP, "--server.headless", "true", "--server.port", str(port),
+        "--server.address", "127.0.0.1", "--server.enableXsrfProtection", "false", "--server.enableCORS", "false",
+        "--server.fileWatcherType", "none", "--browser.gatherUsageStats", "false",
+        cwd=ROOT, env=env, stdout=asyncio.subprocess.DEVNULL, stderr=asyncio.subprocess.DEVNULL)
+    base_url = f"http://127.0.0.1:{port}"
+    async with aiohttp.ClientSession() as http:
+        for _ in range(600):
+            try:
+                async with http.get(f"{base_url}/_stcore/health") as response:
+                    if response.status == 200:
+                        return process, base_url
+            except aiohttp.ClientError:
+                pass
+            if process.returncode is not None:
+                break
+            await asyncio.sleep(0.1)
+    process.kill()
+    raise RuntimeError("The Streamlit server did not start")
+
+
+# ----------------------------------- Load test -----------------------------------
+
+async def run_session(http, base_url: str, index: int, flow: list[str], args, delay: float) -> SimulatedSession:
+    await asyncio.sleep(delay)
+    session = SimulatedSession(http, base_url, index, seed=args.seed, pmids_per_upload=args.pmids_per_upload)
+    await session.connect()
+    for action in flow:
+        await session.perform(action)
+        await asyncio.sleep(args.think_time)
+    return session
+
+
+def summarize(sessions: list[SimulatedSession], sampler: ProcessSampler, baseline_rss: int, connected_rss: int,
+              mock: MockNCBI, wall_seconds: float, n_cores: int) -> dict:
+    latencies = defaultdict(list)
+    errors, alerts = Counter(), Counter()
+    for session in sessions:
+        for action, values in session.latencies.items():
+            latencies[action].extend(values)
+        errors.update(session.errors)
+        alerts.update(session.alerts)
+    actions = {}
+    for action, values in latencies.items():
+        values = np.array(values)
+        actions[action] = {"count": len(values), "mean": float(values.mean()),
+                           **{f"p{q}": float(np.percentile(values, q)) for q in (50, 90, 99)},
+                           "max": float(values.max()), "error_alerts": alerts[action]}
+    cores = np.array(sampler.cores) if sampler.cores else np.zeros(1)
+    return {
+        "sessions": len(sessions),
+        "wall_seconds": wall_seconds,
+        "actions": actions,
+        "errors": dict(errors),
+        "cpu": {"available_cores": n_cores, "mean_cores_used": float(cores.mean()),
+                "max_cores_used": float(cores.max()),
+                "saturated_share": float(np.mean(cores >= SATURATION)),
+                "all_cores_busy_share": float(np.mean(cores >= SATURATION * n_cores))},
+        "memory": {"baseline_rss_mib": baseline_rss / 2 ** 20,
+                   "peak_rss_mib": max(sampler.rss, default=connected_rss) / 2 ** 20,
+                   "connected_rss_mib": connected_rss / 2 ** 20,
+                   "growth_per_session_mib": (connected_rss - baseline_rss) / max(len(sessions), 1) / 2 ** 20},
+        "ncbi_requests": dict(mock.requests),
+    }
+
+
+async def run_load_test(args) -> dict:
+    """
+    Starts the mock and the server, warms the server up with one session (imports, caches),
+    then runs all sessions concurrently and returns the report.
+    """
+    import aiohttp
+    mock = MockNCBI(corpus_size=args.corpus_size, datasets_per_pmid=args.datasets_per_pmid,
+                    latency=args.ncbi_latency, error_rate=args.ncbi_error_rate, seed=args.seed)
+    mock_url = await mock.start()
+    with tempfile.TemporaryDirectory() as checkpoint_dir:
+        process, base_url = await start_server(mock_url, checkpoint_dir)
+        sampler = ProcessSampler(process.pid)
+        try:
+            async with aiohttp.ClientSession() as http:
+                if args.warmup:
+                    warmup = await run_session(http, base_url, args.sessions, args.flow, args, 0)
+                    await warmup.close()
+                mock.requests.clear()
+                baseline_rss = sampler.rss_bytes()
+                sampler.start()
+                start = time.perf_counter()
+                sessions = await asyncio.gather(*(
+                    run_session(http, base_url, index, args.flow, args, index * args.ramp_up / args.sessions)
+                    for index in range(args.sessions)))
+                wall_seconds = time.perf_counter() - start
+                connected_rss = sampler.rss_bytes()
+                await sampler.stop()
+                for session in sessions:
+                    await session.close()
+        finally:
+            process.terminate()
+            await process.wait()
+            await mock.stop()
+    return summarize(sessions, sampler, baseline_rss, connected_rss, mock, wall_seconds, os.cpu_count() or 1)
+
+
+def _print_summary(report: dict) -> None:
+    print(f"{report['sessions']} sessions in {report['wall_seconds']:.1f}s", file=sys.stderr)
+    for action, stats in report["actions"].items():
+        print(f"  {action:<10} n={stats['count']:<4} p50={stats['p50']:.2f}s p90={stats['p90']:.2f}s "
+              f"p99={stats['p99']:.2f}s max={stats['max']:.2f}s", file=sys.stderr)
+    cpu, memory = report["cpu"], report["memory"]
+    print(f"  cpu: {cpu['mean_cores_used']:.2f} cores on average, saturated {cpu['saturated_share']:.0%} of the time",
+          file=sys.stderr)
+    print(f"  memory: {memory['baseline_rss_mib']:.0f} MiB -> {memory['connected_rss_mib']:.0f} MiB "
+          f"({memory['growth_per_session_mib']:.1f} MiB per session)", file=sys.stderr)
+    for error, count in report["errors"].items():
+        print(f"  error x{count}: {error}", file=sys.stderr)
+
+
+def _parse_flow(value: str) -> list[str]:
+    flow = [action.strip() for action in value.split(",") if action.strip()]
+    unknown = set(flow) - set(ACTIONS)
+    if unknown:
+        raise argparse.ArgumentTypeError(f"Unknown actions {', '.join(sorted(unknown))}, expected {', '.join(ACTIONS)}")
+    return flow
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", type=int, default=4, help="Concurrent sessions")
+    parser.add_argument("--flow", type=_parse_flow, default=list(FLOW),
+                        help=f"Comma-separated actions of every session (default {','.join(FLOW)})")
+    parser.add_argument("--ramp-up", type=float, default=1.0, help="Seconds over which the sessions start")
+    parser.add_argument("--think-time", type=float, default=0.5, help="Pause between the actions of a session")
+    parser.add_argument("--pmids-per-upload", type=int, default=PMIDS_PER_UPLOAD, help="PMIDs of every upload")
+    parser.add_argument("--datasets-per-pmid", type=int, default=2, help="Datasets the mock links to every PMID")
+    parser.add_argument("--corpus-size", type=int, default=5000, help="Synthetic descriptions served by the mock")
+    parser.add_argument("--ncbi-latency", type=float, default=0.05, help="Mock NCBI response delay in seconds")
+    parser.add_argument("--ncbi-error-rate", type=float, default=0.0, help="Share of mock responses failing with 503")
+    parser.add_argument("--no-warmup", dest="warmup", action="store_false",
+                        help="Do not run one session through the flow before measuring")
+    parser.add_argument("--seed", type=int, default=0, help="Seed of the mock texts and the sessions' choices")
+    parser.add_argument("--output", help="Write the report as JSON to this file")
+    args = parser.parse_args(argv)
+    sys.path.insert(0, ROOT)
+
+    report = asyncio.run(run_load_test(args))
+    report["config"] = {key: value for key, value in vars(args).items() if key != "output"}
+    _print_summary(report)
+    print(json.dumps(report, indent=2))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    return 1 if report["errors"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
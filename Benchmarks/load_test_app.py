@@ -0,0 +1,23 @@
+"""
+Entry script of the Streamlit server started by Benchmarks.load_test.
+
+Identical to main.py, except that NCBI requests go to the mock server given in PUBTRENDS_MOCK_NCBI.
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from App.front_model import MainApp
+from PubMedAPI.pubmed_api import PubMedAPI
+
+MOCK_NCBI = os.environ["PUBTRENDS_MOCK_NCBI"]
+PubMedAPI.BASE_URL_DB_IDX = f"{MOCK_NCBI}/entrez/eutils/elink.fcgi"
+PubMedAPI.BASE_URL_SUMMARY = f"{MOCK_NCBI}/entrez/eutils/esummary.fcgi"
+PubMedAPI.BASE_URL_OVERALL_DESIGN = f"{MOCK_NCBI}/geo/query/acc.cgi"
+
+app = MainApp()
+app.load_css_styles()
+app.prepare_main_window()
+app.prepare_side_bar()
+app.prepare_tabs()
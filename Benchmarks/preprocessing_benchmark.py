@@ -0,0 +1,204 @@
+"""
+Preprocessing benchmark on synthetic GEO-like corpora.
+
+Generates tables with the PubMed_data.csv schema (1k, 10k and 100k rows by default) whose field lengths,
+vocabulary, organisms and experiment types follow the toy dataset, with a share of near-duplicate
+SubSeries-like rows and of datasets linked from several PMIDs. For every size and every
+max_features/n_clusters setting it runs EmbeddingPipeline and records, from MetricsRegistry,
+the wall time and peak traced memory of each stage separately (preprocess.text, .dedup, .tfidf, .tsne,
+.kmeans) and end to end (preprocess.total). Wall times and memory peaks come from separate passes,
+so timings do not include the tracing overhead.
+
+Results can be compared with a JSON baseline; the run fails (exit code 1) when a stage is slower or uses
+more memory than the baseline by more than the given thresholds. The committed baseline,
+Benchmarks/preprocessing_baseline.json, covers the 1k and 10k cases (cases missing from it are not checked);
+regenerate it with --update-baseline on the machine that runs the comparison, as timings depend on the hardware.
+
+    python -m Benchmarks.preprocessing_benchmark --sizes 1000,10000 --output results.json
+    python -m Benchmarks.preprocessing_benchmark --sizes 1000,10000 --baseline Benchmarks/preprocessing_baseline.json
+    python -m Benchmarks.preprocessing_benchmark --sizes 1000,10000 --update-baseline Benchmarks/preprocessing_baseline.json
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from collections import Counter
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+TOY_DATASET = os.path.join(ROOT, "PubMedAPI", "PubMed_data.csv")
+
+SIZES = (1_000, 10_000, 100_000)
+SETTINGS = ((10, 8), (50, 12))
+STAGES = ("preprocess.text", "preprocess.dedup", "preprocess.tfidf", "preprocess.tsne", "preprocess.kmeans",
+          "preprocess.total")
+TEXT_FIELDS = ("Title", "Summary", "Overall_design")
+DUPLICATE_RATE = 0.15
+SHARED_DATASET_RATE = 0.10
+TIME_THRESHOLD = 0.25
+MEMORY_THRESHOLD = 0.25
+"""
+Stages faster than this are not checked for time regressions, their timings are mostly noise
+"""
+MIN_CHECKED_SECONDS = 0.05
+
+
+class SyntheticCorpus:
+    """
+    Generates GEO-like tables modelled on the toy dataset:
+    - the word count of every text field is drawn from the toy dataset's word counts of that field,
+    - words are drawn from the toy vocabulary with their observed frequencies,
+    - organisms and experiment types are drawn from the toy values with their observed frequencies,
+    - DUPLICATE_RATE of the rows are SubSeries-like copies of an earlier row with SUFFIX_WORDS words appended,
+    - SHARED_DATASET_RATE of the rows repeat an earlier dataset under another PMID.
+    """
+    SUFFIX_WORDS = 3
+
+    def __init__(self, source: str = TOY_DATASET, duplicate_rate: float = DUPLICATE_RATE,
+                 shared_dataset_rate: float = SHARED_DATASET_RATE, seed: int = 0):
+        toy = pd.read_csv(source)
+        self.duplicate_rate = duplicate_rate
+        self.shared_dataset_rate = shared_dataset_rate
+        self.rng = np.random.default_rng(seed)
+        counts = Counter(word for field in TEXT_FIELDS for text in toy[field].fillna("") for word in str(text).split())
+        self.vocabulary = np.array(list(counts))
+        self.word_weights = np.array(list(counts.values()), dtype=float) / sum(counts.values())
+        self.lengths = {field: toy[field].fillna("").map(lambda text: max(len(str(text).split()), 1)).to_numpy()
+                        for field in TEXT_FIELDS}
+        self.organisms = toy["Organism"].value_counts(normalize=True)
+        self.experiment_types = toy["Experiment_type"].value_counts(normalize=True)
+
+    def _text(self, field: str, n: int, length: int | None = None) -> list[str]:
+        lengths = self.rng.choice(self.lengths[field], size=n) if length is None else np.full(n, length)
+        words = self.vocabulary[self.rng.choice(len(self.vocabulary), size=int(lengths.sum()), p=self.word_weights)]
+        bounds = np.concatenate(([0], np.cumsum(lengths)))
+        return [" ".join(words[start:end]) for start, end in zip(bounds[:-1], bounds[1:])]
+
+    def generate(self, n_rows: int) -> pd.DataFrame:
+        n_shared = int(n_rows * self.shared_dataset_rate)
+        n_datasets = n_rows - n_shared
+        df = pd.DataFrame({
+            "Pmid": np.arange(n_datasets) // 2 + 30_000_000,
+            "Geo_dataset_ind": np.arange(n_datasets) + 200_000_000,
+            "GSE_code": [f"GSE{idx}" for idx in range(100_000, 100_000 + n_datasets)],
+            **{field: self._text(field, n_datasets) for field in TEXT_FIELDS},
+            "Experiment_type": self.rng.choice(self.experiment_types.index, size=n_datasets,
+                                               p=self.experiment_types.to_numpy()),
+            "Organism": self.rng.choice(self.organisms.index, size=n_datasets, p=self.organisms.to_numpy()),
+        })
+        duplicates = np.flatnonzero(self.rng.random(n_datasets) < self.duplicate_rate)
+        duplicates = duplicates[duplicates > 0]
+        originals = (self.rng.random(len(duplicates)) * duplicates).astype(int)
+        for field in TEXT_FIELDS + ("Experiment_type", "Organism"):
+            df.loc[duplicates, field] = df[field].to_numpy()[originals]
+        df.loc[duplicates, "Summary"] = (df.loc[duplicates, "Summary"] + " "
+                                         + self._text("Summary", len(duplicates), SyntheticCorpus.SUFFIX_WORDS))
+        shared = df.iloc[self.rng.integers(0, n_datasets, size=n_shared)].copy()
+        shared["Pmid"] = np.arange(n_shared) + 40_000_000
+        return pd.concat([df, shared], ignore_index=True)
+
+
+def _run_pipeline(df: pd.DataFrame, max_features: int, n_clusters: int, tfidf_jobs: int,
+                  track_memory: bool) -> dict[str, dict]:
+    from Diagnostics.metrics import MetricsRegistry
+    from Preprocessing.pipeline import EmbeddingPipeline
+    registry = MetricsRegistry()
+    registry.set_track_memory(track_memory)
+    registry.reset()
+    EmbeddingPipeline(max_features=max_features, n_clusters=n_clusters, random_state=0,
+                      tfidf_jobs=tfidf_jobs).run(df.copy())
+    return {stage["stage"]: stage for stage in registry.snapshot() if stage["stage"] in STAGES}
+
+
+def run_case(df: pd.DataFrame, max_features: int, n_clusters: int, tfidf_jobs: int = 1) -> dict[str, dict[str, float]]:
+    """
+    Runs the pipeline twice: timings come from a pass without memory tracking, because tracemalloc
+    slows every allocation down, and peak memory from a second, traced pass.
+    """
+    timings = _run_pipeline(df, max_features, n_clusters, tfidf_jobs, track_memory=False)
+    memory = _run_pipeline(df, max_features, n_clusters, tfidf_jobs, track_memory=True)
+    return {name: {"seconds": stage["mean_seconds"], "peak_memory_bytes": memory[name]["peak_memory_bytes"]}
+            for name, stage in timings.items()}
+
+
+def run_benchmark(sizes: list[int], settings: list[tuple[int, int]], seed: int = 0,
+                  tfidf_jobs: int = 1) -> dict[str, dict]:
+    corpus = SyntheticCorpus(seed=seed)
+    results = {}
+    for size in sizes:
+        start = time.perf_counter()
+        df = corpus.generate(size)
+        print(f"generated {size} rows in {time.perf_counter() - start:.1f}s", file=sys.stderr)
+        for max_features, n_clusters in settings:
+            name = f"rows={size},max_features={max_features},n_clusters={n_clusters}"
+            results[name] = run_case(df, max_features, n_clusters, tfidf_jobs)
+            print(f"{name}: {results[name]['preprocess.total']['seconds']:.2f}s", file=sys.stderr)
+    return results
+
+
+def compare(results: dict, baseline: dict, time_threshold: float, memory_threshold: float) -> list[str]:
+    """
+    Lists the stages that regressed against the baseline by more than the thresholds (relative increase).
+    Cases missing from the baseline are not checked.
+    """
+    failures = []
+    for case, stages in results.items():
+        for stage, measured in stages.items():
+            expected = baseline.get(case, {}).get(stage)
+            if expected is None:
+                continue
+            if (expected["seconds"] >= MIN_CHECKED_SECONDS
+                    and measured["seconds"] > expected["seconds"] * (1 + time_threshold)):
+                failures.append(f"{case} {stage}: {measured['seconds']:.3f}s > baseline "
+                                f"{expected['seconds']:.3f}s + {time_threshold:.0%}")
+            if (expected["peak_memory_bytes"]
+                    and measured["peak_memory_bytes"] > expected["peak_memory_bytes"] * (1 + memory_threshold)):
+                failures.append(f"{case} {stage}: {measured['peak_memory_bytes'] / 2 ** 20:.1f} MiB > baseline "
+                                f"{expected['peak_memory_bytes'] / 2 ** 20:.1f} MiB + {memory_threshold:.0%}")
+    return failures
+
+
+def _parse_settings(value: str) -> list[tuple[int, int]]:
+    return [tuple(int(part) for part in setting.split(":")) for setting in value.split(",")]
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=lambda value: [int(size) for size in value.split(",")], default=list(SIZES),
+                        help="Comma-separated corpus sizes (default 1000,10000,100000)")
+    parser.add_argument("--settings", type=_parse_settings, default=list(SETTINGS),
+                        help="Comma-separated max_features:n_clusters pairs (default 10:8,50:12)")
+    parser.add_argument("--seed", type=int, default=0, help="Seed of the synthetic corpora")
+    parser.add_argument("--tfidf-jobs", type=int, default=1, help="TF-IDF worker processes (hashed TF-IDF above 1)")
+    parser.add_argument("--output", help="Write the results as JSON to this file")
+    parser.add_argument("--baseline", help="Compare with this baseline JSON and fail on regressions")
+    parser.add_argument("--update-baseline", help="Write the results as the new baseline to this file")
+    parser.add_argument("--time-threshold", type=float, default=TIME_THRESHOLD,
+                        help=f"Allowed relative slowdown per stage (default {TIME_THRESHOLD})")
+    parser.add_argument("--memory-threshold", type=float, default=MEMORY_THRESHOLD,
+                        help=f"Allowed relative peak memory growth per stage (default {MEMORY_THRESHOLD})")
+    args = parser.parse_args(argv)
+    sys.path.insert(0, ROOT)
+
+    results = run_benchmark(args.sizes, args.settings, args.seed, args.tfidf_jobs)
+    failures = []
+    if args.baseline:
+        with open(args.baseline) as f:
+            failures = compare(results, json.load(f)["results"], args.time_threshold, args.memory_threshold)
+
+    report = {"results": results, "failures": failures,
+              "thresholds": {"time": args.time_threshold, "memory": args.memory_threshold}}
+    print(json.dumps(report, indent=2))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    if args.update_baseline:
+        with open(args.update_baseline, "w") as f:
+            json.dump({"generated_at": time.strftime("%Y-%m-%dT%H:%M:%S"), "results": results}, f, indent=2)
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
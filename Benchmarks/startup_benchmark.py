@@ -0,0 +1,105 @@
+"""
+Startup and rerun benchmark of the Streamlit app.
+
+Measures:
+- import_seconds: cold import of App.front_model in a fresh interpreter
+- first_run_seconds: first script run of main.py (time to first paint of an empty page)
+- rerun_seconds: median rerun latency of the empty page
+- load_toy_seconds: clicking "Load toy dataset" (fetch-free preprocessing + first figure)
+- rerun_loaded_seconds: median rerun latency with the toy dataset displayed
+
+and fails (exit code 1) when a measurement exceeds its budget.
+
+    python -m Benchmarks.startup_benchmark --reruns 10 --output startup.json
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+BUDGETS = {
+    "import_seconds": 1.5,
+    "first_run_seconds": 2.0,
+    "rerun_seconds": 0.3,
+    "load_toy_seconds": 15.0,
+    "rerun_loaded_seconds": 1.0,
+}
+
+"""
+Modules that must not be imported just to render the page without data.
+"""
+DEFERRED_MODULES = ("sklearn", "matplotlib")
+
+
+def measure_import() -> tuple[float, list[str]]:
+    code = ("import sys, time, json\n"
+            "start = time.perf_counter()\n"
+            "import App.front_model\n"
+            "elapsed = time.perf_counter() - start\n"
+            f"print(json.dumps([elapsed, [m for m in {DEFERRED_MODULES!r} if m in sys.modules]]))\n")
+    output = subprocess.run([sys.executable, "-c", code], cwd=ROOT, capture_output=True, text=True, check=True)
+    elapsed, loaded = json.loads(output.stdout.strip().splitlines()[-1])
+    return elapsed, loaded
+
+
+def _timed_run(app_test) -> float:
+    start = time.perf_counter()
+    app_test.run()
+    elapsed = time.perf_counter() - start
+    if app_test.exception:
+        raise RuntimeError(app_test.exception[0].message)
+    return elapsed
+
+
+def measure_reruns(reruns: int) -> dict[str, float]:
+    from streamlit.testing.v1 import AppTest
+    app_test = AppTest.from_file(os.path.join(ROOT, "main.py"), default_timeout=300)
+    results = {"first_run_seconds": _timed_run(app_test)}
+    results["rerun_seconds"] = statistics.median(_timed_run(app_test) for _ in range(reruns))
+
+    load_toy = next(button for button in app_test.button if button.label == "Load toy dataset")
+    load_toy.click()
+    results["load_toy_seconds"] = _timed_run(app_test)
+    results["rerun_loaded_seconds"] = statistics.median(_timed_run(app_test) for _ in range(reruns))
+    return results
+
+
+def check_budgets(results: dict[str, float], budgets: dict[str, float]) -> list[str]:
+    return [f"{name}: {results[name]:.3f}s > budget {budget:.3f}s"
+            for name, budget in budgets.items() if name in results and results[name] > budget]
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--reruns", type=int, default=5, help="Reruns per median measurement")
+    parser.add_argument("--output", help="Write the results as JSON to this file")
+    for name, budget in BUDGETS.items():
+        parser.add_argument(f"--budget-{name.replace('_seconds', '').replace('_', '-')}", type=float,
+                            default=budget, dest=name, help=f"Budget for {name} (default {budget})")
+    args = parser.parse_args(argv)
+    sys.path.insert(0, ROOT)
+    os.chdir(ROOT)
+
+    results = {}
+    results["import_seconds"], loaded = measure_import()
+    results.update(measure_reruns(args.reruns))
+    budgets = {name: getattr(args, name) for name in BUDGETS}
+    failures = check_budgets(results, budgets)
+    if loaded:
+        failures.append(f"modules imported at startup: {', '.join(loaded)}")
+
+    report = {"results": results, "budgets": budgets, "failures": failures}
+    print(json.dumps(report, indent=2))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,247 @@
+import contextvars
+import functools
+import inspect
+import json
+import os
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from PubMedAPI.singleton import Singleton
+
+
+class Histogram:
+    """
+    Cumulative-bucket histogram of observed values, compatible with the Prometheus histogram type.
+    """
+    BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 300.0)
+
+    def __init__(self, buckets: tuple[float, ...] = BUCKETS):
+        self.buckets = buckets
+        self.bucket_counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value: float) -> None:
+        idx = 0
+        while idx < len(self.buckets) and value > self.buckets[idx]:
+            idx += 1
+        self.bucket_counts[idx] += 1
+        self.count += 1
+        self.sum += value
+        self.max = max(self.max, value)
+
+    def quantile(self, q: float) -> float:
+        """
+        Estimates the q-quantile by linear interpolation inside the matching bucket.
+        """
+        if self.count == 0:
+            return 0.0
+        rank = q * self.count
+        cumulative = 0
+        lower = 0.0
+        for upper, bucket_count in zip(self.buckets + (self.max,), self.bucket_counts):
+            if bucket_count and cumulative + bucket_count >= rank:
+                return min(lower + (upper - lower) * (rank - cumulative) / bucket_count, self.max)
+            cumulative += bucket_count
+            lower = upper
+        return self.max
+
+    def cumulative_counts(self) -> list[tuple[str, int]]:
+        result = []
+        total = 0
+        for upper, bucket_count in zip(self.buckets, self.bucket_counts):
+            total += bucket_count
+            result.append((f"{upper:g}", total))
+        result.append(("+Inf", self.count))
+        return result
+
+
+class StageMetrics:
+    """
+    Accumulated measurements of a single instrumented stage (e.g. "fetch.esummary", "preprocess.tsne").
+    """
+    def __init__(self, name: str):
+        self.name = name
+        self.wall_time = Histogram()
+        self.errors = 0
+        self.peak_memory = 0
+        self.last_peak_memory = 0
+
+    @property
+    def calls(self) -> int:
+        return self.wall_time.count
+
+    def to_dict(self) -> dict:
+        return {
+            "stage": self.name,
+            "calls": self.calls,
+            "errors": self.errors,
+            "total_seconds": self.wall_time.sum,
+            "mean_seconds": self.wall_time.sum / self.calls if self.calls else 0.0,
+            "p50_seconds": self.wall_time.quantile(0.5),
+            "p95_seconds": self.wall_time.quantile(0.95),
+            "max_seconds": self.wall_time.max,
+            "peak_memory_bytes": self.peak_memory,
+            "last_peak_memory_bytes": self.last_peak_memory,
+            "buckets": self.wall_time.cumulative_counts(),
+        }
+
+
+class _MemoryFrame:
+    __slots__ = ("baseline", "peak")
+
+    def __init__(self, baseline: int):
+        self.baseline = baseline
+        self.peak = baseline
+
+
+class MetricsRegistry(metaclass=Singleton):
+    """
+    Process-wide registry of hot-path measurements: wall time histograms, call and error counts
+    and peak traced memory per stage.
+
+    Peak memory comes from `tracemalloc`, which follows the whole process, so stages running
+    concurrently in other threads inflate each other's peaks, and it slows every allocation down.
+    Memory tracking is therefore off by default: timings are always collected, peaks only when
+    PUBTRENDS_TRACK_MEMORY=1 is set or tracking is switched on (Diagnostics tab, benchmarks).
+    """
+    PROMETHEUS_PREFIX = "pubtrends"
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stages = {}
+        self._memory_stack = contextvars.ContextVar("pubtrends_memory_stack", default=())
+        self.track_memory = os.getenv("PUBTRENDS_TRACK_MEMORY", "0") == "1"
+
+    def _stage(self, name: str) -> StageMetrics:
+        stage = self._stages.get(name)
+        if stage is None:
+            with self._lock:
+                stage = self._stages.setdefault(name, StageMetrics(name))
+        return stage
+
+    def set_track_memory(self, enabled: bool) -> None:
+        """
+        Switches peak memory tracking on or off; switching it off stops tracemalloc and its overhead.
+        """
+        self.track_memory = enabled
+        if not enabled and tracemalloc.is_tracing():
+            tracemalloc.stop()
+
+    @contextmanager
+    def measure(self, stage: str, track_memory: bool = True):
+        """
+        Measures the wall time and peak memory of the enclosed block under the given stage name.
+        Nested blocks are supported: an inner peak is propagated to the enclosing stage.
+        """
+        frame = None
+        token = None
+        if self.track_memory and track_memory:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+            frame = _MemoryFrame(tracemalloc.get_traced_memory()[0])
+            token = self._memory_stack.set(self._memory_stack.get() + (frame,))
+            tracemalloc.reset_peak()
+        failed = False
+        start = time.perf_counter()
+        try:
+            yield
+        except BaseException:
+            failed = True
+            raise
+        finally:
+            elapsed = time.perf_counter() - start
+            peak = 0
+            if frame is not None:
+                frame.peak = max(frame.peak, tracemalloc.get_traced_memory()[1])
+                peak = frame.peak - frame.baseline
+                self._memory_stack.reset(token)
+                parents = self._memory_stack.get()
+                if parents:
+                    parents[-1].peak = max(parents[-1].peak, frame.peak)
+            metrics = self._stage(stage)
+            with self._lock:
+                metrics.wall_time.observe(elapsed)
+                metrics.errors += failed
+                if frame is not None:
+                    metrics.last_peak_memory = peak
+                    metrics.peak_memory = max(metrics.peak_memory, peak)
+
+    def observe(self, stage: str, seconds: float) -> None:
+        """
+        Records a wall time measured by the caller, e.g. the summed compute time of a generator's steps,
+        which `measure` cannot separate from the time the consumer spends between them.
+        """
+        metrics = self._stage(stage)
+        with self._lock:
+            metrics.wall_time.observe(seconds)
+
+    def timed(self, stage: str):
+        """
+        Decorator version of `measure`. Coroutines are timed without memory tracking, because
+        interleaved tasks make per-stage peaks meaningless.
+        """
+        def decorator(func):
+            if inspect.iscoroutinefunction(func):
+                @functools.wraps(func)
+                async def async_wrapper(*args, **kwargs):
+                    with self.measure(stage, track_memory=False):
+                        return await func(*args, **kwargs)
+                return async_wrapper
+
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                with self.measure(stage):
+                    return func(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def reset(self) -> None:
+        with self._lock:
+            self._stages.clear()
+
+    def snapshot(self) -> list[dict]:
+        with self._lock:
+            return [self._stages[name].to_dict() for name in sorted(self._stages)]
+
+    def to_json(self) -> str:
+        return json.dumps({"generated_at": time.time(), "stages": self.snapshot()}, indent=2)
+
+    def to_prometheus(self) -> str:
+        """
+        Renders all stages in the Prometheus text exposition format.
+        """
+        prefix = MetricsRegistry.PROMETHEUS_PREFIX
+        snapshot = self.snapshot()
+        lines = [f"# HELP {prefix}_stage_duration_seconds Wall time of an instrumented stage.",
+                 f"# TYPE {prefix}_stage_duration_seconds histogram"]
+        for stage in snapshot:
+            label = f'stage="{stage["stage"]}"'
+            for upper, count in stage["buckets"]:
+                lines.append(f'{prefix}_stage_duration_seconds_bucket{{{label},le="{upper}"}} {count}')
+            lines.append(f"{prefix}_stage_duration_seconds_sum{{{label}}} {stage['total_seconds']}")
+            lines.append(f"{prefix}_stage_duration_seconds_count{{{label}}} {stage['calls']}")
+        lines += [f"# HELP {prefix}_stage_errors_total Calls of an instrumented stage that raised.",
+                  f"# TYPE {prefix}_stage_errors_total counter"]
+        lines += [f'{prefix}_stage_errors_total{{stage="{stage["stage"]}"}} {stage["errors"]}' for stage in snapshot]
+        lines += [f"# HELP {prefix}_stage_peak_memory_bytes Highest traced memory growth of a stage.",
+                  f"# TYPE {prefix}_stage_peak_memory_bytes gauge"]
+        lines += [f'{prefix}_stage_peak_memory_bytes{{stage="{stage["stage"]}"}} {stage["peak_memory_bytes"]}'
+                  for stage in snapshot]
+        return "\n".join(lines) + "\n"
+
+
+def measure(stage: str, track_memory: bool = True):
+    """
+    Shortcut for `MetricsRegistry().measure`.
+    """
+    return MetricsRegistry().measure(stage, track_memory=track_memory)
+
+
+def timed(stage: str):
+    """
+    Shortcut for `MetricsRegistry().timed`, usable as a decorator on functions, methods and coroutines.
+    """
+    return MetricsRegistry().timed(stage)
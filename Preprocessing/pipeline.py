@@ -0,0 +1,93 @@
+import warnings
+import numpy as np
+import pandas as pd
+from Diagnostics.metrics import measure
+from .text_preprocessing import ProcessorFactory
+
+
+class EmbeddingPipeline:
+    """
+    Runs the full preprocessing chain outside of Streamlit:
+    TextProcessor -> near-duplicate collapsing -> TF-IDF -> t-SNE (3D) -> KMeans.
+
+    Near-duplicate documents are embedded and clustered once, through a single representative,
+    and the results are expanded back to every row. With fewer representatives than `n_clusters`,
+    each of them gets its own cluster and a warning is issued.
+    With more than one TF-IDF job, documents are vectorized in parallel by HashedTFIDFProcessor.
+
+    It mirrors `MainApp.preprocess_raw_text`, but keeps its state on the instance
+    instead of `st.session_state`, so it can be used by the batch CLI and other headless callers.
+    """
+    PERPLEXITY_MIN = 30
+
+    DEDUP_THRESHOLD = 0.9
+
+    def __init__(self, max_features: int = 10, n_clusters: int = 8, random_state: int | None = None,
+                 dedup_threshold: float | None = DEDUP_THRESHOLD, tfidf_jobs: int = 1):
+        """
+        Parameters:
+        max_features (int): The maximum number of TF-IDF features. Default is 10.
+        n_clusters (int): The number of KMeans clusters. Default is 8.
+        random_state (int): Seed for t-SNE, KMeans and MinHash. Default is None.
+        dedup_threshold (float): Similarity above which documents are collapsed. None disables collapsing.
+        tfidf_jobs (int): Worker processes for TF-IDF vectorization. Default is 1 (TFIDFProcessor).
+        """
+        self.max_features = max_features
+        self.n_clusters = n_clusters
+        self.random_state = random_state
+        self.dedup_threshold = dedup_threshold
+        self.tfidf_jobs = tfidf_jobs
+        self.text_processor = ProcessorFactory.get_processor("remove_punctuation")
+        self.dedup_processor = None
+        self.tfidf_processor = None
+        self.tsne_processor = None
+        self.kmeans_processor = None
+        self.features = None
+
+    def run(self, df: pd.DataFrame) -> tuple[pd.DataFrame, np.ndarray, np.ndarray]:
+        """
+        Processes the raw dataset table into 3D points and cluster labels.
+
+        :param df: DataFrame with the PubMed_data.csv columns.
+        :return: The processed DataFrame (with a 'Duplicate_group' column), the (n, 3) embedding
+                 and the cluster labels as strings.
+        """
+        with measure("preprocess.total"):
+            df = self.text_processor.process(df)
+            representatives, inverse = self._collapse_duplicates(df["Text"])
+            if len(representatives) < 2:
+                raise ValueError("At least two distinct datasets are required to compute an embedding.")
+            perplexity = min(EmbeddingPipeline.PERPLEXITY_MIN, len(representatives) - 1)
+            n_clusters = min(self.n_clusters, len(representatives))
+            if n_clusters < self.n_clusters:
+                warnings.warn(f"Only {len(representatives)} distinct datasets, so {n_clusters} clusters are used "
+                              f"instead of {self.n_clusters}")
+            if self.tfidf_jobs > 1:
+                self.tfidf_processor = ProcessorFactory.get_processor("hashed_tfidf", max_features=self.max_features,
+                                                                      n_jobs=self.tfidf_jobs)
+            else:
+                self.tfidf_processor = ProcessorFactory.get_processor("tfidf", max_features=self.max_features)
+            self.tsne_processor = ProcessorFactory.get_processor("tsne", perplexity=perplexity,
+                                                                 random_state=self.random_state)
+            self.kmeans_processor = ProcessorFactory.get_processor("kmeans", n_clusters=n_clusters,
+                                                                   random_state=self.random_state)
+            features = self.tfidf_processor.process(df["Text"].iloc[representatives])
+            X = self.tsne_processor.process(features)
+            self.kmeans_processor.process(X)
+            labels = self.kmeans_processor.cluster.labels_.astype(str)
+            self.features = features[inverse]
+            df["Duplicate_group"] = inverse
+        return df, X[inverse], labels[inverse]
+
+    def _collapse_duplicates(self, texts: pd.Series) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Returns the positions of the rows to embed and, for every row, the index of its representative among them.
+        """
+        if self.dedup_threshold is None:
+            self.dedup_processor = None
+            positions = np.arange(len(texts))
+            return positions, positions
+        self.dedup_processor = ProcessorFactory.get_processor("dedup", threshold=self.dedup_threshold,
+                                                              random_state=self.random_state)
+        inverse = self.dedup_processor.process(texts)
+        return self.dedup_processor.representatives, inverse
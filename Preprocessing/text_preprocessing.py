@@ -1,9 +1,14 @@
+import os
 import string
 import random
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.cluster import KMeans
-from sklearn.manifold import TSNE
+import time
+import zlib
 from abc import ABC, abstractmethod
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+from Diagnostics.metrics import MetricsRegistry, timed
 
 
 class Processor(ABC):
@@ -16,7 +21,8 @@ class ProcessorFactory:
     Returns an instance of a processor based on the given processor name.
     Parameters:
     processor_name (str): The name of the processor to create.
-                          Options are "remove_punctuation", "tsne", "kmeans", "tfidf".
+                          Options are "remove_punctuation", "tsne", "progressive_tsne", "kmeans", "tfidf",
+                          "hashed_tfidf", "hierarchical_map", "dedup".
     **kwargs: Additional keyword arguments to pass to the processor's constructor.
     Returns:
     Processor: An instance of the requested processor.
@@ -27,10 +33,18 @@ class ProcessorFactory:
             return TextProcessor()
         elif processor_name == "tsne":
             return TSNEProcessor(**kwargs)
+        elif processor_name == "progressive_tsne":
+            return ProgressiveTSNEProcessor(**kwargs)
         elif processor_name == "kmeans":
             return KMeansProcessor(**kwargs)
         elif processor_name == "tfidf":
             return TFIDFProcessor(**kwargs)
+        elif processor_name == "hashed_tfidf":
+            return HashedTFIDFProcessor(**kwargs)
+        elif processor_name == "hierarchical_map":
+            return HierarchicalMapProcessor(**kwargs)
+        elif processor_name == "dedup":
+            return DeduplicationProcessor(**kwargs)
 
 class TextProcessor(Processor):
     """
@@ -42,6 +56,7 @@ class TextProcessor(Processor):
     - Standardizing 'Experiment_type' strings,
     - Setting the 'is_selected' flag for each row.
     """
+    @timed("preprocess.text")
     def process(self, data):
         data["Experiment_type"] = data["Experiment_type"].apply(self._standardize_experiment_type)
         data = self._concatenate_text(data)
@@ -100,14 +115,18 @@ class TSNEProcessor(Processor):
     """
     Processor class for performing t-SNE dimensionality reduction on data.
     """
-    def __init__(self,perplexity=30):
+    def __init__(self,perplexity=30,random_state=None):
         """
         Initializes the TSNEProcessor with a t-SNE instance.
 
         Parameters:
         perplexity (int): The perplexity parameter for t-SNE. Default is 30.
+        random_state (int): Seed for reproducible embeddings. Default is None.
         """
-        self.tsne_reduction = TSNE(n_components=3,perplexity=perplexity)
+        # scikit-learn is imported on first use, so page views that never process data don't pay for it
+        from sklearn.manifold import TSNE
+        self.tsne_reduction = TSNE(n_components=3,perplexity=perplexity,random_state=random_state)
+    @timed("preprocess.tsne")
     def process(self,data):
         """
         Applies t-SNE dimensionality reduction to the input data.
@@ -120,18 +139,110 @@ class TSNEProcessor(Processor):
         """
         return self.tsne_reduction.fit_transform(data)
 
+class ProgressiveTSNEProcessor(Processor):
+    """
+    Processor class for t-SNE that produces intermediate layouts while it optimizes, so they can be shown
+    before the embedding converges (and the optimization stopped once the layout looks good enough).
+
+    scikit-learn's TSNE cannot be paused, so the optimization runs in restarts, each initialized
+    with the previous layout:
+    1) a PCA projection (the same initialization TSNE uses with init="pca"), available almost immediately,
+    2) the early exaggeration phase (EXAGGERATION_ITERATIONS),
+    3) n_chunks refinement runs without exaggeration (REFINE_ITERATIONS each).
+    Every restart recomputes the input affinities, which adds a kNN search per chunk.
+    """
+    EXAGGERATION_ITERATIONS = 250
+    REFINE_ITERATIONS = 300
+
+    def __init__(self,perplexity=30,random_state=None,n_chunks=3):
+        """
+        Initializes the ProgressiveTSNEProcessor.
+
+        Parameters:
+        perplexity (int): The perplexity parameter for t-SNE. Default is 30.
+        random_state (int): Seed for reproducible embeddings. Default is None.
+        n_chunks (int): Number of refinement runs after the early exaggeration phase. Default is 3.
+        """
+        from sklearn.decomposition import PCA
+        from sklearn.manifold import TSNE
+        self.perplexity = perplexity
+        self.random_state = random_state
+        self.n_chunks = n_chunks
+        self._pca = PCA
+        self._tsne = TSNE
+
+    @property
+    def n_steps(self) -> int:
+        return self.n_chunks + 2
+
+    def iter_layouts(self, data):
+        """
+        Yields the successive 3D layouts of the input data.
+        The time spent computing them is recorded as one "preprocess.tsne" measurement once the iteration
+        is exhausted, so it is comparable with TSNEProcessor's and excludes what the caller does between steps.
+        An iteration stopped early (e.g. by "Stop refining") is not recorded.
+
+        Parameters:
+        data (numpy.ndarray): The input data to be reduced.
+
+        Yields:
+        tuple: (layout, step, n_steps), where layout is a numpy.ndarray of shape (n, 3)
+               and the last step is the final embedding.
+        """
+        start = time.perf_counter()
+        # padded with zeros when there are fewer than 3 documents (EmbeddingPipeline accepts two) or features
+        n_components = min(3, *np.shape(data))
+        layout = np.zeros((np.shape(data)[0], 3))
+        layout[:, :n_components] = self._pca(n_components=n_components, svd_solver="randomized",
+                                             random_state=self.random_state).fit_transform(data)
+        layout = (layout / (np.std(layout[:, 0]) or 1.0) * 1e-4).astype(np.float32)
+        elapsed = time.perf_counter() - start
+        yield layout, 1, self.n_steps
+        start = time.perf_counter()
+        layout = self._tsne(n_components=3, perplexity=self.perplexity, init=layout,
+                            max_iter=ProgressiveTSNEProcessor.EXAGGERATION_ITERATIONS,
+                            random_state=self.random_state).fit_transform(data)
+        elapsed += time.perf_counter() - start
+        yield layout, 2, self.n_steps
+        for chunk in range(self.n_chunks):
+            start = time.perf_counter()
+            layout = self._tsne(n_components=3, perplexity=self.perplexity, init=layout, early_exaggeration=1.0,
+                                max_iter=ProgressiveTSNEProcessor.REFINE_ITERATIONS,
+                                random_state=self.random_state).fit_transform(data)
+            elapsed += time.perf_counter() - start
+            yield layout, chunk + 3, self.n_steps
+        MetricsRegistry().observe("preprocess.tsne", elapsed)
+
+    def process(self,data):
+        """
+        Runs all steps and returns the final embedding (timed by `iter_layouts`).
+
+        Parameters:
+        data (iterable): The input data to be reduced.
+
+        Returns:
+        numpy.ndarray: The reduced data.
+        """
+        layout = None
+        for layout, _, _ in self.iter_layouts(data):
+            pass
+        return layout
+
 class KMeansProcessor(Processor):
     """
     Processor class for performing K-Means clustering on data.
     """
-    def __init__(self,n_clusters=8):
+    def __init__(self,n_clusters=8,random_state=None):
         """
         Initializes the KMeansProcessor with a KMeans instance.
 
         Parameters:
         n_clusters (int): The number of clusters to form. Default is 8.
+        random_state (int): Seed for reproducible clustering. Default is None.
         """
-        self.cluster = KMeans(n_clusters=n_clusters)
+        from sklearn.cluster import KMeans
+        self.cluster = KMeans(n_clusters=n_clusters,random_state=random_state)
+    @timed("preprocess.kmeans")
     def process(self,data):
         """
         Applies K-Means clustering to the input data.
@@ -144,6 +255,131 @@ class KMeansProcessor(Processor):
         """
         self.cluster.fit_transform(data)
 
+class HierarchicalMapProcessor(Processor):
+    """
+    Processor class for a two-level map of large corpora: a cluster overview first, details on demand.
+
+    `process` only runs fast, linear-time steps: the TF-IDF features are reduced with TruncatedSVD
+    (at most N_COMPONENTS dimensions) and clustered with MiniBatchKMeans, and the cluster centroids are
+    placed in 3D with PCA. The overview therefore costs about the same for 1k or 100k documents.
+
+    `drill_down` computes the detailed 3D t-SNE layout and KMeans sub-clusters of one cluster's
+    documents when it is opened. The last CACHE_SIZE drill-downs are cached, so going back to a
+    cluster is free. Clusters with fewer than MIN_TSNE_SIZE distinct documents are shown in their SVD
+    coordinates (Barnes-Hut t-SNE crashes on clusters of identical rows).
+    """
+    N_COMPONENTS = 50
+    CACHE_SIZE = 8
+    MIN_TSNE_SIZE = 5
+
+    def __init__(self,n_clusters=8,n_sub_clusters=8,n_components=N_COMPONENTS,perplexity=30,random_state=None,
+                 cache_size=CACHE_SIZE):
+        """
+        Initializes the HierarchicalMapProcessor.
+
+        Parameters:
+        n_clusters (int): The number of top-level clusters. Default is 8.
+        n_sub_clusters (int): The number of KMeans sub-clusters within an opened cluster. Default is 8.
+        n_components (int): Maximal number of SVD components used for the coarse clustering. Default is 50.
+        perplexity (int): The maximal perplexity of the per-cluster t-SNE. Default is 30.
+        random_state (int): Seed for SVD, clustering and t-SNE. Default is None.
+        cache_size (int): Number of drill-downs kept. Default is 8.
+        """
+        self.n_clusters = n_clusters
+        self.n_sub_clusters = n_sub_clusters
+        self.n_components = n_components
+        self.perplexity = perplexity
+        self.random_state = random_state
+        self.cache_size = cache_size
+        self.features = None
+        self.reduced = None
+        self.labels = None
+        self.sizes = None
+        self.centroids = None
+        self.centers = None
+        self._drill_downs = OrderedDict()
+
+    @timed("preprocess.overview")
+    def process(self,data):
+        """
+        Clusters the documents and lays out the cluster centroids.
+
+        Parameters:
+        data (numpy.ndarray): TF-IDF features, one row per document.
+
+        Returns:
+        numpy.ndarray: The top-level cluster of every document. Cluster sizes are stored in `sizes`,
+                       3D centroid positions in `centroids` and mean TF-IDF vectors in `centers`.
+        """
+        from sklearn.cluster import MiniBatchKMeans
+        from sklearn.decomposition import TruncatedSVD
+        self.features = np.asarray(data, dtype=np.float64)
+        n_components = min(self.n_components, self.features.shape[1] - 1, len(self.features) - 1)
+        if n_components >= 3:
+            self.reduced = TruncatedSVD(n_components=n_components,
+                                        random_state=self.random_state).fit_transform(self.features)
+        else:
+            self.reduced = self.features
+        n_clusters = min(self.n_clusters, len(self.features))
+        kmeans = MiniBatchKMeans(n_clusters=n_clusters, n_init=3, random_state=self.random_state)
+        self.labels = kmeans.fit_predict(self.reduced)
+        self.sizes = np.bincount(self.labels, minlength=n_clusters)
+        self.centers = np.zeros((n_clusters, self.features.shape[1]))
+        np.add.at(self.centers, self.labels, self.features)
+        self.centers /= np.maximum(self.sizes, 1)[:, None]
+        self.centroids = HierarchicalMapProcessor._to_3d(kmeans.cluster_centers_, self.random_state)
+        self._drill_downs.clear()
+        return self.labels
+
+    @staticmethod
+    def _to_3d(points, random_state=None):
+        """
+        PCA projection to 3D, padded with zeros when there are fewer than 3 dimensions or points.
+        """
+        from sklearn.decomposition import PCA
+        n_components = min(3, points.shape[0], points.shape[1])
+        layout = np.zeros((points.shape[0], 3))
+        if n_components > 0:
+            layout[:, :n_components] = PCA(n_components=n_components,
+                                           random_state=random_state).fit_transform(points)
+        return layout
+
+    def top_terms(self, feature_names, k=3):
+        """
+        Returns the k terms with the highest mean TF-IDF weight in every cluster.
+        """
+        order = np.argsort(-self.centers, axis=1, kind="stable")[:, :k]
+        return [[feature_names[i] for i in row if self.centers[cluster, i] > 0] for cluster, row in enumerate(order)]
+
+    @timed("preprocess.drill_down")
+    def drill_down(self, cluster):
+        """
+        Returns the detailed layout of one cluster, computing it on first use.
+
+        Parameters:
+        cluster (int): Top-level cluster.
+
+        Returns:
+        tuple: (members, layout, labels): the positions of the cluster's documents, their 3D layout
+               of shape (len(members), 3) and their sub-cluster labels.
+        """
+        if cluster in self._drill_downs:
+            self._drill_downs.move_to_end(cluster)
+            return self._drill_downs[cluster]
+        members = np.flatnonzero(self.labels == cluster)
+        distinct = len(np.unique(self.features[members], axis=0))
+        if distinct < HierarchicalMapProcessor.MIN_TSNE_SIZE:
+            layout = HierarchicalMapProcessor._to_3d(self.reduced[members], self.random_state)
+        else:
+            perplexity = min(self.perplexity, distinct - 1)
+            layout = TSNEProcessor(perplexity=perplexity, random_state=self.random_state).process(self.features[members])
+        kmeans = KMeansProcessor(n_clusters=min(self.n_sub_clusters, distinct), random_state=self.random_state)
+        kmeans.process(layout)
+        self._drill_downs[cluster] = (members, layout, kmeans.cluster.labels_)
+        while len(self._drill_downs) > self.cache_size:
+            self._drill_downs.popitem(last=False)
+        return self._drill_downs[cluster]
+
 class TFIDFProcessor(Processor):
     """
     Processor class for transforming text data into TF-IDF features.
@@ -155,7 +391,9 @@ class TFIDFProcessor(Processor):
         Parameters:
         max_features (int): The maximum number of features to consider. Default is 100.
         """
+        from sklearn.feature_extraction.text import TfidfVectorizer
         self.vectorizer = TfidfVectorizer(max_features=max_features, stop_words='english', min_df=2)
+    @timed("preprocess.tfidf")
     def process(self,data):
         """
         Transforms the input data into TF-IDF features.
@@ -168,7 +406,187 @@ class TFIDFProcessor(Processor):
         """
         return self.vectorizer.fit_transform(data).toarray()
 
+def _hashed_counts(texts, n_features):
+    """
+    Worker entry point of HashedTFIDFProcessor: term counts of a chunk of documents in the hashed feature space.
+    """
+    from sklearn.feature_extraction.text import HashingVectorizer
+    vectorizer = HashingVectorizer(n_features=n_features, stop_words='english', alternate_sign=False, norm=None)
+    return vectorizer.transform(texts)
+
+class HashedTFIDFProcessor(Processor):
+    """
+    Processor class for TF-IDF features of large corpora, vectorized in parallel.
+
+    TfidfVectorizer builds its vocabulary in one pass and transforms in another, both on a single core.
+    Here every chunk of CHUNK_SIZE documents is tokenized once, in a pool of n_jobs worker processes,
+    into term counts over a fixed hashed feature space (no vocabulary to share between workers),
+    and the sparse chunk matrices are stacked. The steps TfidfVectorizer applies to its counts then run
+    on the merged matrix: terms found in fewer than min_df documents are dropped, the max_features terms
+    with the highest corpus frequency are kept, and the counts are IDF-weighted and L2-normalized.
+
+    Tokenization and stop words are those of TFIDFProcessor, so the features are the same up to
+    column order, ties and rare hash collisions (2**22 buckets by default).
+    """
+    CHUNK_SIZE = 10000
+    N_FEATURES = 2 ** 22
+
+    def __init__(self,max_features=100,n_jobs=None,min_df=2,n_features=N_FEATURES,chunk_size=CHUNK_SIZE):
+        """
+        Initializes the HashedTFIDFProcessor.
+
+        Parameters:
+        max_features (int): The maximum number of features to keep. Default is 100.
+        n_jobs (int): Number of worker processes; all cores by default. 1 vectorizes in the current process.
+        min_df (int): Minimal number of documents a term must occur in. Default is 2.
+        n_features (int): Size of the hashed feature space. Default is 2**22.
+        chunk_size (int): Documents per worker task. Default is 10000.
+        """
+        self.max_features = max_features
+        self.n_jobs = n_jobs or os.cpu_count() or 1
+        self.min_df = min_df
+        self.n_features = n_features
+        self.chunk_size = chunk_size
+        self.features = None
+
+    @timed("preprocess.tfidf")
+    def process(self,data):
+        """
+        Transforms the input data into TF-IDF features.
+
+        Parameters:
+        data (iterable): The input data to be transformed.
+
+        Returns:
+        numpy.ndarray: The transformed data as a dense array.
+        """
+        import scipy.sparse as sp
+        from sklearn.feature_extraction.text import TfidfTransformer
+        documents = list(data)
+        chunks = [documents[start:start + self.chunk_size] for start in range(0, len(documents), self.chunk_size)]
+        if self.n_jobs > 1 and len(chunks) > 1:
+            with ProcessPoolExecutor(max_workers=min(self.n_jobs, len(chunks))) as executor:
+                matrices = list(executor.map(_hashed_counts, chunks, [self.n_features] * len(chunks)))
+        else:
+            matrices = [_hashed_counts(chunk, self.n_features) for chunk in chunks]
+        counts = sp.vstack(matrices, format="csr") if matrices else sp.csr_matrix((0, self.n_features))
+
+        document_frequency = np.bincount(counts.indices, minlength=self.n_features)
+        candidates = np.flatnonzero(document_frequency >= self.min_df)
+        if len(candidates) == 0:
+            raise ValueError("After pruning, no terms remain. Try a lower min_df.")
+        term_frequency = np.asarray(counts[:, candidates].sum(axis=0)).ravel()
+        # stable sort, so ties keep the order of the feature space
+        self.features = np.sort(candidates[np.argsort(-term_frequency, kind="stable")[:self.max_features]])
+        return TfidfTransformer().fit_transform(counts[:, self.features]).toarray()
+
+class DeduplicationProcessor(Processor):
+    """
+    Processor class for collapsing near-duplicate documents (e.g. GEO SuperSeries and their SubSeries,
+    which share almost the same text) before embedding.
+
+    Every document is reduced to a MinHash signature of its word shingles, and candidate pairs are found
+    with LSH banding, so the cost grows linearly with the number of documents instead of quadratically.
+    Candidates whose estimated Jaccard similarity reaches the threshold are merged into one group
+    (transitively), represented by its first row.
+
+    Signatures are computed with vectorized numpy arithmetic over CHUNK_SIZE documents at a time:
+    words are hashed once per distinct word (per chunk), shingle hashes are combined from word hashes, and every
+    permutation is a multiply-shift hash whose minimum per document is taken with `np.minimum.reduceat`.
+    """
+    CHUNK_SIZE = 5000
+    SHINGLE_BASE = 1000003
+
+    def __init__(self, threshold=0.9, num_perm=64, bands=16, shingle_size=3, random_state=None):
+        """
+        Initializes the DeduplicationProcessor.
+
+        Parameters:
+        threshold (float): Minimal estimated Jaccard similarity of two documents to merge them. Default is 0.9.
+        num_perm (int): Number of MinHash permutations. Default is 64.
+        bands (int): Number of LSH bands; must divide num_perm. Default is 16.
+        shingle_size (int): Number of consecutive words in a shingle. Default is 3.
+        random_state (int): Seed of the MinHash permutations. Default is None.
+        """
+        if num_perm % bands:
+            raise ValueError("num_perm must be divisible by bands")
+        self.threshold = threshold
+        self.num_perm = num_perm
+        self.bands = bands
+        self.shingle_size = shingle_size
+        rng = np.random.default_rng(random_state)
+        # multiply-shift hashing: ((a * x + b) mod 2**64) >> 32 with odd a
+        self.a = rng.integers(0, 2 ** 63, size=num_perm, dtype=np.uint64) * np.uint64(2) + np.uint64(1)
+        self.b = rng.integers(0, 2 ** 63, size=num_perm, dtype=np.uint64)
+        self.representatives = None
+        self.inverse = None
 
+    @timed("preprocess.dedup")
+    def process(self,data):
+        """
+        Groups near-duplicate documents.
 
+        Parameters:
+        data (iterable): The documents (e.g. the 'Text' column).
+
+        Returns:
+        numpy.ndarray: For every document, the index of its group in `self.representatives`,
+                       which holds the position of each group's representative document.
+        """
+        documents = list(data)
+        signatures = np.concatenate([self._signatures(documents[start:start + DeduplicationProcessor.CHUNK_SIZE])
+                                     for start in range(0, len(documents), DeduplicationProcessor.CHUNK_SIZE)]) \
+            if documents else np.empty((0, self.num_perm), dtype=np.uint64)
+        parents = list(range(len(documents)))
+
+        def find(i):
+            while parents[i] != i:
+                parents[i] = parents[parents[i]]
+                i = parents[i]
+            return i
+
+        rows = self.num_perm // self.bands
+        for band in range(self.bands):
+            buckets = {}
+            for i, key in enumerate(signatures[:, band * rows:(band + 1) * rows]):
+                buckets.setdefault(key.tobytes(), []).append(i)
+            for members in buckets.values():
+                for j in members[1:]:
+                    first, other = find(members[0]), find(j)
+                    if first != other and np.mean(signatures[members[0]] == signatures[j]) >= self.threshold:
+                        parents[max(first, other)] = min(first, other)
+
+        roots = np.array([find(i) for i in range(len(documents))], dtype=np.int64)
+        self.representatives, self.inverse = np.unique(roots, return_inverse=True)
+        return self.inverse
+
+    def _signatures(self, documents):
+        """
+        MinHash signatures of a chunk of documents, one row per document.
+        Every document is followed by `shingle_size - 1` empty words, so each of its words starts a shingle
+        that never reaches into the next document, and even a document shorter than a shingle gets one.
+        """
+        pad = [""] * (self.shingle_size - 1)
+        tokens = []
+        lengths = []
+        for document in documents:
+            words = str(document).lower().split() or [""]
+            tokens.extend(words)
+            tokens.extend(pad)
+            lengths.append(len(words))
+        codes, words = pd.factorize(np.array(tokens, dtype=object))
+        hashes = np.fromiter((zlib.crc32(word.encode()) for word in words), dtype=np.uint64, count=len(words))[codes]
 
+        lengths = np.array(lengths, dtype=np.int64)
+        starts = np.concatenate(([0], np.cumsum(lengths)[:-1]))
+        # position of every shingle's first word in `tokens`: skip the padding of all previous documents
+        windows = np.arange(lengths.sum()) + np.repeat(np.arange(len(documents)) * len(pad), lengths)
+        shingles = hashes[windows]
+        for offset in range(1, self.shingle_size):
+            shingles = shingles * np.uint64(DeduplicationProcessor.SHINGLE_BASE) + hashes[windows + offset]
 
+        signatures = np.empty((len(documents), self.num_perm), dtype=np.uint64)
+        for k in range(self.num_perm):
+            permuted = (shingles * self.a[k] + self.b[k]) >> np.uint64(32)
+            signatures[:, k] = np.minimum.reduceat(permuted, starts)
+        return signatures
@@ -4,15 +4,18 @@ from dataclasses import dataclass
 from time import time
 import aiohttp
 import pandas as pd
+import xmltodict
 from dotenv import load_dotenv
+from Diagnostics.metrics import MetricsRegistry, timed
+from PubMedAPI.pmid_reader import PmidReader
+from PubMedAPI.resilience import CircuitBreakers, RetryBudget
 
 class AsyncDataRetriever:
 
-    RETRIVAL_TIMES = 5
     SEMAPHORE_SIZE = 10
 
 
-    @dataclass
+    @dataclass(slots=True)
     class PmData:
         """
         Holds metadata for a specific dataset, identified by a GSE code.
@@ -42,6 +45,7 @@ class AsyncDataRetriever:
 
         self.API_KEY = os.getenv('API_KEY')
         self.sem = asyncio.Semaphore(AsyncDataRetriever.SEMAPHORE_SIZE)
+        self.retry_budget = RetryBudget()
 
         self.failed_pmid = []
         self.failed_db_idx = []
@@ -50,13 +54,10 @@ class AsyncDataRetriever:
         """
         Loads a list of PMIDs from a file named 'PMIDs_list.txt'
         """
-        with open('PMIDs_list.txt', 'r') as f:
-            for line in f:
-                line = line.strip()
-                #if line.isdigit() and int(line) not in self.pmid_list:
-                self.pmid_list.append(int(line))
+        self.pmid_list = PmidReader().read(os.path.join(os.path.dirname(__file__), 'PMIDs_list.txt')).pmids
         return self.pmid_list
 
+    @timed("fetch.async.elink")
     async def _send_request_db_id(self,session,pmid):
         params = {
             "dbfrom": "pubmed",
@@ -66,21 +67,15 @@ class AsyncDataRetriever:
             "retmode": "json",
             "api_key": self.API_KEY
         }
-        async with self.sem:
-            if self.sem._value==0:
-                pass
-            for attempt in range(1,AsyncDataRetriever.RETRIVAL_TIMES+1):
-                try:
-                    response = await session.get(self.BASE_URL_DB_IDX.format(pmid), params=params)
-                    data = await AsyncDataRetriever.db_idx_json_parser(response)
-                    return data
-                except Exception as e:
-                    await asyncio.sleep(0.5*(attempt**2))
-
-        self.failed_pmid.append(pmid)
-        return []
+        try:
+            response = await self._get_with_retries(session, self.BASE_URL_DB_IDX, params)
+            return await AsyncDataRetriever.db_idx_json_parser(response)
+        except Exception:
+            self.failed_pmid.append(pmid)
+            return []
 
 
+    @timed("fetch.async.esummary")
     async def _send_request_info(self,session,id):
         params = {
             "db": "gds",
@@ -88,38 +83,56 @@ class AsyncDataRetriever:
             "retmode": "json",
             "api_key": self.API_KEY
         }
-
-        async with self.sem:
-            if self.sem._value==0:
-                pass
-            for attempt in range(1,AsyncDataRetriever.RETRIVAL_TIMES+1):
-                try:
-                    response = await session.get(self.BASE_URL_SUMMARY.format(id),params=params)
-                    data = await AsyncDataRetriever.summary_json_parser(response,id)
-                    return data
-                except Exception as e:
-                    await asyncio.sleep(0.5*(2**attempt))
+        try:
+            response = await self._get_with_retries(session, self.BASE_URL_SUMMARY, params)
+            return await AsyncDataRetriever.summary_json_parser(response,id)
+        except Exception:
             self.failed_db_idx.append(id)
             return None
 
 
+    @timed("fetch.async.overall_design")
     async def _send_request_overall_design(self,session,gse_code):
         params = {
             "acc": gse_code,
             "form": "xml",
             "api_key":self.API_KEY
         }
+        try:
+            response = await self._get_with_retries(session, self.BASE_URL_OVERALL_DESIGN, params, ssl=False)
+            return await AsyncDataRetriever.overall_design_xml_parser(response)
+        except Exception:
+            return None
+
+    async def _get_with_retries(self, session, url, params, **kwargs):
+        """
+        Sends a request through the endpoint's circuit breaker (shared with PubMedAPI).
+        Connection errors, timeouts, 429 and 5xx responses are retried with jittered backoff
+        until the job's retry budget runs out; while the breaker is open requests fail immediately
+        with CircuitOpenError instead of waiting.
+        """
+        breaker = CircuitBreakers().get(url.rsplit("/", 1)[-1])
+        attempt = 0
         async with self.sem:
-            if self.sem._value==0:
-                pass
-            for _ in range(AsyncDataRetriever.RETRIVAL_TIMES):
+            while True:
+                attempt += 1
+                breaker.before_call()
                 try:
-                    response = await session.get(self.BASE_URL_OVERALL_DESIGN.format(gse_code),params=params,ssl=False)
-                    response_data = AsyncDataRetriever.overall_design_xml_parser(response)
-                    return response_data
-                except Exception:
-                    await asyncio.sleep(1)
-            return None
+                    response = await session.get(url, params=params, **kwargs)
+                    if response.status == 429 or response.status >= 500:
+                        response.raise_for_status()
+                except (aiohttp.ClientError, asyncio.TimeoutError):
+                    breaker.record_failure()
+                    delay = self.retry_budget.next_delay(attempt)
+                    if delay is None:
+                        raise
+                    await asyncio.sleep(delay)
+                    continue
+                except BaseException:
+                    breaker.record_failure()
+                    raise
+                breaker.record_success()
+                return response
 
 
     async def _create_df_from_db_idx_api(self,session,pmid_list):
@@ -146,7 +159,7 @@ class AsyncDataRetriever:
             responses_db_info = await asyncio.gather(*tasks_info)
 
             for response_db_info, db_idx in zip(responses_db_info, db_idx_chunk):
-                if db_idx not in unique_db_idx_set:
+                if response_db_info is not None and db_idx not in unique_db_idx_set:
                     info_rows.append({"db_id": db_idx,
                                       "Title": response_db_info.Title,
                                       "Summary": response_db_info.Summary,
@@ -173,6 +186,7 @@ class AsyncDataRetriever:
         return df_overall_design
 
 
+    @timed("fetch.async.total")
     async def main_async_call(self, pmid_list):
 
 
@@ -207,7 +221,7 @@ class AsyncDataRetriever:
     @staticmethod
     async def overall_design_xml_parser(response):
         response_text = await response.text()
-        return response_text["MINiML"]["Series"].get("Overall-Design")
+        return xmltodict.parse(response_text)["MINiML"]["Series"].get("Overall-Design")
 
     @staticmethod
     async def summary_json_parser(response, idx):
@@ -241,5 +255,6 @@ if __name__ == "__main__":
     asyncio.run(o.main_async_call(o.pmid_list))
     end = time()
     print(end-start)
+    print(MetricsRegistry().to_json())
 
 
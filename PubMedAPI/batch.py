@@ -0,0 +1,97 @@
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Optional
+import pandas as pd
+from .checkpoint import CheckpointJournal
+from .geo_mirror import GeoMirror, MirroredPubMedAPI
+from .observer import EventBus
+from .pubmed_api import PubMedAPI
+from .result_accumulator import ResultAccumulator
+
+
+def _fetch_shard(pmids: list[int], checkpoint_dir: Optional[str] = None,
+                 geo_mirror: Optional[str] = None) -> tuple[pd.DataFrame, dict[str, int]]:
+    """
+    Worker entry point: runs one independent fetch job over a shard of PMIDs.
+    Returns the shard's rows together with its error counts, so the parent can aggregate them.
+    With a checkpoint directory every shard keeps its own journal, which is removed once the shard is finished.
+    Shard journals are not whole uploads, so they live in a subdirectory that `CheckpointJournal.list_jobs` does not list.
+    With a GEO mirror directory the shard is answered from its (already built) index instead of NCBI.
+    """
+    journal = CheckpointJournal(pmids, directory=os.path.join(checkpoint_dir, ShardedFetcher.SHARD_SUBDIRECTORY)) \
+        if checkpoint_dir else None
+    pubmed_api = MirroredPubMedAPI(GeoMirror(geo_mirror)) if geo_mirror else PubMedAPI()
+    try:
+        pubmed_api.create_dataframe(list_of_pmids=pmids, journal=journal)
+        if journal is not None and journal.is_complete:
+            journal.discard()
+    finally:
+        if journal is not None:
+            journal.close()
+    return pubmed_api.df, pubmed_api.error_counts
+
+
+class ShardedFetcher(EventBus):
+    """
+    Fetches dataset metadata for a large PMID collection by splitting it into shards
+    and running one PubMedAPI job per shard in a pool of worker processes.
+
+    Progress is published per finished shard (stage "fetch"), and error counts reported
+    by the workers are merged into this bus' counters.
+    Shards are journaled in the SHARD_SUBDIRECTORY of the checkpoint directory when one is given; rerunning
+    the same input with the same shard size resumes the unfinished shards.
+    With a GEO mirror directory its index is built (or updated) once before the shards start.
+    """
+    SHARD_SIZE = 500
+    SHARD_SUBDIRECTORY = "shards"
+    ERROR_LABELS = MirroredPubMedAPI.ERROR_LABELS
+
+    def __init__(self, workers: int = 4, shard_size: int = SHARD_SIZE, checkpoint_dir: Optional[str] = None,
+                 geo_mirror: Optional[str] = None):
+        super().__init__()
+        self.workers = workers
+        self.shard_size = shard_size
+        self.checkpoint_dir = checkpoint_dir
+        self.geo_mirror = geo_mirror
+        self.df = None
+
+    def create_dataframe(self, list_of_pmids: list[int]) -> pd.DataFrame:
+        """
+        Fetches all PMIDs and returns the combined DataFrame (also stored in `self.df`).
+        With a single worker the shards are processed in the current process.
+
+        :param list_of_pmids: List of PMIDs to process.
+        """
+        self.reset_events()
+        if self.geo_mirror:
+            mirror = GeoMirror(self.geo_mirror)
+            mirror.build_index()
+            mirror.close()
+        shards = [list_of_pmids[i:i + self.shard_size] for i in range(0, len(list_of_pmids), self.shard_size)]
+        frames = []
+        done = 0
+        self.publish_progress(stage="fetch", done=0, total=len(list_of_pmids))
+        if self.workers <= 1:
+            results = map(lambda shard: (shard, _fetch_shard(shard, self.checkpoint_dir, self.geo_mirror)), shards)
+            for shard, (df, counts) in results:
+                done += len(shard)
+                self._collect(frames, df, counts, done, len(list_of_pmids))
+        else:
+            with ProcessPoolExecutor(max_workers=self.workers) as executor:
+                futures = {executor.submit(_fetch_shard, shard, self.checkpoint_dir, self.geo_mirror): shard for shard in shards}
+                for future in as_completed(futures):
+                    df, counts = future.result()
+                    done += len(futures[future])
+                    self._collect(frames, df, counts, done, len(list_of_pmids))
+        self.flush()
+        frames = [frame for frame in frames if not frame.empty]
+        self.df = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+        if not self.df.empty:
+            self.df = self.df.drop_duplicates(subset=["Pmid", "Geo_dataset_ind"]).reset_index(drop=True)
+            self.df = ResultAccumulator.to_categorical(self.df)
+        return self.df
+
+    def _collect(self, frames: list, df: pd.DataFrame, counts: dict[str, int], done: int, total: int) -> None:
+        frames.append(df)
+        self.merge_errors(counts, f"{sum(counts.values())} errors in shard")
+        self.publish_progress(stage="fetch", done=done, total=total)
@@ -0,0 +1,252 @@
+import dataclasses
+import datetime
+import hashlib
+import json
+import os
+from dataclasses import dataclass
+from typing import Optional
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+
+@dataclass
+class CheckpointInfo:
+    """
+    Summary of a journal on disk, used to list unfinished jobs.
+    """
+    job_id: str
+    path: str
+    total_pmids: int
+    done_pmids: int
+    created_at: str
+    updated_at: str
+
+    @property
+    def label(self) -> str:
+        return f"{self.created_at} ({self.done_pmids}/{self.total_pmids} PMIDs)"
+
+
+class JobLockedError(RuntimeError):
+    """
+    Raised when a journal is written or discarded while another session or process is fetching the same job.
+    """
+
+
+class CheckpointJournal:
+    """
+    Append-only JSON-lines journal of an ingestion job, so that an interrupted job can continue
+    where it stopped instead of starting over from the first PMID.
+
+    The journal is identified by the hash of the (unique, sorted) input PMIDs, so restarting a job
+    with the same input picks up the same file. It contains:
+    - a header with the input PMIDs,
+    - one "dataset" record per fetched dataset (summary and Overall Design),
+    - one "pmid" record per PMID whose datasets were all fetched successfully.
+
+    Every record is flushed when written. A torn last line (e.g. after a crash) is ignored on load.
+
+    Next to the journal, a small progress file holds the header fields and the number of finished PMIDs,
+    so that listing jobs does not parse whole journals, and a lock file is held (flock) while a session
+    or process writes the journal. Jobs that are locked are still running and are not listed.
+    The lock is released by the operating system when its holder dies, so interrupted jobs become resumable.
+    """
+    DIRECTORY = os.getenv("PUBTRENDS_CHECKPOINT_DIR",
+                          os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".checkpoints")))
+
+    def __init__(self, pmids: list[int], directory: Optional[str] = None):
+        self.directory = directory or CheckpointJournal.DIRECTORY
+        self.pmids = list(pmids)
+        self.job_id = CheckpointJournal.job_id_for(self.pmids)
+        self.path = os.path.join(self.directory, f"{self.job_id}.jsonl")
+        self.progress_path = os.path.join(self.directory, f"{self.job_id}.progress.json")
+        self.lock_path = os.path.join(self.directory, f"{self.job_id}.lock")
+        self.completed_pmids = {}
+        self.datasets = {}
+        self.created_at = None
+        self._file = None
+        self._lock = None
+        self._load()
+
+    @staticmethod
+    def job_id_for(pmids: list[int]) -> str:
+        return hashlib.sha256(json.dumps(sorted(set(pmids))).encode()).hexdigest()[:16]
+
+    @property
+    def is_complete(self) -> bool:
+        return all(pmid in self.completed_pmids for pmid in self.pmids)
+
+    def _load(self) -> None:
+        if not os.path.exists(self.path):
+            return
+        for record in CheckpointJournal._read_records(self.path):
+            if record.get("type") == "header":
+                self.created_at = record["created_at"]
+            elif record.get("type") == "dataset":
+                self.datasets[record["dataset_idx"]] = (record["info"], record["overall_design"])
+            elif record.get("type") == "pmid":
+                self.completed_pmids[record["pmid"]] = record["datasets"]
+
+    @staticmethod
+    def _read_records(path: str):
+        with open(path, "r") as f:
+            for line in f:
+                try:
+                    yield json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+
+    def acquire(self) -> bool:
+        """
+        Locks the job for this journal instance. Returns False if another session or process holds the lock.
+        Without fcntl (Windows) jobs are never locked.
+        """
+        if self._lock is not None or fcntl is None:
+            return True
+        os.makedirs(self.directory, exist_ok=True)
+        lock = open(self.lock_path, "a")
+        try:
+            fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            lock.close()
+            return False
+        self._lock = lock
+        return True
+
+    @staticmethod
+    def is_running(lock_path: str) -> bool:
+        """
+        Whether the lock file of a job is held, i.e. the job is being fetched right now.
+        """
+        if fcntl is None or not os.path.exists(lock_path):
+            return False
+        with open(lock_path, "a") as lock:
+            try:
+                fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                return True
+            fcntl.flock(lock, fcntl.LOCK_UN)
+        return False
+
+    def _write(self, record: dict) -> None:
+        if self._file is None:
+            if not self.acquire():
+                raise JobLockedError(f"Job {self.job_id} is being fetched by another session")
+            is_new = not os.path.exists(self.path)
+            self._file = open(self.path, "a")
+            if is_new:
+                self.created_at = datetime.datetime.now().isoformat(timespec="seconds")
+                self._file.write(json.dumps({"type": "header", "job_id": self.job_id, "pmids": self.pmids,
+                                             "created_at": self.created_at}) + "\n")
+                self._write_progress()
+        self._file.write(json.dumps(record) + "\n")
+        self._file.flush()
+
+    def _write_progress(self) -> None:
+        progress_tmp = self.progress_path + ".tmp"
+        with open(progress_tmp, "w") as f:
+            json.dump({"job_id": self.job_id, "total_pmids": len(self.pmids),
+                       "done_pmids": len(self.completed_pmids), "created_at": self.created_at}, f)
+        os.replace(progress_tmp, self.progress_path)
+
+    def record_dataset(self, dataset_idx: int, pmid_data, overall_design: str) -> None:
+        """
+        Stores a fetched dataset (a PmData instance and its Overall Design).
+        """
+        info = dataclasses.asdict(pmid_data)
+        self.datasets[dataset_idx] = (info, overall_design)
+        self._write({"type": "dataset", "dataset_idx": dataset_idx, "info": info, "overall_design": overall_design})
+
+    def record_pmid(self, pmid: int, dataset_indices: list[int]) -> None:
+        """
+        Marks a PMID as finished. Only called when all of its datasets were fetched or skipped for good.
+        """
+        self.completed_pmids[pmid] = dataset_indices
+        self._write({"type": "pmid", "pmid": pmid, "datasets": dataset_indices})
+        self._write_progress()
+
+    def close(self) -> None:
+        """
+        Closes the journal and releases the job's lock.
+        """
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        if self._lock is not None:
+            self._lock.close()
+            self._lock = None
+
+    def discard(self) -> None:
+        """
+        Removes the journal, e.g. once every PMID of the job is finished.
+        Raises JobLockedError if another session or process is still fetching the job.
+        """
+        if not self.acquire():
+            raise JobLockedError(f"Job {self.job_id} is being fetched by another session")
+        for path in (self.path, self.progress_path, self.lock_path):
+            if os.path.exists(path):
+                os.remove(path)
+        self.close()
+
+    # ----------------------------------- Listing jobs -----------------------------------
+    @classmethod
+    def list_jobs(cls, directory: Optional[str] = None) -> list[CheckpointInfo]:
+        """
+        Lists unfinished jobs found in the checkpoint directory, most recently updated first.
+        Jobs that are still being fetched are left out. Only the progress files are read; a journal
+        without one (e.g. when the last write was torn) is parsed instead.
+        """
+        directory = directory or cls.DIRECTORY
+        if not os.path.isdir(directory):
+            return []
+        jobs = []
+        for name in os.listdir(directory):
+            if not name.endswith(".jsonl"):
+                continue
+            path = os.path.join(directory, name)
+            job_id = name[:-len(".jsonl")]
+            if cls.is_running(os.path.join(directory, f"{job_id}.lock")):
+                continue
+            progress = cls._read_progress(os.path.join(directory, f"{job_id}.progress.json")) or cls._scan_progress(path)
+            if progress is None:
+                continue
+            updated_at = datetime.datetime.fromtimestamp(os.path.getmtime(path)).isoformat(timespec="seconds")
+            jobs.append(CheckpointInfo(path=path, updated_at=updated_at, **progress))
+        return sorted(jobs, key=lambda job: job.updated_at, reverse=True)
+
+    @staticmethod
+    def _read_progress(progress_path: str) -> Optional[dict]:
+        try:
+            with open(progress_path, "r") as f:
+                return json.load(f)
+        except (OSError, json.JSONDecodeError):
+            return None
+
+    @classmethod
+    def _scan_progress(cls, path: str) -> Optional[dict]:
+        header = None
+        done = set()
+        for record in cls._read_records(path):
+            if record.get("type") == "header":
+                header = record
+            elif record.get("type") == "pmid":
+                done.add(record["pmid"])
+        if header is None:
+            return None
+        return {"job_id": header["job_id"], "total_pmids": len(header["pmids"]), "done_pmids": len(done),
+                "created_at": header["created_at"]}
+
+    @classmethod
+    def open_job(cls, job_id: str, directory: Optional[str] = None) -> "CheckpointJournal":
+        """
+        Opens an existing journal by id, restoring its input PMIDs from the header.
+        """
+        directory = directory or cls.DIRECTORY
+        path = os.path.join(directory, f"{job_id}.jsonl")
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"No checkpoint for job {job_id} in {directory}")
+        header = next((record for record in cls._read_records(path) if record.get("type") == "header"), None)
+        if header is None:
+            raise ValueError(f"Checkpoint {path} has no header")
+        return cls(header["pmids"], directory=directory)
@@ -0,0 +1,118 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+import requests
+from requests.adapters import HTTPAdapter
+from .resilience import CircuitBreakers, RetryBudget
+from .singleton import Singleton
+
+
+class SharedConnectionPool(metaclass=Singleton):
+    """
+    Process-wide HTTP connection pool and response cache shared by every fetch job.
+
+    Fetch jobs (PubMedAPI instances) keep their own state; the only things they share are
+    keep-alive connections to NCBI and a bounded LRU cache of successful responses.
+    `requests.Session` is not thread-safe, so every thread gets its own session mounted on
+    the same `HTTPAdapter`, whose urllib3 pool is.
+    Requests go through the endpoint's circuit breaker and are retried within the job's RetryBudget.
+    """
+    POOL_SIZE = 20
+    CACHE_SIZE = 4096
+    TIMEOUT = 30
+
+    def __init__(self, pool_size: int = POOL_SIZE, cache_size: int = CACHE_SIZE):
+        self._adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self._local = threading.local()
+        self._cache = OrderedDict()
+        self._cache_size = cache_size
+        self._cache_lock = threading.Lock()
+
+    @property
+    def session(self) -> requests.Session:
+        """
+        Returns the session bound to the calling thread, creating it on first use.
+        """
+        session = getattr(self._local, "session", None)
+        if session is None:
+            session = requests.Session()
+            session.mount("https://", self._adapter)
+            session.mount("http://", self._adapter)
+            self._local.session = session
+        return session
+
+    def get(self, url: str, params: dict, retry_budget: Optional[RetryBudget] = None) -> bytes:
+        """
+        Sends a GET request through the shared pool and returns the response body.
+        Successful responses are cached, so repeated lookups of the same PMID, dataset
+        or GSE code (e.g. overlapping uploads of concurrent users) hit NCBI only once.
+
+        :param url: Endpoint URL.
+        :param params: Query parameters.
+        :param retry_budget: Retry budget of the calling job. Without it the request is sent once.
+        :return: Raw response content.
+        :raises requests.HTTPError: If the server answers with an error status.
+        :raises CircuitOpenError: If the endpoint's circuit breaker is open.
+        """
+        key = (url, tuple(sorted((k, str(v)) for k, v in params.items())))
+        with self._cache_lock:
+            if key in self._cache:
+                self._cache.move_to_end(key)
+                return self._cache[key]
+        content = self._send("GET", url, params, retry_budget)
+        with self._cache_lock:
+            self._cache[key] = content
+            self._cache.move_to_end(key)
+            while len(self._cache) > self._cache_size:
+                self._cache.popitem(last=False)
+        return content
+
+    def post(self, url: str, data: dict, retry_budget: Optional[RetryBudget] = None) -> bytes:
+        """
+        Sends a POST request through the shared pool and returns the response body. Used for requests
+        with long id lists (EPost, batched ELink), which don't fit into a URL. Responses are not cached.
+
+        :param url: Endpoint URL.
+        :param data: Form fields.
+        :param retry_budget: Retry budget of the calling job. Without it the request is sent once.
+        :return: Raw response content.
+        :raises requests.HTTPError: If the server answers with an error status.
+        :raises CircuitOpenError: If the endpoint's circuit breaker is open.
+        """
+        return self._send("POST", url, data, retry_budget)
+
+    def _send(self, method: str, url: str, params: dict, retry_budget: Optional[RetryBudget]) -> bytes:
+        """
+        Connection errors, timeouts, 429 and 5xx responses count as endpoint failures and are retried;
+        other client errors are raised immediately and don't affect the breaker.
+        """
+        breaker = CircuitBreakers().get(url.rsplit("/", 1)[-1])
+        attempt = 0
+        while True:
+            attempt += 1
+            breaker.before_call()
+            try:
+                if method == "POST":
+                    response = self.session.post(url, data=params, timeout=SharedConnectionPool.TIMEOUT)
+                else:
+                    response = self.session.get(url, params=params, timeout=SharedConnectionPool.TIMEOUT)
+                if response.status_code == 429 or response.status_code >= 500:
+                    response.raise_for_status()
+            except requests.RequestException:
+                breaker.record_failure()
+                delay = retry_budget.next_delay(attempt) if retry_budget is not None else None
+                if delay is None:
+                    raise
+                time.sleep(delay)
+                continue
+            except BaseException:
+                breaker.record_failure()
+                raise
+            breaker.record_success()
+            response.raise_for_status()
+            return response.content
+
+    def clear_cache(self) -> None:
+        with self._cache_lock:
+            self._cache.clear()
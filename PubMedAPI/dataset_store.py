@@ -0,0 +1,133 @@
+import io
+import os
+from typing import BinaryIO, Optional, Sequence, Union
+import pandas as pd
+
+Target = Union[str, os.PathLike, BinaryIO]
+
+
+class DatasetStore:
+    """
+    Saves and loads dataset tables (PubMed_data.csv-like frames, optionally with coordinates and labels)
+    in CSV, Parquet or Arrow IPC (Feather v2) format. The format is taken from the file extension.
+
+    Parquet and Arrow files keep the column types, so loading them does not re-parse text or re-infer types:
+    - low-cardinality string columns (categoricals, e.g. Organism and Experiment_type) are dictionary-encoded,
+    - both formats can be compressed ("zstd", "lz4", or None),
+    - Arrow files are memory-mapped on load, Parquet files are read with memory mapping,
+    - `columns` reads only the requested columns (e.g. coordinates and GSE_code for the plot).
+
+    Parquet and Arrow support requires pyarrow (installed together with Streamlit).
+    """
+    CSV = "csv"
+    PARQUET = "parquet"
+    ARROW = "arrow"
+    EXTENSIONS = {".csv": CSV, ".parquet": PARQUET, ".pq": PARQUET, ".arrow": ARROW, ".feather": ARROW,
+                  ".ipc": ARROW}
+    COMPRESSION = "zstd"
+    """
+    String columns with at most this share of distinct values are dictionary-encoded when saved
+    """
+    DICTIONARY_RATIO = 0.5
+
+    def __init__(self, compression: Optional[str] = COMPRESSION):
+        self.compression = compression
+
+    @staticmethod
+    def format_of(name: Union[str, os.PathLike]) -> str:
+        extension = os.path.splitext(str(name))[1].lower()
+        if extension not in DatasetStore.EXTENSIONS:
+            raise ValueError(f"Unsupported dataset format {extension!r}, expected one of "
+                             f"{', '.join(sorted(DatasetStore.EXTENSIONS))}")
+        return DatasetStore.EXTENSIONS[extension]
+
+    def save(self, df: pd.DataFrame, target: Target, fmt: Optional[str] = None) -> None:
+        """
+        Writes the table to a path or a binary file object.
+
+        :param df: Table to save.
+        :param target: Destination path or binary file object.
+        :param fmt: "csv", "parquet" or "arrow"; by default taken from the file extension.
+        """
+        fmt = fmt or DatasetStore.format_of(target)
+        if fmt == DatasetStore.CSV:
+            df.to_csv(target, index=False)
+            return
+        pa = DatasetStore._import_pyarrow()
+        table = pa.Table.from_pandas(self._encode_dictionaries(df), preserve_index=False)
+        if fmt == DatasetStore.PARQUET:
+            import pyarrow.parquet as pq
+            pq.write_table(table, target, compression=self.compression or "none", use_dictionary=True)
+        else:
+            import pyarrow.feather as feather
+            feather.write_feather(table, target, compression=self.compression or "uncompressed")
+
+    def to_bytes(self, df: pd.DataFrame, fmt: str = PARQUET) -> bytes:
+        """
+        Returns the saved table as bytes, e.g. for a download button.
+        """
+        buffer = io.BytesIO()
+        self.save(df, buffer, fmt)
+        return buffer.getvalue()
+
+    @staticmethod
+    def load(source: Target, columns: Optional[Sequence[str]] = None, fmt: Optional[str] = None) -> pd.DataFrame:
+        """
+        Reads a table from a path or a binary file object (e.g. Streamlit's UploadedFile).
+
+        :param source: Path or binary file object.
+        :param columns: Columns to read; all columns by default. Parquet and Arrow files skip the others entirely.
+        :param fmt: "csv", "parquet" or "arrow"; by default taken from the file (or upload) name.
+        :return: The table, with dictionary-encoded columns as categoricals.
+        """
+        fmt = fmt or DatasetStore.format_of(source if isinstance(source, (str, os.PathLike)) else source.name)
+        if fmt == DatasetStore.CSV:
+            return pd.read_csv(source, usecols=columns)
+        pa = DatasetStore._import_pyarrow()
+        columns = list(columns) if columns is not None else None
+        if fmt == DatasetStore.PARQUET:
+            import pyarrow.parquet as pq
+            if isinstance(source, (str, os.PathLike)):
+                table = pq.read_table(source, columns=columns, memory_map=True)
+            else:
+                table = pq.read_table(DatasetStore._buffer_of(pa, source), columns=columns)
+        else:
+            import pyarrow.ipc as ipc
+            if isinstance(source, (str, os.PathLike)):
+                with pa.memory_map(str(source), "r") as mapped:
+                    table = ipc.open_file(mapped).read_all()
+            else:
+                table = ipc.open_file(DatasetStore._buffer_of(pa, source)).read_all()
+            if columns is not None:
+                table = table.select(columns)
+        return table.to_pandas()
+
+    @staticmethod
+    def _buffer_of(pa, stream: BinaryIO):
+        """
+        Wraps an in-memory upload without copying it; other streams are read once.
+        """
+        if hasattr(stream, "getbuffer"):
+            return pa.BufferReader(pa.py_buffer(stream.getbuffer()))
+        stream.seek(0)
+        return pa.BufferReader(stream.read())
+
+    @staticmethod
+    def _encode_dictionaries(df: pd.DataFrame) -> pd.DataFrame:
+        """
+        Converts repetitive string columns to categoricals, which pyarrow stores dictionary-encoded.
+        """
+        encoded = {}
+        for column in df.columns:
+            values = df[column]
+            if values.dtype == object and len(values) and values.nunique() <= DatasetStore.DICTIONARY_RATIO * len(values):
+                encoded[column] = values.astype("category")
+        return df.assign(**encoded) if encoded else df
+
+    @staticmethod
+    def _import_pyarrow():
+        try:
+            import pyarrow
+        except ImportError as e:
+            raise ImportError("Parquet and Arrow datasets require pyarrow (pip install pyarrow)") from e
+        return pyarrow
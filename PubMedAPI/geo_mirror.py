@@ -0,0 +1,320 @@
+import csv
+import gzip
+import itertools
+import os
+import re
+import sqlite3
+import tarfile
+import threading
+import warnings
+import xml.etree.ElementTree as ET
+from typing import IO, Iterator, Optional
+from Diagnostics.metrics import timed
+from .pubmed_api import PubMedAPI
+
+
+class GeoMirror:
+    """
+    Local, indexed copy of GEO series metadata, used instead of E-utilities when NCBI is slow or unavailable.
+
+    The mirror directory holds bulk-downloaded family files and PMID -> GSE link tables:
+    - MINiML family files (`*.xml`, `*.xml.gz`, or the `*_family.xml.tgz` archives from the GEO FTP site),
+    - SOFT family files (`*.soft`, `*.soft.gz`),
+    - link tables (`*.csv`, `*.tsv`, optionally gzip-compressed) with a PMID and a GSE column;
+      PubMed ids listed in the family files themselves are linked as well.
+
+    `build_index` parses the files once into a SQLite index (by default `.geo_mirror.sqlite` in the mirror
+    directory): one row per series keyed by its dataset id, and (pmid, dataset id) pairs in a table clustered
+    by PMID, so every lookup is a single B-tree seek. Rebuilding only re-parses files whose size or
+    modification time changed.
+
+    Dataset ids follow the GDS numbering used by ELink and ESummary for series: 200000000 + GSE number.
+    """
+    DIRECTORY = os.getenv("PUBTRENDS_GEO_MIRROR")
+    INDEX_NAME = ".geo_mirror.sqlite"
+    SERIES_OFFSET = 200_000_000
+    MINIML_EXTENSIONS = (".xml", ".xml.gz", ".xml.tgz", ".tgz", ".tar.gz")
+    SOFT_EXTENSIONS = (".soft", ".soft.gz")
+    LINK_EXTENSIONS = (".csv", ".csv.gz", ".tsv", ".tsv.gz")
+    PMID_COLUMNS = ("pmid", "pubmed_id", "pubmed id", "pubmed")
+    GSE_COLUMNS = ("gse", "gse_code", "accession", "series", "series_id")
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS series (
+            dataset_idx INTEGER PRIMARY KEY, gse TEXT, title TEXT, summary TEXT, organism TEXT,
+            experiment_type TEXT, overall_design TEXT, source TEXT);
+        CREATE INDEX IF NOT EXISTS series_source ON series (source);
+        CREATE TABLE IF NOT EXISTS links (
+            pmid INTEGER, dataset_idx INTEGER, source TEXT, PRIMARY KEY (pmid, dataset_idx, source)) WITHOUT ROWID;
+        CREATE INDEX IF NOT EXISTS links_source ON links (source);
+        CREATE TABLE IF NOT EXISTS files (path TEXT PRIMARY KEY, size INTEGER, mtime REAL);
+    """
+
+    def __init__(self, directory: str, index_path: Optional[str] = None):
+        """
+        Parameters:
+        directory (str): Mirror directory with family files and link tables.
+        index_path (str): Location of the SQLite index; inside the mirror directory by default.
+        """
+        self.directory = os.path.abspath(directory)
+        self.index_path = index_path or os.path.join(self.directory, GeoMirror.INDEX_NAME)
+        self._connection = sqlite3.connect(self.index_path, check_same_thread=False)
+        self._connection.executescript(GeoMirror.SCHEMA)
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def dataset_idx_of(gse_code: str) -> int:
+        return GeoMirror.SERIES_OFFSET + int(re.sub(r"^GSE", "", gse_code.strip().upper()))
+
+    # ----------------------------------- Index -----------------------------------
+
+    @timed("mirror.build_index")
+    def build_index(self, rebuild: bool = False) -> int:
+        """
+        Parses new or changed files of the mirror directory into the index and drops the rows of deleted files.
+
+        :param rebuild: Re-parse every file.
+        :return: Number of parsed files.
+        """
+        with self._lock, self._connection:
+            if rebuild:
+                for table in ("series", "links", "files"):
+                    self._connection.execute(f"DELETE FROM {table}")
+            indexed = dict(((path, (size, mtime)) for path, size, mtime
+                            in self._connection.execute("SELECT path, size, mtime FROM files")))
+            found = {}
+            for path in self._mirror_files():
+                stat = os.stat(path)
+                found[path] = (stat.st_size, stat.st_mtime)
+            for path in set(indexed) - set(found):
+                self._forget(path)
+            changed = [path for path, signature in found.items() if indexed.get(path) != signature]
+            for path in changed:
+                self._forget(path)
+                self._index_file(path)
+                self._connection.execute("INSERT OR REPLACE INTO files VALUES (?, ?, ?)", (path, *found[path]))
+        return len(changed)
+
+    def _mirror_files(self) -> Iterator[str]:
+        for root, _, names in os.walk(self.directory):
+            for name in sorted(names):
+                path = os.path.join(root, name)
+                if path != self.index_path and GeoMirror._kind_of(name) is not None:
+                    yield path
+
+    @staticmethod
+    def _kind_of(name: str) -> Optional[str]:
+        name = name.lower()
+        if name.endswith(GeoMirror.SOFT_EXTENSIONS):
+            return "soft"
+        if name.endswith(GeoMirror.MINIML_EXTENSIONS):
+            return "miniml"
+        if name.endswith(GeoMirror.LINK_EXTENSIONS):
+            return "links"
+        return None
+
+    def _forget(self, path: str) -> None:
+        for table in ("series", "links", "files"):
+            column = "path" if table == "files" else "source"
+            self._connection.execute(f"DELETE FROM {table} WHERE {column} = ?", (path,))
+
+    def _index_file(self, path: str) -> None:
+        kind = GeoMirror._kind_of(os.path.basename(path))
+        if kind == "links":
+            self._connection.executemany("INSERT OR IGNORE INTO links VALUES (?, ?, ?)",
+                                         ((pmid, dataset_idx, path) for pmid, dataset_idx in self._read_links(path)))
+            return
+        records = self._read_soft(path) if kind == "soft" else self._read_miniml(path)
+        for record in records:
+            dataset_idx = GeoMirror.dataset_idx_of(record["gse"])
+            self._connection.execute(
+                "INSERT OR REPLACE INTO series VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (dataset_idx, record["gse"], record["title"], record["summary"], record["organism"],
+                 record["experiment_type"], record["overall_design"], path))
+            self._connection.executemany("INSERT OR IGNORE INTO links VALUES (?, ?, ?)",
+                                         ((pmid, dataset_idx, path) for pmid in record["pmids"]))
+
+    # ----------------------------------- Parsers -----------------------------------
+
+    @staticmethod
+    def _open_text(path: str) -> IO[str]:
+        if path.lower().endswith(".gz"):
+            return gzip.open(path, "rt", encoding="utf-8", errors="replace")
+        return open(path, "r", encoding="utf-8", errors="replace")
+
+    @staticmethod
+    def _record(gse: str, title: str, summary: str, overall_design: Optional[str], types: list[str],
+                organisms: list[str], pmids: list[str]) -> dict:
+        return {"gse": gse, "title": title, "summary": summary, "overall_design": overall_design,
+                "experiment_type": "; ".join(dict.fromkeys(types)),
+                "organism": "; ".join(dict.fromkeys(organisms)),
+                "pmids": [int(pmid) for pmid in dict.fromkeys(pmids) if pmid.strip().isdigit()]}
+
+    def _read_miniml(self, path: str) -> Iterator[dict]:
+        """
+        Yields the series of a MINiML file. Archives are read member by member without extracting them.
+        """
+        lower = path.lower()
+        if lower.endswith((".tgz", ".tar.gz")):
+            with tarfile.open(path, "r:gz") as archive:
+                for member in archive:
+                    if member.isfile() and member.name.lower().endswith(".xml"):
+                        yield from GeoMirror._parse_miniml(archive.extractfile(member))
+        elif lower.endswith(".gz"):
+            with gzip.open(path, "rb") as stream:
+                yield from GeoMirror._parse_miniml(stream)
+        else:
+            with open(path, "rb") as stream:
+                yield from GeoMirror._parse_miniml(stream)
+
+    @staticmethod
+    def _parse_miniml(stream: IO[bytes]) -> Iterator[dict]:
+        """
+        Streams a MINiML document: samples and platforms are cleared once their organisms are read,
+        so family files with thousands of samples are parsed in constant memory.
+        """
+        sample_organisms, platform_organisms, series = [], [], []
+        for _, element in ET.iterparse(stream, events=("end",)):
+            tag = element.tag.rsplit("}", 1)[-1]
+            if tag in ("Sample", "Platform"):
+                organisms = [organism.text.strip() for organism in element.iter()
+                             if organism.tag.rsplit("}", 1)[-1] == "Organism" and organism.text]
+                (sample_organisms if tag == "Sample" else platform_organisms).extend(organisms)
+                element.clear()
+            elif tag == "Series":
+                fields = {}
+                for child in element:
+                    fields.setdefault(child.tag.rsplit("}", 1)[-1], []).append((child.text or "").strip())
+                series.append((element.get("iid"), fields))
+                element.clear()
+        for gse, fields in series:
+            yield GeoMirror._record(
+                gse=gse, title=fields.get("Title", [""])[0], summary=fields.get("Summary", [""])[0],
+                overall_design=fields.get("Overall-Design", [None])[0], types=fields.get("Type", []),
+                organisms=sample_organisms or platform_organisms, pmids=fields.get("Pubmed-ID", []))
+
+    def _read_soft(self, path: str) -> Iterator[dict]:
+        """
+        Yields the series of a SOFT family file. Data table rows are skipped without being split.
+        """
+        fields, sample_organisms, platform_organisms = {}, [], []
+        with GeoMirror._open_text(path) as lines:
+            for line in lines:
+                if line[0] not in "!^":
+                    continue
+                key, _, value = line.partition("=")
+                key, value = key.strip(), value.strip()
+                if key.startswith("!Series_"):
+                    fields.setdefault(key[len("!Series_"):], []).append(value)
+                elif key.startswith("!Sample_organism_ch"):
+                    sample_organisms.append(value)
+                elif key == "!Platform_organism":
+                    platform_organisms.append(value)
+        if "geo_accession" not in fields:
+            return
+        yield GeoMirror._record(
+            gse=fields["geo_accession"][0], title=fields.get("title", [""])[0],
+            summary=" ".join(fields.get("summary", [])),
+            overall_design=" ".join(fields["overall_design"]) if "overall_design" in fields else None,
+            types=fields.get("type", []), organisms=sample_organisms or platform_organisms,
+            pmids=fields.get("pubmed_id", []))
+
+    @staticmethod
+    def _read_links(path: str) -> Iterator[tuple[int, int]]:
+        """
+        Reads (PMID, dataset id) pairs from a delimited table. The PMID and GSE columns are found by their
+        header names; without a header the first two columns are used. Tables with a header lacking either
+        column (unrelated CSV files in the mirror directory) are skipped with a warning.
+        """
+        with GeoMirror._open_text(path) as f:
+            sample = f.read(4096)
+            f.seek(0)
+            dialect = csv.Sniffer().sniff(sample, delimiters=",\t;") if sample.strip() else csv.excel
+            rows = csv.reader(f, dialect)
+            header = next(rows, None)
+            if header is None:
+                return
+            names = [name.strip().lower() for name in header]
+            if header[0].strip().isdigit():
+                pmid_column, gse_column = 0, 1
+                rows = itertools.chain([header], rows)
+            else:
+                pmid_column = next((i for i, name in enumerate(names) if name in GeoMirror.PMID_COLUMNS), None)
+                gse_column = next((i for i, name in enumerate(names) if name in GeoMirror.GSE_COLUMNS), None)
+                if pmid_column is None or gse_column is None:
+                    warnings.warn(f"Skipping {path}: its header has no PMID or GSE column")
+                    return
+            for row in rows:
+                try:
+                    yield int(row[pmid_column]), GeoMirror.dataset_idx_of(row[gse_column])
+                except (IndexError, ValueError):
+                    continue
+
+    # ----------------------------------- Lookups -----------------------------------
+
+    def dataset_indices(self, pmid: int) -> list[int]:
+        with self._lock:
+            rows = self._connection.execute("SELECT DISTINCT dataset_idx FROM links WHERE pmid = ? ORDER BY dataset_idx",
+                                            (int(pmid),)).fetchall()
+        return [row[0] for row in rows]
+
+    def series(self, dataset_idx: int) -> Optional[dict]:
+        """
+        Returns the indexed fields of a series (gse, title, summary, organism, experiment_type, overall_design),
+        or None if it is not in the mirror.
+        """
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT gse, title, summary, organism, experiment_type, overall_design FROM series WHERE dataset_idx = ?",
+                (int(dataset_idx),)).fetchone()
+        if row is None:
+            return None
+        return dict(zip(("gse", "title", "summary", "organism", "experiment_type", "overall_design"), row))
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._connection.execute("SELECT COUNT(*) FROM series").fetchone()[0]
+
+    def close(self) -> None:
+        self._connection.close()
+
+
+class MirroredPubMedAPI(PubMedAPI):
+    """
+    Fetch job that answers every lookup from a GeoMirror index instead of E-utilities.
+    Events, checkpoints and the resulting table are the same as for live fetches; series missing
+    from the mirror are reported as "not_in_mirror" errors.
+    """
+    ERROR_LABELS = {**PubMedAPI.ERROR_LABELS, "not_in_mirror": "Datasets missing from the GEO mirror"}
+    PERMANENT_ERRORS = PubMedAPI.PERMANENT_ERRORS | {"not_in_mirror"}
+
+    def __init__(self, mirror: GeoMirror):
+        super().__init__()
+        self.mirror = mirror
+        self._last_series = None
+
+    @timed("mirror.links")
+    def _get_dataset_idx(self, pmid: int) -> list[int]:
+        indices = self.mirror.dataset_indices(pmid)
+        if not indices:
+            self.publish_error("no_datasets", f"No datasets found for PMID: {pmid}, pmid abandoned")
+        return indices
+
+    @timed("mirror.series")
+    def _get_info(self, dataset_idx: int) -> PubMedAPI.PmData | None:
+        series = self._last_series = self.mirror.series(dataset_idx)
+        if series is None:
+            self.publish_error("not_in_mirror", f"GSE code: {dataset_idx} is not in the GEO mirror, pmid abandoned")
+            return None
+        return self.PmData(Title=series["title"], Summary=series["summary"], Organism=series["organism"],
+                           Experiment_type=series["experiment_type"], GSE_code=series["gse"],
+                           Overall_design=series["overall_design"])
+
+    @timed("mirror.overall_design")
+    def _get_overall_design(self, gse_code: str) -> str | None:
+        """
+        Reuses the series read by the preceding `_get_info` call, which is made for the same GSE code.
+        """
+        series = self._last_series
+        if series is None or series["gse"] != gse_code:
+            series = self.mirror.series(GeoMirror.dataset_idx_of(gse_code))
+        return series["overall_design"] if series is not None else None
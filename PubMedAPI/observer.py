@@ -1,29 +1,140 @@
+import time
+import weakref
 from abc import abstractmethod
+from collections import Counter
+from dataclasses import dataclass
 
 class Observable:
     """
     A class that represents an observable object in the observer pattern.
     It maintains a list of observers and notifies them of any events.
+    Observers are held through weak references, so an observer (e.g. the MainApp of a
+    finished Streamlit session) is released automatically once nothing else uses it.
     """
     def __init__(self):
-        self._observers = []
+        self._observers = weakref.WeakSet()
 
     def attach(self,observer):
-        if observer not in self._observers:
-            self._observers.append(observer)
+        self._observers.add(observer)
 
     def detach(self,observer):
-        if observer in self._observers:
-            self._observers.remove(observer)
+        self._observers.discard(observer)
 
     def notify(self,event_type: str,*args,**kwargs):
-        for observer in self._observers:
+        for observer in list(self._observers):
             if event_type=="error":
                 observer.update_on_error(self,*args,**kwargs)
             elif event_type=="progress":
                 observer.update_progress(self,*args,**kwargs)
 
 
+@dataclass(frozen=True)
+class ProgressEvent:
+    """
+    Structured progress payload sent with every "progress" notification.
+    Includes:
+    - Stage name (e.g. "fetch")
+    - Number of processed items
+    - Total number of items
+    - Throughput in items per second since the stage started
+    """
+    stage: str
+    done: int
+    total: int
+    throughput: float
+
+    @property
+    def measure(self) -> float:
+        return self.done / self.total if self.total else 1.0
+
+
+class EventBus(Observable):
+    """
+    Observable that shields observers from high-frequency events.
+
+    - Progress events are coalesced, so observers are notified at most MAX_UI_RATE times per second.
+      The final event of a stage (done == total) is always delivered.
+    - Error events are aggregated into counts per category and delivered as a single summary
+      message, at the same maximum rate. `flush` delivers whatever is still pending.
+
+    Notifications keep the original keyword arguments (`measure` for progress, `message` for errors),
+    extended with the structured `event` and `counts` payloads.
+    """
+    MAX_UI_RATE = 10
+    ERROR_LABELS = {}
+
+    def __init__(self, max_rate: float = MAX_UI_RATE):
+        super().__init__()
+        self._min_interval = 1 / max_rate
+        self._last_progress_emit = float("-inf")
+        self._last_error_emit = float("-inf")
+        self._stage_started = {}
+        self._error_counts = Counter()
+        self._last_error_message = None
+        self._errors_pending = False
+
+    def reset_events(self) -> None:
+        """
+        Clears stage timers and error counters before a new job starts.
+        """
+        self._last_progress_emit = float("-inf")
+        self._last_error_emit = float("-inf")
+        self._stage_started.clear()
+        self._error_counts.clear()
+        self._last_error_message = None
+        self._errors_pending = False
+
+    @property
+    def error_counts(self) -> dict[str, int]:
+        return dict(self._error_counts)
+
+    def publish_progress(self, stage: str, done: int, total: int) -> None:
+        now = time.monotonic()
+        started = self._stage_started.setdefault(stage, now)
+        if done < total and now - self._last_progress_emit < self._min_interval:
+            return
+        self._last_progress_emit = now
+        elapsed = now - started
+        event = ProgressEvent(stage=stage, done=done, total=total,
+                              throughput=done / elapsed if elapsed > 0 else 0.0)
+        self.notify(event_type="progress", measure=event.measure, event=event)
+
+    def publish_error(self, category: str, message: str) -> None:
+        self._error_counts[category] += 1
+        self._last_error_message = message
+        self._errors_pending = True
+        now = time.monotonic()
+        if now - self._last_error_emit >= self._min_interval:
+            self._emit_errors(now)
+
+    def merge_errors(self, counts: dict[str, int], message: str) -> None:
+        """
+        Adds error counts collected elsewhere (e.g. by a worker process) to this bus.
+        """
+        if not counts:
+            return
+        self._error_counts.update(counts)
+        self._last_error_message = message
+        self._errors_pending = True
+
+    def flush(self) -> None:
+        """
+        Delivers the pending error summary, if any. Called at the end of a job.
+        """
+        if self._errors_pending:
+            self._emit_errors(time.monotonic())
+
+    def _emit_errors(self, now: float) -> None:
+        self._last_error_emit = now
+        self._errors_pending = False
+        self.notify(event_type="error", message=self._error_summary(), counts=self.error_counts)
+
+    def _error_summary(self) -> str:
+        parts = [f"{self.ERROR_LABELS.get(category, category)}: {count}"
+                 for category, count in self._error_counts.most_common()]
+        return f"{'; '.join(parts)} (last: {self._last_error_message})"
+
+
 class Observer:
     """
     Abstract base class for observers in the Observer pattern.
@@ -36,4 +147,4 @@ class Observer:
         pass
     @abstractmethod
     def update_progress(self,*args,**kwargs):
-        pass
\ No newline at end of file
+        pass
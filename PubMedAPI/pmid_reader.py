@@ -0,0 +1,156 @@
+import csv
+import gzip
+import io
+import os
+from dataclasses import dataclass, field
+from typing import BinaryIO, Iterator, Optional, Union
+
+Source = Union[str, os.PathLike, BinaryIO]
+
+
+@dataclass
+class PmidReadReport:
+    """
+    Result of reading one or more PMID files.
+    Includes:
+    - Unique PMIDs in the order of their first occurrence
+    - Number of non-empty lines read
+    - Number of lines that are not a valid PMID
+    - Number of repeated PMIDs
+    - A few invalid lines as examples
+    """
+    pmids: list[int] = field(default_factory=list)
+    total_lines: int = 0
+    invalid_lines: int = 0
+    duplicates: int = 0
+    invalid_examples: list[str] = field(default_factory=list)
+
+    def summary(self) -> str:
+        text = f"{len(self.pmids)} unique PMIDs read from {self.total_lines} lines"
+        if self.duplicates:
+            text += f", {self.duplicates} duplicates skipped"
+        if self.invalid_lines:
+            examples = ", ".join(repr(example) for example in self.invalid_examples)
+            text += f", {self.invalid_lines} invalid lines skipped (e.g. {examples})"
+        return text
+
+
+class PmidReader:
+    """
+    Streaming PMID parser for large uploads.
+
+    Accepts plain text (one PMID per line), CSV/TSV files with a PMID column and gzip-compressed
+    versions of both. Files are decoded and parsed line by line, so memory use is bounded by the
+    number of unique PMIDs rather than the file size. Deduplication is O(n) and keeps the input order.
+    """
+    MAX_INVALID_EXAMPLES = 5
+    PMID_COLUMNS = ("pmid", "pmids", "pubmed_id", "pubmedid", "pubmed id")
+    DELIMITERS = ",\t;"
+
+    def __init__(self, column: Optional[Union[str, int]] = None):
+        """
+        Parameters:
+        column (str | int): CSV column holding the PMIDs, by header name or 0-based index.
+                            By default a column named like PMID_COLUMNS, or the first column.
+        """
+        self.column = column
+
+    def read(self, *sources: Source) -> PmidReadReport:
+        """
+        Reads PMIDs from file paths or binary file objects (e.g. Streamlit's UploadedFile).
+        PMIDs repeated across sources are reported as duplicates.
+        """
+        report = PmidReadReport()
+        seen = set()
+        for source in sources:
+            for pmid in self._iter_source(source, report):
+                if pmid in seen:
+                    report.duplicates += 1
+                else:
+                    seen.add(pmid)
+                    report.pmids.append(pmid)
+        return report
+
+    def _iter_source(self, source: Source, report: PmidReadReport) -> Iterator[int]:
+        if isinstance(source, (str, os.PathLike)):
+            with open(source, "rb") as f:
+                yield from self._iter_stream(f, report)
+        else:
+            yield from self._iter_stream(source, report)
+
+    def _iter_stream(self, stream: BinaryIO, report: PmidReadReport) -> Iterator[int]:
+        if stream.seekable():
+            start = stream.tell()
+            magic = stream.read(2)
+            stream.seek(start)
+        else:
+            if not hasattr(stream, "peek"):
+                stream = io.BufferedReader(stream)
+            magic = stream.peek(2)[:2]
+        if magic == b"\x1f\x8b":
+            stream = gzip.GzipFile(fileobj=stream)
+        text = io.TextIOWrapper(stream, encoding="utf-8-sig", errors="replace", newline="")
+        try:
+            lines = (line for line in text if line.strip())
+            first_line = next(lines, None)
+            if first_line is None:
+                return
+            delimiter = next((d for d in PmidReader.DELIMITERS if d in first_line), None)
+            if delimiter is None:
+                yield from self._parse_plain(first_line, lines, report)
+            else:
+                yield from self._parse_csv(first_line, lines, delimiter, report)
+        finally:
+            text.detach()
+
+    def _parse_plain(self, first_line: str, lines: Iterator[str], report: PmidReadReport) -> Iterator[int]:
+        for line in self._chain(first_line, lines):
+            pmid = self._to_pmid(line.replace(" ", ""), report)
+            if pmid is not None:
+                yield pmid
+
+    def _parse_csv(self, first_line: str, lines: Iterator[str], delimiter: str,
+                   report: PmidReadReport) -> Iterator[int]:
+        rows = csv.reader(self._chain(first_line, lines), delimiter=delimiter)
+        header = [cell.strip() for cell in next(rows)]
+        column = self._resolve_column(header)
+        if column is None:
+            # no recognisable header: the first row is data and PMIDs are in the first column
+            column = 0 if self.column is None else int(self.column)
+            rows = self._chain(header, rows)
+        for row in rows:
+            pmid = self._to_pmid(row[column] if column < len(row) else "", report)
+            if pmid is not None:
+                yield pmid
+
+    def _resolve_column(self, header: list[str]) -> Optional[int]:
+        names = [name.lower() for name in header]
+        if isinstance(self.column, str) and not self.column.isdigit():
+            if self.column.lower() not in names:
+                raise ValueError(f"Column {self.column!r} not found in {header}")
+            return names.index(self.column.lower())
+        if self.column is not None:
+            index = int(self.column)
+            return index if not self._is_pmid(header[index] if index < len(header) else "") else None
+        return next((names.index(name) for name in PmidReader.PMID_COLUMNS if name in names), None)
+
+    @staticmethod
+    def _chain(first, rest):
+        yield first
+        yield from rest
+
+    @staticmethod
+    def _is_pmid(value: str) -> bool:
+        value = value.strip()
+        return value.isascii() and value.isdigit()
+
+    @classmethod
+    def _to_pmid(cls, value: str, report: PmidReadReport) -> Optional[int]:
+        report.total_lines += 1
+        value = value.strip()
+        if cls._is_pmid(value) and int(value) > 0:
+            return int(value)
+        report.invalid_lines += 1
+        if len(report.invalid_examples) < PmidReader.MAX_INVALID_EXAMPLES:
+            report.invalid_examples.append(value[:40])
+        return None
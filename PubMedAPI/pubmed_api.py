@@ -1,17 +1,40 @@
+import json
 from dataclasses import dataclass
 from typing import Optional
 import pandas as pd
-import requests
 import xmltodict
-from .singleton import Singleton
-from .observer import Observable
-
-class PubMedAPI(Observable,metaclass=Singleton):
+from Diagnostics.metrics import timed
+from .connection_pool import SharedConnectionPool
+from .observer import EventBus
+from .pmid_reader import PmidReader
+from .checkpoint import CheckpointJournal
+from .resilience import CircuitOpenError, RetryBudget
+from .result_accumulator import ResultAccumulator
+
+class PubMedAPI(EventBus):
     """
     This class is responsible for generating a DataFrame from a text file containing a list of pmids.
+
+    Every instance is a single fetch job with its own PMIDs, rows and observers. Jobs only share
+    the process-wide SharedConnectionPool (keep-alive connections and response cache), so
+    concurrent users never see each other's rows.
     """
     MIN_SIZE=10
-    @dataclass
+    BASE_URL_DB_IDX = "https://eutils.ncbi.nlm.nih.gov/entrez/eutils/elink.fcgi"
+    BASE_URL_SUMMARY = "https://eutils.ncbi.nlm.nih.gov/entrez/eutils/esummary.fcgi"
+    BASE_URL_OVERALL_DESIGN = "https://www.ncbi.nlm.nih.gov/geo/query/acc.cgi"
+    ERROR_LABELS = {
+        "no_datasets": "PMIDs without datasets",
+        "db_idx": "PMIDs with failed dataset lookup",
+        "summary": "Datasets with failed summary",
+        "overall_design": "GSE codes with failed Overall Design",
+        "circuit_open": "Requests skipped while NCBI is unavailable",
+    }
+    """
+    Error categories that will not change on retry, so PMIDs with only these errors count as finished
+    """
+    PERMANENT_ERRORS = {"no_datasets"}
+    @dataclass(slots=True)
     class PmData:
         """
         Holds metadata for a specific dataset, identified by a GSE code.
@@ -31,49 +54,61 @@ class PubMedAPI(Observable,metaclass=Singleton):
         Overall_design: str = None
 
 
-    def __init__(self):
+    def __init__(self, pool: Optional[SharedConnectionPool] = None):
         super().__init__()
         self.df = None
-        self.session = requests.Session()
-        self.rows_data = []
+        self.pool = pool if pool is not None else SharedConnectionPool()
+        self.rows_data = ResultAccumulator()
         self.pmids = []
+        self.retry_budget = RetryBudget()
 
-    def create_dataframe(self, list_of_pmids: Optional[list[int]] = None) -> None:
+    def create_dataframe(self, list_of_pmids: Optional[list[int]] = None,
+                         journal: Optional[CheckpointJournal] = None) -> None:
         """
         Processes a list of PMIDs provided by the user (from a .txt file) and constructs a DataFrame
         by retrieving dataset information for each valid PMID. For each PMID, the function iterates
         through all related datasets, collects their details, and updates a progress bar. If the final
         DataFrame contains fewer than 10 rows, an error message is displayed.
+        Rows are collected column by column in a ResultAccumulator, deduplicated by (PMID, dataset) on insert.
+        Rows collected by a previous call are discarded, and the row buffer is released once the
+        DataFrame is built.
+        If a checkpoint journal is given, PMIDs and datasets already stored in it are not fetched again,
+        and newly fetched ones are appended to it.
 
         :param list_of_pmids: List of PMIDs to process.
+        :param journal: Optional checkpoint journal of this job.
         """
+        self.rows_data = ResultAccumulator()
+        self.retry_budget = RetryBudget()
+        self.reset_events()
         if list_of_pmids is None:
             self._load_pmids_from_file()
         else:
             self._load_pmids_from_user(list_of_pmids=list_of_pmids)
-        for idx,pubmed_idx in enumerate(self.pmids):
-            dataset_indices = self._get_dataset_idx(int(pubmed_idx))
-            for dataset_idx in dataset_indices:
-                pmid_data = self._get_info(dataset_idx)
-                overall_design = self._get_overall_design(pmid_data.GSE_code)
-
-                if pmid_data is None or overall_design is None:
-                    continue
-                row_dict = {
-                    "Pmid": pubmed_idx,
-                    "Geo_dataset_ind": dataset_idx,
-                    "GSE_code": pmid_data.GSE_code,
-                    "Title": pmid_data.Title,
-                    "Summary": pmid_data.Summary,
-                    "Overall_design": overall_design,
-                    "Experiment_type": pmid_data.Experiment_type,
-                    "Organism": pmid_data.Organism
-                }
-
-                self.rows_data.append(row_dict)
-            self.notify(event_type="progress",measure=(idx+1)/len(self.pmids))
-
-        self.df = pd.DataFrame(self.rows_data).drop_duplicates(subset=["Pmid", "Geo_dataset_ind"])
+        self.publish_progress(stage="fetch", done=0, total=len(self.pmids))
+        try:
+            for idx,pubmed_idx in enumerate(self.pmids):
+                failures_before = self._transient_failures()
+                if journal is not None and pubmed_idx in journal.completed_pmids:
+                    dataset_indices = journal.completed_pmids[pubmed_idx]
+                else:
+                    dataset_indices = self._get_dataset_idx(int(pubmed_idx))
+                for dataset_idx in dataset_indices:
+                    pmid_data, overall_design = self._get_dataset(dataset_idx, journal)
+                    if pmid_data is None or overall_design is None:
+                        continue
+                    self.rows_data.add(pubmed_idx, dataset_idx, pmid_data, overall_design)
+                if (journal is not None and pubmed_idx not in journal.completed_pmids
+                        and self._transient_failures() == failures_before):
+                    journal.record_pmid(pubmed_idx, dataset_indices)
+                self.publish_progress(stage="fetch", done=idx+1, total=len(self.pmids))
+        finally:
+            self.flush()
+            if journal is not None:
+                journal.close()
+
+        self.df = self.rows_data.to_dataframe()
+        self.rows_data = ResultAccumulator()
         if self.df.shape[0] <=PubMedAPI.MIN_SIZE:
             self.notify(event_type="error",message="Data Frame has less than 10 rows, please provide more unique gse_codes")
             return
@@ -83,15 +118,33 @@ class PubMedAPI(Observable,metaclass=Singleton):
         """
         Loads a list of PMIDs from a file named 'PMIDs_list.txt'
         """
-        with open('PMIDs_list.txt', 'r') as f:
-            for line in f:
-                line = line.strip()
-                if line.isdigit() and int(line) not in self.pmids:
-                    self.pmids.append(int(line))
+        self.pmids = PmidReader().read('PMIDs_list.txt').pmids
 
     def _load_pmids_from_user(self, list_of_pmids: list[int]) -> None:
         self.pmids = list_of_pmids
 
+    def _transient_failures(self) -> int:
+        return sum(count for category, count in self._error_counts.items()
+                   if category not in self.PERMANENT_ERRORS)
+
+    def _get_dataset(self, dataset_idx: int, journal: Optional[CheckpointJournal]) -> tuple[PmData | None, str | None]:
+        """
+        Returns the summary and the Overall Design of a dataset, from the journal when it was already fetched.
+        Datasets fetched without errors are stored in the journal.
+        """
+        if journal is not None and dataset_idx in journal.datasets:
+            info, overall_design = journal.datasets[dataset_idx]
+            return self.PmData(**info), overall_design
+        failures_before = self._transient_failures()
+        pmid_data = self._get_info(dataset_idx)
+        if pmid_data is None:
+            return None, None
+        overall_design = self._get_overall_design(pmid_data.GSE_code)
+        if journal is not None and self._transient_failures() == failures_before:
+            journal.record_dataset(dataset_idx, pmid_data, overall_design)
+        return pmid_data, overall_design
+
+    @timed("fetch.elink")
     def _get_dataset_idx(self, pmid: int) -> list[int]:
         """
         Returns a list of datasets related to the given PMID by calling an API function.
@@ -101,7 +154,6 @@ class PubMedAPI(Observable,metaclass=Singleton):
         :param pmid: The PubMed ID for which to retrieve related datasets.
         :return: A list of datasets related to the given PMID.
         """
-        base_url = f"https://eutils.ncbi.nlm.nih.gov/entrez/eutils/elink.fcgi"
         params = {
             "dbfrom": "pubmed",
             "db": "gds",
@@ -110,17 +162,20 @@ class PubMedAPI(Observable,metaclass=Singleton):
             "retmode": "json"
         }
         try:
-            response = self.session.get(base_url, params=params)
-            response.raise_for_status()
-            indices = response.json().get('linksets', [])[0].get('linksetdbs', [])[0].get('links', [])
+            response = json.loads(self.pool.get(PubMedAPI.BASE_URL_DB_IDX, params, self.retry_budget))
+            indices = response.get('linksets', [])[0].get('linksetdbs', [])[0].get('links', [])
             return [int(idx) for idx in indices]
+        except CircuitOpenError as e:
+            self.publish_error("circuit_open", f"PMID: {pmid} skipped, {e}")
+            return []
         except IndexError:
-            self.notify(event_type="error",message=f"No datasets found for PMID: {pmid}, pmid abandoned")
+            self.publish_error("no_datasets", f"No datasets found for PMID: {pmid}, pmid abandoned")
             return []
         except Exception:
-            self.notify(event_type="error",message=f"Error with PMID: {pmid}, pmid abandoned")
+            self.publish_error("db_idx", f"Error with PMID: {pmid}, pmid abandoned")
             return []
 
+    @timed("fetch.esummary")
     def _get_info(self, dataset_idx: int) -> PmData | None:
         """
         Retrieves information about a dataset (including Title, Summary, Organism,
@@ -130,16 +185,14 @@ class PubMedAPI(Observable,metaclass=Singleton):
         :return: A PmData object containing the dataset’s details, or None if
                  any problems occur.
         """
-        base_url = f"https://eutils.ncbi.nlm.nih.gov/entrez/eutils/esummary.fcgi"
         params = {
             "db": "gds",
             "id": dataset_idx,
             "retmode": "json"
         }
         try:
-            response = self.session.get(base_url, params=params)
-            response.raise_for_status()
-            info_part = response.json()['result'][f'{dataset_idx}']
+            response = json.loads(self.pool.get(PubMedAPI.BASE_URL_SUMMARY, params, self.retry_budget))
+            info_part = response['result'][f'{dataset_idx}']
             pmid_data = self.PmData(
                 Title=info_part['title'],
                 Summary=info_part['summary'],
@@ -148,10 +201,14 @@ class PubMedAPI(Observable,metaclass=Singleton):
                 GSE_code=info_part['accession']
             )
             return pmid_data
+        except CircuitOpenError as e:
+            self.publish_error("circuit_open", f"GSE code: {dataset_idx} skipped, {e}")
+            return None
         except Exception:
-            self.notify(event_type="error",message=f"Error with data from GSE code: {dataset_idx}, pmid abandoned")
+            self.publish_error("summary", f"Error with data from GSE code: {dataset_idx}, pmid abandoned")
             return None
 
+    @timed("fetch.overall_design")
     def _get_overall_design(self, gse_code: str) -> str | None:
         """
         Retrieves the overall design of a dataset based on the provided GSE code.
@@ -160,18 +217,18 @@ class PubMedAPI(Observable,metaclass=Singleton):
         """
         if gse_code[:3] == "GDS":
             gse_code = "GSE" + gse_code[3:]
-        base_url = f"https://www.ncbi.nlm.nih.gov/geo/query/acc.cgi"
         params = {
             "acc": gse_code,
             "form": "xml"
         }
         try:
-            response = requests.get(base_url, params=params)
-            response.raise_for_status()
-            data = xmltodict.parse(response.content)
+            data = xmltodict.parse(self.pool.get(PubMedAPI.BASE_URL_OVERALL_DESIGN, params, self.retry_budget))
             return data["MINiML"]["Series"].get("Overall-Design")
+        except CircuitOpenError as e:
+            self.publish_error("circuit_open", f"Overall Design of GSE code: {gse_code} skipped, {e}")
+            return None
         except Exception:
-            self.notify(event_type="error",message=f"Error with getting Overall Design from GSE code: {gse_code}, pmid abandoned")
+            self.publish_error("overall_design", f"Error with getting Overall Design from GSE code: {gse_code}, pmid abandoned")
             return None
 
 
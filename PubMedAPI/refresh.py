@@ -0,0 +1,221 @@
+import datetime
+import json
+from typing import Optional
+import pandas as pd
+import xmltodict
+from Diagnostics.metrics import timed
+from .connection_pool import SharedConnectionPool
+from .observer import EventBus
+from .pubmed_api import PubMedAPI
+from .resilience import CircuitOpenError, RetryBudget
+from .result_accumulator import ResultAccumulator
+
+
+class IncrementalRefresher(EventBus):
+    """
+    Refreshes a stored dataset table by fetching only the PMIDs that are new or stale,
+    using bulk E-utilities requests instead of one request per id:
+
+    1) ELink is called for BATCH_SIZE PMIDs at once (one linkset per PMID keeps the PMID -> dataset mapping),
+    2) all new dataset ids are posted once to the Entrez history server (EPost -> WebEnv/query_key),
+    3) their summaries are paged from ESummary, RETMAX at a time.
+
+    Overall Design has no E-utilities equivalent, so it is still requested per new GSE code; datasets
+    already present in the stored table (stale ones included) reuse their stored Overall Design, which
+    rarely changes after submission, while their links and summaries are refetched.
+    PMIDs without datasets are not part of the table and are therefore looked up again on every refresh,
+    which costs one ELink request per BATCH_SIZE of them. Stale PMIDs whose refetch returns no rows
+    (failed requests included) keep their stored rows.
+    """
+    BASE_URL_EPOST = "https://eutils.ncbi.nlm.nih.gov/entrez/eutils/epost.fcgi"
+    BASE_URL_DB_IDX = PubMedAPI.BASE_URL_DB_IDX
+    BASE_URL_SUMMARY = PubMedAPI.BASE_URL_SUMMARY
+    BASE_URL_OVERALL_DESIGN = PubMedAPI.BASE_URL_OVERALL_DESIGN
+    ERROR_LABELS = PubMedAPI.ERROR_LABELS
+    BATCH_SIZE = 200
+    RETMAX = 500
+
+    def __init__(self, pool: Optional[SharedConnectionPool] = None, batch_size: int = BATCH_SIZE,
+                 retmax: int = RETMAX, max_age: Optional[datetime.timedelta] = None):
+        """
+        Parameters:
+        pool (SharedConnectionPool): Connection pool; the process-wide one by default.
+        batch_size (int): PMIDs per ELink request.
+        retmax (int): Summaries per ESummary page.
+        max_age (datetime.timedelta): Rows fetched longer ago are refetched. None keeps stored rows forever.
+        """
+        super().__init__()
+        self.pool = pool if pool is not None else SharedConnectionPool()
+        self.batch_size = batch_size
+        self.retmax = retmax
+        self.max_age = max_age
+        self.retry_budget = RetryBudget()
+        self.requests = 0
+        self.df = None
+
+    def refresh(self, stored: pd.DataFrame, list_of_pmids: Optional[list[int]] = None) -> pd.DataFrame:
+        """
+        Returns the refreshed table (also stored in `self.df`).
+
+        :param stored: Previously fetched table, with a Fetched_at column (rows without it count as stale).
+        :param list_of_pmids: PMIDs the refreshed table should cover; the stored PMIDs by default.
+                              Stored PMIDs missing from this list are dropped.
+        """
+        self.reset_events()
+        self.retry_budget = RetryBudget()
+        self.requests = 0
+        stored = stored.reset_index(drop=True)
+        fetched_at = pd.to_datetime(stored["Fetched_at"], utc=True, errors="coerce") if "Fetched_at" in stored \
+            else pd.Series(pd.NaT, index=stored.index, dtype="datetime64[ns, UTC]")
+        pmids = list(dict.fromkeys(int(pmid) for pmid in (list_of_pmids if list_of_pmids is not None
+                                                           else stored["Pmid"].tolist())))
+        stale = fetched_at.isna()
+        if self.max_age is not None:
+            stale |= fetched_at < pd.Timestamp.now(tz="UTC") - self.max_age
+        stale_pmids = set(stored.loc[stale, "Pmid"].astype(int))
+        fresh_pmids = set(stored["Pmid"].astype(int)) - stale_pmids
+        to_fetch = [pmid for pmid in pmids if pmid not in fresh_pmids]
+
+        fetched = self.fetch(to_fetch, known=stored)
+        # stale rows are only replaced when their PMID was refetched: after a failed request
+        # (outage, open circuit breaker) they stay in the table instead of disappearing
+        refetched_pmids = set(fetched["Pmid"].astype(int)) if not fetched.empty else set()
+        kept = stored[stored["Pmid"].astype(int).isin(set(pmids) - refetched_pmids)]
+        frames = [frame for frame in (kept, fetched) if not frame.empty]
+        self.df = pd.concat(frames, ignore_index=True) if frames else fetched
+        self.df = self.df.drop_duplicates(subset=["Pmid", "Geo_dataset_ind"], keep="last").reset_index(drop=True)
+        self.df = ResultAccumulator.to_categorical(self.df)
+        return self.df
+
+    def fetch(self, list_of_pmids: list[int], known: Optional[pd.DataFrame] = None) -> pd.DataFrame:
+        """
+        Fetches the datasets of the given PMIDs with bulk requests.
+
+        :param list_of_pmids: PMIDs to fetch.
+        :param known: Table whose Overall Design values are reused for datasets it already contains.
+        :return: A table with the PubMedAPI columns.
+        """
+        links = self._link_datasets(list_of_pmids)
+        dataset_indices = list(dict.fromkeys(idx for indices in links.values() for idx in indices))
+        summaries = self._get_summaries(dataset_indices)
+        known_designs = {}
+        if known is not None and not known.empty:
+            known_designs = dict(zip(known["Geo_dataset_ind"].astype(int), known["Overall_design"]))
+
+        rows = ResultAccumulator()
+        designs = {}
+        done = 0
+        self.publish_progress(stage="overall_design", done=0, total=len(summaries))
+        for pmid, indices in links.items():
+            for dataset_idx in indices:
+                pmid_data = summaries.get(dataset_idx)
+                if pmid_data is None:
+                    continue
+                if dataset_idx not in designs:
+                    designs[dataset_idx] = known_designs.get(dataset_idx) or self._get_overall_design(pmid_data.GSE_code)
+                    done += 1
+                    self.publish_progress(stage="overall_design", done=done, total=len(summaries))
+                if designs[dataset_idx] is not None:
+                    rows.add(pmid, dataset_idx, pmid_data, designs[dataset_idx])
+        self.flush()
+        return rows.to_dataframe()
+
+    def _request(self, method: str, url: str, params: dict) -> bytes:
+        self.requests += 1
+        if method == "POST":
+            return self.pool.post(url, params, self.retry_budget)
+        return self.pool.get(url, params, self.retry_budget)
+
+    @timed("fetch.bulk.elink")
+    def _link_datasets(self, list_of_pmids: list[int]) -> dict[int, list[int]]:
+        """
+        Maps every PMID to its GEO dataset ids, BATCH_SIZE PMIDs per request.
+        Every PMID is passed as a separate `id`, so ELink returns one linkset per PMID.
+        """
+        links = {}
+        self.publish_progress(stage="elink", done=0, total=len(list_of_pmids))
+        for start in range(0, len(list_of_pmids), self.batch_size):
+            batch = list_of_pmids[start:start + self.batch_size]
+            params = {"dbfrom": "pubmed", "db": "gds", "linkname": "pubmed_gds", "id": batch, "retmode": "json"}
+            try:
+                response = json.loads(self._request("POST", IncrementalRefresher.BASE_URL_DB_IDX, params))
+            except CircuitOpenError as e:
+                self.publish_error("circuit_open", f"{len(batch)} PMIDs skipped, {e}")
+                continue
+            except Exception:
+                self.publish_error("db_idx", f"Error with a batch of {len(batch)} PMIDs, PMIDs abandoned")
+                continue
+            for linkset in response.get("linksets", []):
+                pmid = int(linkset.get("ids", [0])[0])
+                indices = [int(idx) for linksetdb in linkset.get("linksetdbs", [])
+                           if linksetdb.get("linkname", "pubmed_gds") == "pubmed_gds"
+                           for idx in linksetdb.get("links", [])]
+                if not indices:
+                    self.publish_error("no_datasets", f"No datasets found for PMID: {pmid}, pmid abandoned")
+                links[pmid] = indices
+            self.publish_progress(stage="elink", done=min(start + self.batch_size, len(list_of_pmids)),
+                                  total=len(list_of_pmids))
+        return links
+
+    @timed("fetch.bulk.esummary")
+    def _get_summaries(self, dataset_indices: list[int]) -> dict[int, PubMedAPI.PmData]:
+        """
+        Posts the dataset ids to the history server once and pages through their summaries.
+        """
+        summaries = {}
+        if not dataset_indices:
+            return summaries
+        try:
+            posted = xmltodict.parse(self._request("POST", IncrementalRefresher.BASE_URL_EPOST,
+                                                   {"db": "gds", "id": ",".join(map(str, dataset_indices))}))
+            web_env = posted["ePostResult"]["WebEnv"]
+            query_key = posted["ePostResult"]["QueryKey"]
+        except CircuitOpenError as e:
+            self.publish_error("circuit_open", f"{len(dataset_indices)} datasets skipped, {e}")
+            return summaries
+        except Exception:
+            self.publish_error("summary", f"Error posting {len(dataset_indices)} datasets to the history server")
+            return summaries
+
+        self.publish_progress(stage="esummary", done=0, total=len(dataset_indices))
+        for retstart in range(0, len(dataset_indices), self.retmax):
+            params = {"db": "gds", "query_key": query_key, "WebEnv": web_env, "retstart": retstart,
+                      "retmax": self.retmax, "retmode": "json"}
+            try:
+                result = json.loads(self._request("GET", IncrementalRefresher.BASE_URL_SUMMARY, params))["result"]
+            except CircuitOpenError as e:
+                self.publish_error("circuit_open", f"Summaries {retstart}-{retstart + self.retmax} skipped, {e}")
+                continue
+            except Exception:
+                self.publish_error("summary", f"Error with summaries {retstart}-{retstart + self.retmax}")
+                continue
+            for uid in result.get("uids", []):
+                info_part = result[uid]
+                try:
+                    summaries[int(uid)] = PubMedAPI.PmData(
+                        Title=info_part['title'],
+                        Summary=info_part['summary'],
+                        Organism=info_part['taxon'],
+                        Experiment_type=info_part['gdstype'],
+                        GSE_code=info_part['accession']
+                    )
+                except KeyError:
+                    self.publish_error("summary", f"Error with data from GSE code: {uid}, pmid abandoned")
+            self.publish_progress(stage="esummary", done=min(retstart + self.retmax, len(dataset_indices)),
+                                  total=len(dataset_indices))
+        return summaries
+
+    @timed("fetch.overall_design")
+    def _get_overall_design(self, gse_code: str) -> str | None:
+        if gse_code[:3] == "GDS":
+            gse_code = "GSE" + gse_code[3:]
+        try:
+            data = xmltodict.parse(self._request("GET", IncrementalRefresher.BASE_URL_OVERALL_DESIGN,
+                                                 {"acc": gse_code, "form": "xml"}))
+            return data["MINiML"]["Series"].get("Overall-Design")
+        except CircuitOpenError as e:
+            self.publish_error("circuit_open", f"Overall Design of GSE code: {gse_code} skipped, {e}")
+            return None
+        except Exception:
+            self.publish_error("overall_design", f"Error with getting Overall Design from GSE code: {gse_code}, pmid abandoned")
+            return None
@@ -0,0 +1,173 @@
+import random
+import threading
+import time
+from collections import deque
+from .singleton import Singleton
+
+
+class CircuitOpenError(Exception):
+    """
+    Raised instead of sending a request to an endpoint whose circuit breaker is open.
+    """
+    def __init__(self, endpoint: str, retry_in: float):
+        super().__init__(f"{endpoint} is unavailable, next probe in {retry_in:.0f} s")
+        self.endpoint = endpoint
+        self.retry_in = retry_in
+
+
+class CircuitBreaker:
+    """
+    Circuit breaker of a single NCBI endpoint.
+
+    - closed: requests pass; the outcomes of the last WINDOW_SIZE requests are tracked, and once at least
+      MIN_CALLS of them failed at a rate of FAILURE_RATE_THRESHOLD or more, the breaker opens.
+    - open: requests fail immediately with CircuitOpenError for OPEN_SECONDS.
+    - half-open: up to HALF_OPEN_PROBES requests are let through; a success closes the breaker,
+      a failure opens it again.
+    """
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half-open"
+    FAILURE_RATE_THRESHOLD = 0.5
+    WINDOW_SIZE = 20
+    MIN_CALLS = 5
+    OPEN_SECONDS = 30.0
+    HALF_OPEN_PROBES = 1
+
+    def __init__(self, name: str, failure_rate_threshold: float = FAILURE_RATE_THRESHOLD,
+                 window_size: int = WINDOW_SIZE, min_calls: int = MIN_CALLS,
+                 open_seconds: float = OPEN_SECONDS, half_open_probes: int = HALF_OPEN_PROBES):
+        self.name = name
+        self.failure_rate_threshold = failure_rate_threshold
+        self.min_calls = min_calls
+        self.open_seconds = open_seconds
+        self.half_open_probes = half_open_probes
+        self._outcomes = deque(maxlen=window_size)
+        self._state = CircuitBreaker.CLOSED
+        self._opened_at = 0.0
+        self._probes_in_flight = 0
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            self._refresh_state()
+            return self._state
+
+    def _refresh_state(self) -> None:
+        if self._state == CircuitBreaker.OPEN and time.monotonic() - self._opened_at >= self.open_seconds:
+            self._state = CircuitBreaker.HALF_OPEN
+            self._probes_in_flight = 0
+
+    def before_call(self) -> None:
+        """
+        Reserves the right to send a request.
+
+        :raises CircuitOpenError: If the breaker is open, or half-open with all probes in flight.
+        """
+        with self._lock:
+            self._refresh_state()
+            if self._state == CircuitBreaker.OPEN:
+                raise CircuitOpenError(self.name, self._opened_at + self.open_seconds - time.monotonic())
+            if self._state == CircuitBreaker.HALF_OPEN:
+                if self._probes_in_flight >= self.half_open_probes:
+                    raise CircuitOpenError(self.name, 0)
+                self._probes_in_flight += 1
+
+    def record_success(self) -> None:
+        with self._lock:
+            if self._state == CircuitBreaker.HALF_OPEN:
+                self._state = CircuitBreaker.CLOSED
+                self._outcomes.clear()
+            self._outcomes.append(True)
+
+    def record_failure(self) -> None:
+        with self._lock:
+            if self._state == CircuitBreaker.HALF_OPEN:
+                self._open()
+                return
+            self._outcomes.append(False)
+            failures = self._outcomes.count(False)
+            if failures >= self.min_calls and failures / len(self._outcomes) >= self.failure_rate_threshold:
+                self._open()
+
+    def _open(self) -> None:
+        self._state = CircuitBreaker.OPEN
+        self._opened_at = time.monotonic()
+        self._probes_in_flight = 0
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            self._refresh_state()
+            calls = len(self._outcomes)
+            return {
+                "endpoint": self.name,
+                "state": self._state,
+                "failure_rate": self._outcomes.count(False) / calls if calls else 0.0,
+                "recent_calls": calls,
+                "retry_in_seconds": max(self._opened_at + self.open_seconds - time.monotonic(), 0.0)
+                if self._state == CircuitBreaker.OPEN else 0.0,
+            }
+
+
+class CircuitBreakers(metaclass=Singleton):
+    """
+    Process-wide registry of circuit breakers, one per endpoint.
+    An outage affects every job, so all jobs share the same breakers.
+    """
+    def __init__(self):
+        self._breakers = {}
+        self._lock = threading.Lock()
+
+    def get(self, endpoint: str) -> CircuitBreaker:
+        with self._lock:
+            if endpoint not in self._breakers:
+                self._breakers[endpoint] = CircuitBreaker(endpoint)
+            return self._breakers[endpoint]
+
+    def snapshot(self) -> list[dict]:
+        with self._lock:
+            breakers = list(self._breakers.values())
+        return [breaker.snapshot() for breaker in breakers]
+
+
+class RetryBudget:
+    """
+    Job-wide limit on the time spent waiting between retries.
+
+    Every retry asks the budget for a delay: exponential backoff with full jitter
+    (uniform between 0 and min(MAX_DELAY, BASE_DELAY * 2**attempt)). Once MAX_ATTEMPTS are used
+    for a request, or the delays of the whole job would exceed MAX_RETRY_SECONDS,
+    no delay is granted and the request fails.
+    """
+    MAX_RETRY_SECONDS = 60.0
+    MAX_ATTEMPTS = 5
+    BASE_DELAY = 0.5
+    MAX_DELAY = 8.0
+
+    def __init__(self, max_retry_seconds: float = MAX_RETRY_SECONDS, max_attempts: int = MAX_ATTEMPTS,
+                 base_delay: float = BASE_DELAY, max_delay: float = MAX_DELAY):
+        self.max_retry_seconds = max_retry_seconds
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.spent = 0.0
+        self._lock = threading.Lock()
+
+    @property
+    def exhausted(self) -> bool:
+        return self.spent >= self.max_retry_seconds
+
+    def next_delay(self, attempt: int) -> float | None:
+        """
+        Returns the delay before retry number `attempt` (1-based), or None if the request should give up.
+        """
+        if attempt >= self.max_attempts:
+            return None
+        delay = random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+        with self._lock:
+            if self.spent + delay > self.max_retry_seconds:
+                self.spent = self.max_retry_seconds
+                return None
+            self.spent += delay
+        return delay
@@ -0,0 +1,102 @@
+import time
+from array import array
+from typing import Optional
+import numpy as np
+import pandas as pd
+
+
+class ResultAccumulator:
+    """
+    Column-oriented buffer for the rows of a fetch job.
+
+    Instead of one dict per dataset, every column is kept in its own buffer:
+    - Pmid and Geo_dataset_ind in typed int64 arrays,
+    - low-cardinality fields (Organism, Experiment_type) as int32 codes into a per-column
+      table of unique values, so each distinct string is stored once,
+    - free-text fields in plain lists,
+    - the time each row was fetched (Fetched_at, UTC) as float64 seconds, used by incremental refreshes.
+
+    Rows are deduplicated on insert by (Pmid, Geo_dataset_ind), and `to_dataframe` wraps the
+    buffers without copying them again or running `drop_duplicates`.
+    """
+    COLUMNS = ("Pmid", "Geo_dataset_ind", "GSE_code", "Title", "Summary", "Overall_design",
+               "Experiment_type", "Organism", "Fetched_at")
+    CATEGORICAL_COLUMNS = ("Experiment_type", "Organism")
+    TEXT_COLUMNS = ("GSE_code", "Title", "Summary", "Overall_design")
+
+    def __init__(self):
+        self._pmids = array("q")
+        self._dataset_indices = array("q")
+        self._fetched_at = array("d")
+        self._text = {column: [] for column in ResultAccumulator.TEXT_COLUMNS}
+        self._codes = {column: array("i") for column in ResultAccumulator.CATEGORICAL_COLUMNS}
+        self._categories = {column: {} for column in ResultAccumulator.CATEGORICAL_COLUMNS}
+        self._keys = set()
+
+    def __len__(self) -> int:
+        return len(self._pmids)
+
+    def add(self, pmid: int, dataset_idx: int, pmid_data, overall_design: Optional[str],
+            fetched_at: Optional[float] = None) -> bool:
+        """
+        Appends the row of a dataset (a PmData instance) found for a PMID.
+        `fetched_at` is a Unix timestamp, the current time by default.
+
+        :return: False if the (PMID, dataset) pair was already added, True otherwise.
+        """
+        key = (int(pmid), int(dataset_idx))
+        if key in self._keys:
+            return False
+        self._keys.add(key)
+        self._pmids.append(key[0])
+        self._dataset_indices.append(key[1])
+        self._fetched_at.append(time.time() if fetched_at is None else fetched_at)
+        self._text["GSE_code"].append(pmid_data.GSE_code)
+        self._text["Title"].append(pmid_data.Title)
+        self._text["Summary"].append(pmid_data.Summary)
+        self._text["Overall_design"].append(overall_design)
+        self._append_code("Experiment_type", pmid_data.Experiment_type)
+        self._append_code("Organism", pmid_data.Organism)
+        return True
+
+    def _append_code(self, column: str, value: Optional[str]) -> None:
+        if value is None:
+            # missing values are encoded as -1, like in pd.Categorical
+            self._codes[column].append(-1)
+            return
+        categories = self._categories[column]
+        code = categories.get(value)
+        if code is None:
+            code = categories[value] = len(categories)
+        self._codes[column].append(code)
+
+    def to_dataframe(self) -> pd.DataFrame:
+        """
+        Builds the DataFrame of all rows, with Organism and Experiment_type as categorical columns.
+        Integer columns and category codes are views of the accumulator's buffers.
+        """
+        columns = {
+            "Pmid": np.frombuffer(self._pmids, dtype=np.int64) if self._pmids else np.empty(0, dtype=np.int64),
+            "Geo_dataset_ind": np.frombuffer(self._dataset_indices, dtype=np.int64) if self._dataset_indices
+            else np.empty(0, dtype=np.int64),
+        }
+        columns["Fetched_at"] = pd.to_datetime(np.frombuffer(self._fetched_at, dtype=np.float64) if self._fetched_at
+                                               else np.empty(0, dtype=np.float64), unit="s", utc=True)
+        for column in ResultAccumulator.TEXT_COLUMNS:
+            columns[column] = pd.Series(self._text[column], dtype=object)
+        for column in ResultAccumulator.CATEGORICAL_COLUMNS:
+            codes = np.frombuffer(self._codes[column], dtype=np.int32) if self._codes[column] \
+                else np.empty(0, dtype=np.int32)
+            columns[column] = pd.Categorical.from_codes(codes, categories=list(self._categories[column]))
+        return pd.DataFrame({column: columns[column] for column in ResultAccumulator.COLUMNS}, copy=False)
+
+    @staticmethod
+    def to_categorical(df: pd.DataFrame) -> pd.DataFrame:
+        """
+        Re-encodes the low-cardinality columns of a combined frame as categoricals
+        (concatenating frames with different categories falls back to plain strings).
+        """
+        for column in ResultAccumulator.CATEGORICAL_COLUMNS:
+            if column in df.columns:
+                df[column] = df[column].astype("category")
+        return df
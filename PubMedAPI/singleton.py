@@ -1,14 +1,19 @@
+import threading
+
+
 class Singleton(type):
     """
     Implementation of Singleton Pattern
+    Instance creation is guarded by a lock, so concurrent Streamlit sessions share exactly one instance.
     """
     _instances = {}
+    _lock = threading.Lock()
 
     def __call__(cls,*args,**kwargs):
 
         if cls not in cls._instances:
-            instance = super().__call__(*args,**kwargs)
-            cls._instances[cls] = instance
+            with cls._lock:
+                if cls not in cls._instances:
+                    instance = super().__call__(*args,**kwargs)
+                    cls._instances[cls] = instance
         return cls._instances[cls]
-
-
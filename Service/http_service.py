@@ -0,0 +1,312 @@
+import asyncio
+import hashlib
+import json
+import os
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+import numpy as np
+import pandas as pd
+from aiohttp import web
+
+
+def _run_job(pmids: list[int], params: dict) -> dict:
+    """
+    Worker entry point: fetches the PMIDs (or loads the toy dataset) and runs the embedding pipeline.
+    Executed in a separate process, so t-SNE never blocks the event loop.
+    """
+    from Preprocessing.pipeline import EmbeddingPipeline
+    from PubMedAPI.pubmed_api import PubMedAPI
+    from PubMedAPI.geo_mirror import GeoMirror, MirroredPubMedAPI
+    if params.get("toy"):
+        csv_path = os.path.join(os.path.dirname(__file__), "..", "PubMedAPI", "PubMed_data.csv")
+        df = pd.read_csv(csv_path)
+    else:
+        pubmed_api = MirroredPubMedAPI(GeoMirror(GeoMirror.DIRECTORY)) if GeoMirror.DIRECTORY else PubMedAPI()
+        pubmed_api.create_dataframe(list_of_pmids=pmids)
+        df = pubmed_api.df
+        if df.shape[0] <= PubMedAPI.MIN_SIZE:
+            raise ValueError(f"Only {df.shape[0]} datasets retrieved, more than {PubMedAPI.MIN_SIZE} are required")
+    pipeline = EmbeddingPipeline(max_features=params["max_features"], n_clusters=params["n_clusters"],
+                                 random_state=params.get("random_state"))
+    df, X, labels = pipeline.run(df)
+    features = pipeline.features
+    norms = np.linalg.norm(features, axis=1, keepdims=True)
+    table = df.drop(columns=["Text", "is_selected"], errors="ignore").reset_index(drop=True)
+    return {"table": table, "X": X, "labels": labels, "features": features / np.where(norms == 0, 1, norms)}
+
+
+@dataclass
+class Job:
+    """
+    A processing job identified by the content hash of its PMIDs and parameters.
+    `run_id` identifies one execution, so cached responses never outlive the result they were built from.
+    """
+    job_id: str
+    params: dict
+    n_pmids: int
+    status: str = "pending"
+    error: str | None = None
+    created_at: float = field(default_factory=time.time)
+    finished_at: float | None = None
+    result: dict | None = None
+    run_id: str = field(default_factory=lambda: uuid.uuid4().hex)
+
+
+class PubTrendsService:
+    """
+    Asynchronous HTTP JSON API serving PubTrends results to other tools.
+
+    Endpoints:
+    - POST /jobs                      {"pmids": [...], "max_features": 10, "n_clusters": 8} -> job (reused if known)
+    - GET  /jobs/{job_id}             status and dataset metadata
+    - GET  /jobs/{job_id}/points      paginated coordinates and cluster labels
+    - GET  /jobs/{job_id}/datasets    paginated dataset descriptions
+    - GET  /jobs/{job_id}/similar     nearest datasets to ?gse_code= by TF-IDF cosine similarity
+
+    List endpoints accept the filters `pmid`, `organism`, `experiment_type`, `cluster` and the
+    pagination parameters `page` (1-based) and `page_size`. Responses for finished jobs are cached
+    by the content hash of the request and served with an ETag.
+    """
+    MAX_JOBS = 32
+    RESPONSE_CACHE_SIZE = 1024
+    DEFAULT_PAGE_SIZE = 500
+    MAX_PAGE_SIZE = 5000
+    MIN_PMIDS = 10
+    """
+    Inclusive parameter ranges, the same as those of the app's number inputs
+    """
+    MAX_FEATURES_RANGE = (3, 200)
+    N_CLUSTERS_RANGE = (1, 30)
+
+    def __init__(self, workers: int = 2):
+        self.jobs = OrderedDict()
+        self.executor = ProcessPoolExecutor(max_workers=workers)
+        self._response_cache = OrderedDict()
+
+    def create_app(self) -> web.Application:
+        app = web.Application()
+        app.add_routes([
+            web.post("/jobs", self.submit_job),
+            web.get("/jobs/{job_id}", self.get_job),
+            web.get("/jobs/{job_id}/points", self.get_points),
+            web.get("/jobs/{job_id}/datasets", self.get_datasets),
+            web.get("/jobs/{job_id}/similar", self.get_similar),
+        ])
+        app.on_cleanup.append(self._shutdown)
+        return app
+
+    async def _shutdown(self, app: web.Application) -> None:
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+    # ----------------------------------- Jobs -----------------------------------
+    @staticmethod
+    def job_id_for(pmids: list[int], params: dict) -> str:
+        payload = json.dumps({"pmids": sorted(set(pmids)), "params": params}, sort_keys=True)
+        return hashlib.sha256(payload.encode()).hexdigest()[:16]
+
+    async def submit_job(self, request: web.Request) -> web.Response:
+        try:
+            body = await request.json()
+            if not isinstance(body, dict) or not isinstance(body.get("pmids", []), list):
+                raise TypeError
+            pmids = [int(pmid) for pmid in body.get("pmids", [])]
+            random_state = body.get("random_state")
+            params = {
+                "max_features": int(body.get("max_features", 10)),
+                "n_clusters": int(body.get("n_clusters", 8)),
+                "random_state": int(random_state) if random_state is not None else None,
+                "toy": bool(body.get("toy", False)),
+            }
+        except (ValueError, TypeError):
+            raise web.HTTPBadRequest(text="Expected a JSON object with a list of integer 'pmids' and integer parameters")
+        for name, (low, high) in (("max_features", PubTrendsService.MAX_FEATURES_RANGE),
+                                  ("n_clusters", PubTrendsService.N_CLUSTERS_RANGE)):
+            if not low <= params[name] <= high:
+                raise web.HTTPBadRequest(text=f"'{name}' must be between {low} and {high}")
+        if not params["toy"] and len(set(pmids)) < PubTrendsService.MIN_PMIDS:
+            raise web.HTTPBadRequest(text=f"Please provide at least {PubTrendsService.MIN_PMIDS} PMIDs")
+
+        job_id = PubTrendsService.job_id_for(pmids, params)
+        job = self.jobs.get(job_id)
+        if job is not None and job.status != "failed":
+            self.jobs.move_to_end(job_id)
+            return web.json_response(self._job_summary(job), status=200)
+
+        if job is not None:
+            self._drop_cached_responses(job_id)
+        job = Job(job_id=job_id, params=params, n_pmids=len(set(pmids)))
+        self.jobs[job_id] = job
+        self._evict_jobs()
+        asyncio.get_running_loop().create_task(self._execute(job, list(dict.fromkeys(pmids))))
+        return web.json_response(self._job_summary(job), status=202)
+
+    async def _execute(self, job: Job, pmids: list[int]) -> None:
+        job.status = "running"
+        try:
+            job.result = await asyncio.get_running_loop().run_in_executor(self.executor, _run_job, pmids, job.params)
+            job.status = "done"
+        except Exception as e:
+            job.status = "failed"
+            job.error = str(e)
+        job.finished_at = time.time()
+
+    def _evict_jobs(self) -> None:
+        while len(self.jobs) > PubTrendsService.MAX_JOBS:
+            evictable = next((job_id for job_id, job in self.jobs.items() if job.status in ("done", "failed")), None)
+            if evictable is None:
+                return
+            del self.jobs[evictable]
+            self._drop_cached_responses(evictable)
+
+    def _finished_job(self, request: web.Request) -> Job:
+        job = self.jobs.get(request.match_info["job_id"])
+        if job is None:
+            raise web.HTTPNotFound(text="Unknown job")
+        if job.status != "done":
+            raise web.HTTPConflict(text=json.dumps(self._job_summary(job)), content_type="application/json")
+        return job
+
+    @staticmethod
+    def _job_summary(job: Job) -> dict:
+        summary = {
+            "job_id": job.job_id,
+            "status": job.status,
+            "params": job.params,
+            "n_pmids": job.n_pmids,
+            "created_at": job.created_at,
+            "finished_at": job.finished_at,
+            "error": job.error,
+        }
+        if job.result is not None:
+            table = job.result["table"]
+            summary["metadata"] = {
+                "n_datasets": len(table),
+                "n_pmids_with_datasets": int(table["Pmid"].nunique()),
+                "organisms": table["Organism"].value_counts().to_dict(),
+                "experiment_types": table["Experiment_type"].value_counts().to_dict(),
+                "clusters": pd.Series(job.result["labels"]).value_counts().sort_index().to_dict(),
+            }
+        return summary
+
+    async def get_job(self, request: web.Request) -> web.Response:
+        job = self.jobs.get(request.match_info["job_id"])
+        if job is None:
+            raise web.HTTPNotFound(text="Unknown job")
+        return web.json_response(self._job_summary(job))
+
+    # ----------------------------------- Results -----------------------------------
+    def _cached_response(self, request: web.Request, job: Job, build) -> web.Response:
+        """
+        Serves the response for (job run, path, query) from the cache, building it with `build` on a miss.
+        """
+        key = (job.job_id, job.run_id,
+               hashlib.sha256(f"{request.path}|{sorted(request.query.items())}".encode()).hexdigest())
+        cached = self._response_cache.get(key)
+        if cached is None:
+            body = json.dumps(build(), default=str).encode()
+            cached = (body, f'"{hashlib.sha256(body).hexdigest()[:32]}"')
+            self._response_cache[key] = cached
+            while len(self._response_cache) > PubTrendsService.RESPONSE_CACHE_SIZE:
+                self._response_cache.popitem(last=False)
+        else:
+            self._response_cache.move_to_end(key)
+        body, etag = cached
+        if request.headers.get("If-None-Match") == etag:
+            return web.Response(status=304, headers={"ETag": etag})
+        return web.Response(body=body, content_type="application/json", headers={"ETag": etag})
+
+    def _drop_cached_responses(self, job_id: str) -> None:
+        for key in [key for key in self._response_cache if key[0] == job_id]:
+            del self._response_cache[key]
+
+    @staticmethod
+    def _filter_mask(request: web.Request, job: Job) -> np.ndarray:
+        table = job.result["table"]
+        mask = np.ones(len(table), dtype=bool)
+        if "pmid" in request.query:
+            try:
+                pmid = int(request.query["pmid"])
+            except ValueError:
+                raise web.HTTPBadRequest(text="'pmid' must be an integer")
+            mask &= (table["Pmid"] == pmid).to_numpy()
+        if "organism" in request.query:
+            mask &= (table["Organism"] == request.query["organism"]).to_numpy()
+        if "experiment_type" in request.query:
+            mask &= (table["Experiment_type"] == request.query["experiment_type"]).to_numpy()
+        if "cluster" in request.query:
+            mask &= job.result["labels"] == request.query["cluster"]
+        return mask
+
+    @staticmethod
+    def _page(request: web.Request, indices: np.ndarray) -> tuple[np.ndarray, dict]:
+        try:
+            page = max(int(request.query.get("page", 1)), 1)
+            page_size = int(request.query.get("page_size", PubTrendsService.DEFAULT_PAGE_SIZE))
+        except ValueError:
+            raise web.HTTPBadRequest(text="'page' and 'page_size' must be integers")
+        page_size = min(max(page_size, 1), PubTrendsService.MAX_PAGE_SIZE)
+        start = (page - 1) * page_size
+        pagination = {"page": page, "page_size": page_size, "total": int(len(indices)),
+                      "pages": int(-(-len(indices) // page_size))}
+        return indices[start:start + page_size], pagination
+
+    async def get_points(self, request: web.Request) -> web.Response:
+        job = self._finished_job(request)
+
+        def build():
+            indices, pagination = self._page(request, np.flatnonzero(self._filter_mask(request, job)))
+            table = job.result["table"]
+            X = job.result["X"]
+            items = [{"gse_code": table.at[i, "GSE_code"], "pmid": int(table.at[i, "Pmid"]),
+                      "x": float(X[i, 0]), "y": float(X[i, 1]), "z": float(X[i, 2]),
+                      "cluster": job.result["labels"][i]} for i in indices]
+            return {"pagination": pagination, "items": items}
+
+        return self._cached_response(request, job, build)
+
+    async def get_datasets(self, request: web.Request) -> web.Response:
+        job = self._finished_job(request)
+
+        def build():
+            indices, pagination = self._page(request, np.flatnonzero(self._filter_mask(request, job)))
+            items = job.result["table"].iloc[indices].assign(Cluster=job.result["labels"][indices])
+            items = items.astype(object).where(items.notna(), None)
+            return {"pagination": pagination, "items": items.to_dict(orient="records")}
+
+        return self._cached_response(request, job, build)
+
+    async def get_similar(self, request: web.Request) -> web.Response:
+        job = self._finished_job(request)
+        table = job.result["table"]
+        gse_code = request.query.get("gse_code")
+        matches = np.flatnonzero((table["GSE_code"] == gse_code).to_numpy())
+        if matches.size == 0:
+            raise web.HTTPNotFound(text=f"Unknown GSE code: {gse_code}")
+        try:
+            k = min(max(int(request.query.get("k", 10)), 1), len(table))
+        except ValueError:
+            raise web.HTTPBadRequest(text="'k' must be an integer")
+
+        def build():
+            features = job.result["features"]
+            scores = features @ features[matches[0]]
+            scores[table["GSE_code"].to_numpy() == gse_code] = -np.inf
+            candidates = np.argpartition(-scores, min(k, len(scores) - 1))[:k]
+            ranked = candidates[np.argsort(-scores[candidates])]
+            items = [{"gse_code": table.at[i, "GSE_code"], "pmid": int(table.at[i, "Pmid"]),
+                      "title": table.at[i, "Title"], "similarity": float(scores[i])}
+                     for i in ranked if np.isfinite(scores[i])]
+            return {"gse_code": gse_code, "items": items}
+
+        return self._cached_response(request, job, build)
+
+
+def serve(host: str = "127.0.0.1", port: int = 8080, workers: int = 2) -> None:
+    from PubMedAPI.geo_mirror import GeoMirror
+    if GeoMirror.DIRECTORY:
+        # jobs only read the index, so it is built before the workers start
+        GeoMirror(GeoMirror.DIRECTORY).build_index()
+    web.run_app(PubTrendsService(workers=workers).create_app(), host=host, port=port)
@@ -0,0 +1,280 @@
+"""
+Headless entry point of PubTrends.
+
+Runs ingestion and the TF-IDF / t-SNE / KMeans pipeline without the Streamlit UI, e.g. for
+nightly precomputation of large PMID collections:
+
+    python cli.py run PMIDs_list.txt --output-dir out --max-features 50 --n-clusters 12 --workers 3
+
+Fetching is journaled, so rerunning an interrupted command continues where it stopped.
+Unfinished jobs can also be listed and resumed directly:
+
+    python cli.py jobs list
+    python cli.py jobs resume <job_id> --output-dir out
+
+A saved table can be refreshed with bulk requests, fetching only new PMIDs and rows older than --max-age-days:
+
+    python cli.py refresh out/table.parquet PMIDs_list.txt --max-age-days 30 --output-dir out --format parquet
+
+Metadata can be read from a local GEO mirror (family files and PMID -> GSE link tables) instead of NCBI:
+
+    python cli.py mirror index /data/geo
+    python cli.py run PMIDs_list.txt --geo-mirror /data/geo --output-dir out
+
+or serves results to other tools over HTTP:
+
+    python cli.py serve --port 8080
+"""
+import argparse
+import datetime
+import os
+import sys
+import numpy as np
+import pandas as pd
+from PubMedAPI.observer import Observer
+from PubMedAPI.pmid_reader import PmidReader
+from PubMedAPI.checkpoint import CheckpointJournal, JobLockedError
+from PubMedAPI.dataset_store import DatasetStore
+
+
+class ConsoleObserver(Observer):
+    """
+    Prints progress and aggregated error events of a fetch job to stderr.
+    """
+    def update_on_error(self, *args, **kwargs):
+        if "message" in kwargs:
+            print(f"[error] {kwargs.get('message')}", file=sys.stderr)
+
+    def update_progress(self, *args, **kwargs):
+        event = kwargs.get("event")
+        if event is not None:
+            print(f"[{event.stage}] {event.done}/{event.total} ({event.throughput:.1f} items/s)", file=sys.stderr)
+
+
+"""
+Default GEO mirror directory (GeoMirror.DIRECTORY), read here so the CLI does not import the fetch modules eagerly.
+"""
+GEO_MIRROR = os.getenv("PUBTRENDS_GEO_MIRROR")
+"""
+Default number of fetch workers. Every worker sends its requests one after another, and NCBI E-utilities
+allow about 3 requests per second per IP (10 with an API key), so more workers mostly trip the rate limit
+and the circuit breakers; raise it for a GEO mirror or with an API key.
+"""
+FETCH_WORKERS = 3
+"""
+Columns read from an existing table; computed ones (coordinates, clusters) are recomputed.
+"""
+TABLE_COLUMNS = ("Pmid", "Geo_dataset_ind", "GSE_code", "Title", "Summary", "Overall_design", "Experiment_type",
+                 "Organism")
+
+
+def fetch_table(args, observer: Observer) -> pd.DataFrame:
+    from PubMedAPI.batch import ShardedFetcher
+    if args.table:
+        return DatasetStore.load(args.table, columns=TABLE_COLUMNS)
+    report = PmidReader(column=args.pmid_column).read(*args.pmid_files)
+    print(report.summary(), file=sys.stderr)
+    pmids = report.pmids
+    print(f"Fetching {len(pmids)} PMIDs with {args.workers} worker(s)", file=sys.stderr)
+    checkpoint_dir = None if args.no_checkpoint else args.checkpoint_dir
+    fetcher = ShardedFetcher(workers=args.workers, shard_size=args.shard_size, checkpoint_dir=checkpoint_dir,
+                             geo_mirror=args.geo_mirror)
+    fetcher.attach(observer)
+    return fetcher.create_dataframe(list_of_pmids=pmids)
+
+
+def write_results(output_dir: str, df: pd.DataFrame, X: np.ndarray, labels: np.ndarray,
+                  fmt: str = DatasetStore.CSV, compression: str | None = DatasetStore.COMPRESSION) -> None:
+    """
+    Writes the processed table (with coordinates and cluster labels) as table.csv, table.parquet or table.arrow,
+    the embedding and the labels.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    table = df.drop(columns=["Text", "is_selected"], errors="ignore").copy()
+    table[["X", "Y", "Z"]] = X
+    table["Cluster"] = labels
+    DatasetStore(compression=compression).save(table, os.path.join(output_dir, f"table.{fmt}"), fmt)
+    np.save(os.path.join(output_dir, "embedding.npy"), X)
+    np.save(os.path.join(output_dir, "labels.npy"), labels)
+
+
+def run(args) -> int:
+    return process_table(fetch_table(args, ConsoleObserver()), args)
+
+
+def process_table(df: pd.DataFrame, args) -> int:
+    from Preprocessing.pipeline import EmbeddingPipeline
+    if len(df) <= args.min_rows:
+        print(f"Only {len(df)} datasets retrieved, at least {args.min_rows + 1} are required", file=sys.stderr)
+        return 1
+    pipeline = EmbeddingPipeline(max_features=args.max_features, n_clusters=args.n_clusters,
+                                 random_state=args.random_state, dedup_threshold=args.dedup_threshold,
+                                 tfidf_jobs=args.tfidf_jobs)
+    try:
+        df, X, labels = pipeline.run(df)
+    except ValueError as e:
+        print(f"Could not compute the embedding: {e}", file=sys.stderr)
+        return 1
+    write_results(args.output_dir, df, X, labels, args.format, args.compression)
+    print(f"Wrote {len(df)} datasets to {args.output_dir}", file=sys.stderr)
+    return 0
+
+
+def list_jobs(args) -> int:
+    jobs = CheckpointJournal.list_jobs(args.checkpoint_dir)
+    if not jobs:
+        print("No unfinished jobs")
+    for job in jobs:
+        print(f"{job.job_id}  {job.done_pmids}/{job.total_pmids} PMIDs  started {job.created_at}  updated {job.updated_at}")
+    return 0
+
+
+def resume_job(args) -> int:
+    from PubMedAPI.pubmed_api import PubMedAPI
+    from PubMedAPI.geo_mirror import GeoMirror, MirroredPubMedAPI
+    journal = CheckpointJournal.open_job(args.job_id, args.checkpoint_dir)
+    if not journal.acquire():
+        print(f"Job {journal.job_id} is still running in another process", file=sys.stderr)
+        return 1
+    print(f"Resuming {journal.job_id}: {len(journal.completed_pmids)}/{len(journal.pmids)} PMIDs done", file=sys.stderr)
+    if args.geo_mirror:
+        mirror = GeoMirror(args.geo_mirror)
+        mirror.build_index()
+        pubmed_api = MirroredPubMedAPI(mirror)
+    else:
+        pubmed_api = PubMedAPI()
+    observer = ConsoleObserver()
+    pubmed_api.attach(observer)
+    pubmed_api.create_dataframe(list_of_pmids=journal.pmids, journal=journal)
+    if journal.is_complete:
+        journal.discard()
+    return process_table(pubmed_api.df, args)
+
+
+def discard_job(args) -> int:
+    try:
+        CheckpointJournal.open_job(args.job_id, args.checkpoint_dir).discard()
+    except JobLockedError:
+        print(f"Job {args.job_id} is still running in another process", file=sys.stderr)
+        return 1
+    return 0
+
+
+def add_pipeline_arguments(parser: argparse.ArgumentParser) -> None:
+    from Preprocessing.pipeline import EmbeddingPipeline
+    parser.add_argument("--output-dir", default="output", help="Directory for table.*, embedding.npy, labels.npy")
+    parser.add_argument("--format", choices=[DatasetStore.CSV, DatasetStore.PARQUET, DatasetStore.ARROW],
+                        default=DatasetStore.CSV, help="Format of the output table")
+    parser.add_argument("--compression", default=DatasetStore.COMPRESSION,
+                        type=lambda value: None if value == "none" else value,
+                        help="Parquet/Arrow compression: zstd, lz4 or none")
+    parser.add_argument("--max-features", type=int, default=10, help="Number of TF-IDF features")
+    parser.add_argument("--n-clusters", type=int, default=8, help="Number of KMeans clusters")
+    parser.add_argument("--random-state", type=int, default=None, help="Seed for t-SNE and KMeans")
+    parser.add_argument("--dedup-threshold", default=EmbeddingPipeline.DEDUP_THRESHOLD,
+                        type=lambda value: None if value == "none" else float(value),
+                        help="MinHash similarity above which near-duplicate datasets are embedded once, or none")
+    parser.add_argument("--tfidf-jobs", type=int, default=1,
+                        help="Vectorize TF-IDF in this many processes over a hashed feature space (for 100k+ datasets)")
+    parser.add_argument("--min-rows", type=int, default=10, help="Abort if no more datasets than this are fetched")
+
+
+def refresh(args) -> int:
+    from PubMedAPI.refresh import IncrementalRefresher
+    stored = DatasetStore.load(args.stored_table)
+    stored = stored[[column for column in TABLE_COLUMNS + ("Fetched_at",) if column in stored.columns]]
+    pmids = PmidReader(column=args.pmid_column).read(*args.pmid_files).pmids if args.pmid_files else None
+    max_age = datetime.timedelta(days=args.max_age_days) if args.max_age_days is not None else None
+    refresher = IncrementalRefresher(batch_size=args.batch_size, retmax=args.retmax, max_age=max_age)
+    observer = ConsoleObserver()
+    refresher.attach(observer)
+    df = refresher.refresh(stored, pmids)
+    print(f"Refreshed {len(df)} datasets with {refresher.requests} requests", file=sys.stderr)
+    return process_table(df, args)
+
+
+def index_mirror(args) -> int:
+    from PubMedAPI.geo_mirror import GeoMirror
+    mirror = GeoMirror(args.directory, index_path=args.index)
+    parsed = mirror.build_index(rebuild=args.rebuild)
+    print(f"Parsed {parsed} file(s), {len(mirror)} series indexed in {mirror.index_path}", file=sys.stderr)
+    mirror.close()
+    return 0
+
+
+def serve(args) -> int:
+    from Service.http_service import serve as serve_http
+    serve_http(host=args.host, port=args.port, workers=args.workers)
+    return 0
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="pubtrends", description="PubTrends headless mode")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = subparsers.add_parser("run", help="Fetch PMIDs and compute the embedding and clusters")
+    source = run_parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("pmid_files", nargs="*", default=[],
+                        help="PMID files: plain text with one PMID per line or CSV, optionally gzip-compressed")
+    source.add_argument("--table", help="Skip fetching and process an existing PubMed_data.csv-like table (.csv, .parquet or .arrow)")
+    run_parser.add_argument("--pmid-column", help="CSV column with PMIDs (name or 0-based index)")
+    add_pipeline_arguments(run_parser)
+    run_parser.add_argument("--workers", type=int, default=FETCH_WORKERS,
+                            help=f"Fetch worker processes (default {FETCH_WORKERS}, NCBI allows ~3 requests/s per IP)")
+    run_parser.add_argument("--shard-size", type=int, default=500, help="PMIDs per worker shard")
+    run_parser.add_argument("--checkpoint-dir", default=CheckpointJournal.DIRECTORY, help="Directory of fetch journals")
+    run_parser.add_argument("--no-checkpoint", action="store_true", help="Do not journal fetched results")
+    run_parser.add_argument("--geo-mirror", default=GEO_MIRROR,
+                            help="Read metadata from this local GEO mirror directory instead of NCBI")
+    run_parser.set_defaults(handler=run)
+
+    refresh_parser = subparsers.add_parser("refresh", help="Refetch only new or stale PMIDs of a saved table")
+    refresh_parser.add_argument("stored_table", help="Table written by a previous run (.csv, .parquet or .arrow)")
+    refresh_parser.add_argument("pmid_files", nargs="*", default=[],
+                                help="PMIDs the refreshed table should cover; the stored PMIDs by default")
+    refresh_parser.add_argument("--pmid-column", help="CSV column with PMIDs (name or 0-based index)")
+    refresh_parser.add_argument("--max-age-days", type=float, default=None,
+                                help="Refetch rows fetched longer ago; by default stored rows are kept")
+    refresh_parser.add_argument("--batch-size", type=int, default=200, help="PMIDs per ELink request")
+    refresh_parser.add_argument("--retmax", type=int, default=500, help="Summaries per ESummary page")
+    add_pipeline_arguments(refresh_parser)
+    refresh_parser.set_defaults(handler=refresh)
+
+    jobs_parser = subparsers.add_parser("jobs", help="List, resume or discard unfinished fetch jobs")
+    jobs_parser.add_argument("--checkpoint-dir", default=CheckpointJournal.DIRECTORY, help="Directory of fetch journals")
+    jobs_subparsers = jobs_parser.add_subparsers(dest="jobs_command", required=True)
+    jobs_subparsers.add_parser("list", help="List unfinished jobs").set_defaults(handler=list_jobs)
+    resume_parser = jobs_subparsers.add_parser("resume", help="Finish a job and run the pipeline")
+    resume_parser.add_argument("job_id")
+    resume_parser.add_argument("--geo-mirror", default=GEO_MIRROR,
+                               help="Read metadata from this local GEO mirror directory instead of NCBI")
+    add_pipeline_arguments(resume_parser)
+    resume_parser.set_defaults(handler=resume_job)
+    discard_parser = jobs_subparsers.add_parser("discard", help="Delete a job's journal")
+    discard_parser.add_argument("job_id")
+    discard_parser.set_defaults(handler=discard_job)
+
+    mirror_parser = subparsers.add_parser("mirror", help="Manage the local GEO metadata mirror")
+    mirror_subparsers = mirror_parser.add_subparsers(dest="mirror_command", required=True)
+    index_parser = mirror_subparsers.add_parser("index", help="Build or update the index of a mirror directory")
+    index_parser.add_argument("directory", nargs="?", default=GEO_MIRROR,
+                              help="Directory with MINiML/SOFT family files and PMID -> GSE link tables")
+    index_parser.add_argument("--index", help="Index file; .geo_mirror.sqlite in the mirror directory by default")
+    index_parser.add_argument("--rebuild", action="store_true", help="Re-parse every file")
+    index_parser.set_defaults(handler=index_mirror)
+
+    serve_parser = subparsers.add_parser("serve", help="Start the HTTP JSON API")
+    serve_parser.add_argument("--host", default="127.0.0.1", help="Interface to bind")
+    serve_parser.add_argument("--port", type=int, default=8080, help="Port to listen on")
+    serve_parser.add_argument("--workers", type=int, default=2, help="Processing worker processes")
+    serve_parser.set_defaults(handler=serve)
+    return parser
+
+
+def main(argv: list[str] | None = None) -> int:
+    args = build_parser().parse_args(argv)
+    return args.handler(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
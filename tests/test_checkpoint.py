@@ -0,0 +1,49 @@
+import json
+import pytest
+from PubMedAPI.checkpoint import CheckpointJournal, JobLockedError
+from PubMedAPI.pubmed_api import PubMedAPI
+
+
+def record(journal: CheckpointJournal, pmid: int) -> None:
+    info = PubMedAPI.PmData(Title="t" * 1000, Summary="s", Organism="o", Experiment_type="e", GSE_code="GSE1")
+    journal.record_dataset(200000000 + pmid, info, "design")
+    journal.record_pmid(pmid, [200000000 + pmid])
+
+
+def test_list_jobs_reads_progress_file(tmp_path):
+    journal = CheckpointJournal([1, 2, 3], directory=str(tmp_path))
+    record(journal, 1)
+    record(journal, 2)
+    journal.close()
+    with open(journal.progress_path) as f:
+        assert json.load(f)["done_pmids"] == 2
+    with open(journal.path, "a") as f:
+        f.write(json.dumps({"type": "pmid", "pmid": 3, "datasets": []}) + "\n")
+    [job] = CheckpointJournal.list_jobs(str(tmp_path))
+    assert (job.job_id, job.done_pmids, job.total_pmids) == (journal.job_id, 2, 3)
+
+
+def test_list_jobs_falls_back_to_journal_without_progress_file(tmp_path):
+    journal = CheckpointJournal([1, 2, 3], directory=str(tmp_path))
+    record(journal, 1)
+    journal.close()
+    (tmp_path / f"{journal.job_id}.progress.json").unlink()
+    [job] = CheckpointJournal.list_jobs(str(tmp_path))
+    assert (job.done_pmids, job.total_pmids) == (1, 3)
+
+
+def test_running_job_is_hidden_and_cannot_be_discarded(tmp_path):
+    journal = CheckpointJournal([1, 2, 3], directory=str(tmp_path))
+    record(journal, 1)
+    assert CheckpointJournal.list_jobs(str(tmp_path)) == []
+    other = CheckpointJournal.open_job(journal.job_id, str(tmp_path))
+    assert not other.acquire()
+    with pytest.raises(JobLockedError):
+        other.discard()
+    with pytest.raises(JobLockedError):
+        record(other, 2)
+    journal.close()
+    assert len(CheckpointJournal.list_jobs(str(tmp_path))) == 1
+    other.discard()
+    assert CheckpointJournal.list_jobs(str(tmp_path)) == []
+    assert list(tmp_path.iterdir()) == []
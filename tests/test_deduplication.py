@@ -0,0 +1,59 @@
+import itertools
+import numpy as np
+import pandas as pd
+from Preprocessing.text_preprocessing import DeduplicationProcessor, ProcessorFactory
+from Benchmarks.preprocessing_benchmark import SyntheticCorpus, TOY_DATASET
+
+THRESHOLD = 0.9
+"""
+MinHash with 64 permutations estimates a Jaccard similarity of 0.9 with a standard deviation of ~0.04,
+so pairs this close to the threshold may land on either side of it
+"""
+MARGIN = 0.08
+
+
+def shingles(document: str, size: int = 3) -> set[str]:
+    words = document.lower().split()
+    return {" ".join(words[i:i + size]) for i in range(max(len(words) - size + 1, 1))}
+
+
+def assert_groups_match_exact_jaccard(documents: list[str]) -> None:
+    """
+    Documents sharing a group must be near-duplicates by their exact Jaccard similarity of word shingles,
+    and documents whose similarity is clearly above the threshold must share a group.
+    """
+    processor = DeduplicationProcessor(threshold=THRESHOLD, random_state=0)
+    groups = processor.process(documents)
+    sets = [shingles(document) for document in documents]
+    for i, j in itertools.combinations(range(len(documents)), 2):
+        similarity = len(sets[i] & sets[j]) / len(sets[i] | sets[j])
+        if groups[i] == groups[j]:
+            assert similarity >= THRESHOLD - MARGIN, (i, j, similarity)
+        else:
+            assert similarity < THRESHOLD + MARGIN, (i, j, similarity)
+
+
+def test_toy_dataset_groups_match_exact_jaccard():
+    df = ProcessorFactory.get_processor("remove_punctuation").process(pd.read_csv(TOY_DATASET))
+    assert_groups_match_exact_jaccard(df["Text"].tolist())
+
+
+def test_synthetic_groups_match_exact_jaccard():
+    df = SyntheticCorpus(seed=1).generate(400)
+    assert_groups_match_exact_jaccard((df["Title"] + " " + df["Summary"] + " " + df["Overall_design"]).tolist())
+
+
+def test_groups_do_not_depend_on_the_chunk_size(monkeypatch):
+    df = SyntheticCorpus(seed=2).generate(300)
+    documents = (df["Title"] + " " + df["Summary"]).tolist()
+    groups = DeduplicationProcessor(random_state=0).process(documents)
+    monkeypatch.setattr(DeduplicationProcessor, "CHUNK_SIZE", 7)
+    np.testing.assert_array_equal(DeduplicationProcessor(random_state=0).process(documents), groups)
+    assert len(np.unique(groups)) < len(documents)
+
+
+def test_short_and_empty_documents():
+    processor = DeduplicationProcessor(random_state=0)
+    groups = processor.process(["", "one", "one", "two words", "Two Words", "three words here"])
+    assert groups[1] == groups[2] and groups[3] == groups[4]
+    assert len(set(groups.tolist())) == 4
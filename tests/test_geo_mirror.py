@@ -0,0 +1,15 @@
+import pytest
+from PubMedAPI.geo_mirror import GeoMirror
+
+
+def test_build_index_skips_tables_without_link_columns(tmp_path):
+    (tmp_path / "notes.csv").write_text("title,value\nfirst,1\nsecond,2\n")
+    (tmp_path / "links.csv").write_text("PMID,GSE\n123,GSE5\n456,GSE7\n")
+    mirror = GeoMirror(str(tmp_path))
+    try:
+        with pytest.warns(UserWarning, match="notes.csv"):
+            assert mirror.build_index() == 2
+        assert mirror.dataset_indices(123) == [GeoMirror.dataset_idx_of("GSE5")]
+        assert mirror.dataset_indices(456) == [GeoMirror.dataset_idx_of("GSE7")]
+    finally:
+        mirror.close()
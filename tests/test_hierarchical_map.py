@@ -0,0 +1,16 @@
+import numpy as np
+from Preprocessing.text_preprocessing import HierarchicalMapProcessor
+
+
+def test_drill_down_into_cluster_of_identical_rows():
+    rng = np.random.default_rng(0)
+    identical = np.tile(np.eye(1, 20), (12, 1))
+    spread = rng.random((40, 20)) + 5.0
+    processor = HierarchicalMapProcessor(n_clusters=2, n_components=5, random_state=0)
+    labels = processor.process(np.vstack([identical, spread]))
+    assert len(set(labels[:12])) == 1
+    members, layout, sub_labels = processor.drill_down(labels[0])
+    assert list(members) == list(range(12))
+    assert layout.shape == (12, 3)
+    assert np.isfinite(layout).all()
+    assert len(sub_labels) == 12
@@ -0,0 +1,33 @@
+import asyncio
+import pytest
+from aiohttp.test_utils import TestClient, TestServer
+from Service.http_service import PubTrendsService
+
+PMIDS = list(range(1, 12))
+
+
+def submit(body) -> int:
+    async def post() -> int:
+        service = PubTrendsService(workers=1)
+        client = TestClient(TestServer(service.create_app()))
+        await client.start_server()
+        try:
+            response = await client.post("/jobs", json=body)
+            return response.status
+        finally:
+            await client.close()
+    return asyncio.run(post())
+
+
+@pytest.mark.parametrize("body", [
+    {"pmids": "12345678901"},
+    PMIDS,
+    12345678,
+    {"pmids": PMIDS, "random_state": "seed"},
+    {"pmids": PMIDS, "n_clusters": 0},
+    {"pmids": PMIDS, "n_clusters": 31},
+    {"pmids": PMIDS, "max_features": 2},
+    {"pmids": PMIDS, "max_features": 201},
+])
+def test_submit_job_rejects_invalid_bodies(body):
+    assert submit(body) == 400
@@ -0,0 +1,14 @@
+import os
+import pandas as pd
+import pytest
+from Preprocessing.pipeline import EmbeddingPipeline
+
+DATA = os.path.join(os.path.dirname(__file__), "..", "PubMedAPI", "PubMed_data.csv")
+
+
+def test_fewer_datasets_than_clusters():
+    df = pd.read_csv(DATA).head(6)
+    with pytest.warns(UserWarning, match="clusters are used instead of 8"):
+        df, X, labels = EmbeddingPipeline(n_clusters=8, random_state=0).run(df)
+    assert X.shape == (6, 3)
+    assert len(set(labels)) == df["Duplicate_group"].nunique()
@@ -0,0 +1,51 @@
+import pandas as pd
+import requests
+from PubMedAPI.refresh import IncrementalRefresher
+
+
+class FailingPool:
+    """
+    Connection pool whose every request fails, like NCBI during an outage.
+    """
+    def get(self, url, params, retry_budget=None):
+        raise requests.ConnectionError("NCBI is down")
+
+    def post(self, url, data, retry_budget=None):
+        raise requests.ConnectionError("NCBI is down")
+
+
+def stored_table(fetched_at) -> pd.DataFrame:
+    return pd.DataFrame({
+        "Pmid": [1, 1, 2],
+        "Geo_dataset_ind": [200000001, 200000002, 200000003],
+        "GSE_code": ["GSE1", "GSE2", "GSE3"],
+        "Title": ["a", "b", "c"],
+        "Summary": ["a", "b", "c"],
+        "Overall_design": ["a", "b", "c"],
+        "Experiment_type": ["x", "x", "y"],
+        "Organism": ["Homo sapiens", "Homo sapiens", "Mus musculus"],
+        "Fetched_at": fetched_at,
+    })
+
+
+def test_failed_refetch_keeps_stale_rows():
+    stored = stored_table(pd.NaT)
+    refresher = IncrementalRefresher(pool=FailingPool())
+    refreshed = refresher.refresh(stored)
+    assert sorted(refreshed["Geo_dataset_ind"]) == [200000001, 200000002, 200000003]
+    assert refresher.error_counts["db_idx"] == 1
+
+
+def test_refetched_pmids_replace_their_stale_rows(monkeypatch):
+    stored = stored_table(pd.NaT)
+    refetched = stored_table(pd.Timestamp.now(tz="UTC")).iloc[[0]].assign(Title="updated")
+    monkeypatch.setattr(IncrementalRefresher, "fetch", lambda self, pmids, known=None: refetched)
+    refreshed = IncrementalRefresher(pool=FailingPool()).refresh(stored)
+    # PMID 1 was refetched with one dataset left, PMID 2 was not refetched and keeps its row
+    assert sorted(refreshed["Geo_dataset_ind"]) == [200000001, 200000003]
+    assert refreshed.loc[refreshed["Pmid"] == 1, "Title"].tolist() == ["updated"]
+
+
+def test_pmids_dropped_from_the_list_are_removed():
+    refreshed = IncrementalRefresher(pool=FailingPool()).refresh(stored_table(pd.NaT), list_of_pmids=[2])
+    assert refreshed["Pmid"].tolist() == [2]